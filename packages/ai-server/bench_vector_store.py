@@ -0,0 +1,166 @@
+"""
+Benchmark the vector store backends on the same data
+
+Loads identical embeddings into the Chroma backend and the flat NumPy
+backend (float32 and int8), then reports insert time, reopen time,
+query latency (p50/p99), vector RAM, disk usage and recall@k against the
+exact float32 results.
+
+Usage:
+    python bench_vector_store.py --chunks 20000 --dim 768
+    python bench_vector_store.py --from-chroma ./chroma_db   # real vault embeddings
+    python bench_vector_store.py --vault ../../tests/fixtures/sample-vault   # embeds via Ollama
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+from rag_service import ChromaBackend, FlatVectorStore, DEFAULT_COLLECTION_NAME, _read_index_state
+
+
+def synthetic_embeddings(n: int, dim: int, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real note embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load_chroma_embeddings(persist_directory: str):
+    """Embeddings, text and metadata from an existing ForgeRAG Chroma index's active chunk collection"""
+    import chromadb
+    client = chromadb.PersistentClient(path=persist_directory)
+    # The directory also holds file summaries, and after compaction or migration, other collections
+    name = _read_index_state(persist_directory).get("collection") or DEFAULT_COLLECTION_NAME
+    collection = client.get_collection(name)
+    records = collection.get(include=["embeddings", "documents", "metadatas"])
+    return np.asarray(records['embeddings'], dtype=np.float32), records['documents'], records['metadatas']
+
+
+def embed_vault(vault_path: str):
+    """Chunk a vault the way ForgeRAG does and embed it with the configured Ollama model"""
+    import glob
+    from rag_service import YAMLFrontmatterLoader, get_rag_instance
+    rag = get_rag_instance()
+    documents = []
+    for path in glob.glob(os.path.join(vault_path, "**/*.md"), recursive=True):
+        documents.extend(YAMLFrontmatterLoader(path, encoding="utf-8").load())
+    chunks, _ = rag._prepare_chunks(documents)
+    texts = [chunk.page_content for chunk in chunks]
+    return np.asarray(rag.embeddings.embed_documents(texts), dtype=np.float32), texts, [c.metadata for c in chunks]
+
+
+def directory_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def time_queries(backend, queries: np.ndarray, k: int):
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        hits = backend.query(query, k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append([hit[0] for hit in hits])
+    return latencies, results
+
+
+def open_chroma(path: str):
+    import chromadb
+    client = chromadb.PersistentClient(path=path)
+    return ChromaBackend(client.get_or_create_collection("bench", metadata={"hnsw:space": "cosine"}))
+
+
+BACKENDS = {
+    "flat": lambda path: FlatVectorStore(path, quantization=None),
+    "flat-int8": lambda path: FlatVectorStore(path, quantization="int8"),
+    "chroma": open_chroma,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Chroma against the flat NumPy vector store")
+    parser.add_argument("--chunks", type=int, default=20000, help="synthetic chunk count")
+    parser.add_argument("--dim", type=int, default=768, help="embedding dimension (nomic-embed-text is 768)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=1000, help="insert batch size")
+    parser.add_argument("--from-chroma", help="use embeddings from an existing ForgeRAG persist directory")
+    parser.add_argument("--vault", help="embed a vault with Ollama and benchmark on its chunks")
+    parser.add_argument("--backends", default=",".join(BACKENDS),
+                        help=f"comma-separated subset of {', '.join(BACKENDS)} (flat is always run as the exact reference)")
+    args = parser.parse_args()
+
+    if args.vault:
+        vectors, documents, metadatas = embed_vault(args.vault)
+    elif args.from_chroma:
+        vectors, documents, metadatas = load_chroma_embeddings(args.from_chroma)
+    else:
+        vectors = synthetic_embeddings(args.chunks, args.dim)
+        documents = [f"chunk {i}" for i in range(len(vectors))]
+        metadatas = [{"source": f"/vault/note-{i // 8}.md", "chunk_index": i % 8} for i in range(len(vectors))]
+    ids = [f"id-{i}" for i in range(len(vectors))]
+
+    rng = np.random.default_rng(1)
+    # Queries near stored vectors, like a question about an existing note
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = queries + 0.3 * rng.normal(size=queries.shape).astype(np.float32)
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {args.queries} queries, k={args.k}")
+    workdir = tempfile.mkdtemp(prefix="forge-bench-")
+    report = {}
+    try:
+        names = ["flat"] + [name for name in args.backends.split(",") if name in BACKENDS and name != "flat"]
+        for name in names:
+            path = os.path.join(workdir, name)
+            backend = BACKENDS[name](path)
+
+            started = time.perf_counter()
+            for start in range(0, len(vectors), args.batch):
+                end = start + args.batch
+                backend.add(ids[start:end], vectors[start:end], documents[start:end], metadatas[start:end])
+            insert_s = time.perf_counter() - started
+            del backend
+
+            started = time.perf_counter()
+            backend = BACKENDS[name](path)
+            backend.query(queries[0], args.k)  # First query pays for lazy loading
+            open_ms = (time.perf_counter() - started) * 1000
+
+            latencies, results = time_queries(backend, queries, args.k)
+            report[name] = {
+                "insert_s": insert_s,
+                "open_ms": open_ms,
+                "p50_ms": statistics.median(latencies),
+                "p99_ms": percentile(latencies, 99),
+                "disk_mb": directory_bytes(path) / 1024 / 1024,
+                # Chroma keeps its float32 HNSW vectors resident
+                "ram_mb": (backend.memory_bytes() if hasattr(backend, "memory_bytes")
+                           else vectors.nbytes) / 1024 / 1024,
+                "results": results,
+            }
+
+        exact = report["flat"]["results"]
+        print(f"{'backend':<13} {'insert s':>9} {'open ms':>9} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'RAM MB':>8} {'disk MB':>8} {'recall@' + str(args.k):>10}")
+        for name, stats in report.items():
+            recall = statistics.mean(len(set(a) & set(b)) / max(1, len(a)) for a, b in zip(exact, stats["results"]))
+            print(f"{name:<13} {stats['insert_s']:>9.2f} {stats['open_ms']:>9.1f} {stats['p50_ms']:>8.2f} "
+                  f"{stats['p99_ms']:>8.2f} {stats['ram_mb']:>8.1f} {stats['disk_mb']:>8.1f} {recall:>10.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
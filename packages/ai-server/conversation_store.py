@@ -0,0 +1,194 @@
+"""
+Bounded, persistent conversation store
+
+Keeps recently active sessions in memory with LRU eviction, caps the number of
+turns kept per session, and optionally persists turns to SQLite so sessions
+survive restarts. Evicted sessions are loaded back lazily on their next use.
+"""
+
+import os
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Sessions kept in memory before the least recently used is evicted
+DEFAULT_MAX_SESSIONS = int(os.getenv("FORGE_MAX_SESSIONS", "200"))
+
+# Turns kept per session (older turns are dropped from memory and disk)
+DEFAULT_MAX_TURNS = int(os.getenv("FORGE_MAX_TURNS_PER_SESSION", "50"))
+
+# Approximate memory budget for in-memory turns, in MB
+DEFAULT_MAX_MEMORY_MB = float(os.getenv("FORGE_CONVERSATION_MEMORY_MB", "32"))
+
+# SQLite file for persistence (unset keeps sessions in memory only)
+DEFAULT_DB_PATH = os.getenv("FORGE_CONVERSATION_DB") or None
+
+
+def _turn_size(turn: Dict[str, Any]) -> int:
+    """Approximate in-memory size of a turn in bytes"""
+    return sum(len(str(value)) for value in turn.values()) + 64
+
+
+class ConversationStore:
+    """LRU-bounded session memory with optional SQLite persistence"""
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, max_turns: int = DEFAULT_MAX_TURNS,
+                 max_memory_mb: float = DEFAULT_MAX_MEMORY_MB, db_path: Optional[str] = DEFAULT_DB_PATH):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.sessions: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self.session_bytes: Dict[str, int] = {}
+        self.memory_bytes = 0
+        self.evictions = 0
+        self.lazy_loads = 0
+        self.lock = threading.RLock()
+        self.db = None
+
+        if db_path:
+            try:
+                self.db = sqlite3.connect(db_path, check_same_thread=False)
+                self.db.execute("""
+                    CREATE TABLE IF NOT EXISTS turns (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        session_id TEXT NOT NULL,
+                        human TEXT NOT NULL,
+                        assistant TEXT NOT NULL,
+                        timestamp TEXT
+                    )
+                """)
+                self.db.execute("CREATE INDEX IF NOT EXISTS idx_turns_session ON turns(session_id, id)")
+                self.db.commit()
+                logger.info(f"💾 Conversation store persisting to {db_path}")
+            except Exception as e:
+                logger.warning(f"Could not open conversation database {db_path}, using memory only: {e}")
+                self.db = None
+
+    def _load(self, session_id: str) -> List[Dict[str, Any]]:
+        """Get a session's turns, lazily loading it from SQLite if not in memory"""
+        if session_id in self.sessions:
+            self.sessions.move_to_end(session_id)
+            return self.sessions[session_id]
+
+        turns = []
+        if self.db is not None:
+            try:
+                rows = self.db.execute(
+                    "SELECT human, assistant, timestamp FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                    (session_id, self.max_turns)
+                ).fetchall()
+                turns = [{"human": h, "assistant": a, "timestamp": t} for h, a, t in reversed(rows)]
+                if turns:
+                    self.lazy_loads += 1
+            except Exception as e:
+                logger.warning(f"Could not load session {session_id} from disk: {e}")
+
+        self.sessions[session_id] = turns
+        self.session_bytes[session_id] = sum(_turn_size(turn) for turn in turns)
+        self.memory_bytes += self.session_bytes[session_id]
+        self._evict(keep=session_id)
+        return turns
+
+    def _evict(self, keep: Optional[str] = None):
+        """Evict least recently used sessions until within session and memory limits"""
+        while self.sessions and (len(self.sessions) > self.max_sessions or self.memory_bytes > self.max_memory_bytes):
+            session_id = next(iter(self.sessions))
+            if session_id == keep:
+                if len(self.sessions) == 1:
+                    break
+                self.sessions.move_to_end(session_id)
+                continue
+            del self.sessions[session_id]
+            self.memory_bytes -= self.session_bytes.pop(session_id, 0)
+            self.evictions += 1
+
+    def recent(self, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Most recent turns of a session, oldest first"""
+        with self.lock:
+            turns = self._load(session_id)
+            return list(turns[-limit:]) if limit > 0 else []
+
+    def append(self, session_id: str, turn: Dict[str, Any]):
+        """Record a turn, trimming the session to the turn cap"""
+        with self.lock:
+            turns = self._load(session_id)
+            turns.append(turn)
+            size = _turn_size(turn)
+            self.session_bytes[session_id] += size
+            self.memory_bytes += size
+
+            while len(turns) > self.max_turns:
+                dropped = _turn_size(turns.pop(0))
+                self.session_bytes[session_id] -= dropped
+                self.memory_bytes -= dropped
+
+            if self.db is not None:
+                try:
+                    self.db.execute(
+                        "INSERT INTO turns (session_id, human, assistant, timestamp) VALUES (?, ?, ?, ?)",
+                        (session_id, turn.get("human", ""), turn.get("assistant", ""), turn.get("timestamp"))
+                    )
+                    # Keep only the newest max_turns rows for this session
+                    self.db.execute(
+                        """DELETE FROM turns WHERE session_id = ? AND id NOT IN (
+                               SELECT id FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?)""",
+                        (session_id, session_id, self.max_turns)
+                    )
+                    self.db.commit()
+                except Exception as e:
+                    logger.warning(f"Could not persist turn for session {session_id}: {e}")
+
+            self._evict(keep=session_id)
+
+    def __contains__(self, session_id: str) -> bool:
+        with self.lock:
+            if session_id in self.sessions:
+                return True
+            if self.db is None:
+                return False
+            row = self.db.execute("SELECT 1 FROM turns WHERE session_id = ? LIMIT 1", (session_id,)).fetchone()
+            return row is not None
+
+    def stats(self) -> Dict[str, Any]:
+        """Memory usage and eviction counters"""
+        with self.lock:
+            persisted_sessions = None
+            if self.db is not None:
+                try:
+                    persisted_sessions = self.db.execute("SELECT COUNT(DISTINCT session_id) FROM turns").fetchone()[0]
+                except Exception:
+                    pass
+            return {
+                "sessions_in_memory": len(self.sessions),
+                "turns_in_memory": sum(len(turns) for turns in self.sessions.values()),
+                "memory_bytes": self.memory_bytes,
+                "max_sessions": self.max_sessions,
+                "max_turns_per_session": self.max_turns,
+                "max_memory_bytes": self.max_memory_bytes,
+                "evictions": self.evictions,
+                "lazy_loads": self.lazy_loads,
+                "persistent": self.db is not None,
+                "persisted_sessions": persisted_sessions,
+            }
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+
+# Global conversation store instance
+_conversation_store = None
+
+def get_conversation_store() -> ConversationStore:
+    """Get or create global conversation store"""
+    global _conversation_store
+    if _conversation_store is None:
+        _conversation_store = ConversationStore()
+    return _conversation_store
@@ -0,0 +1,134 @@
+"""
+Online migration of an index to another embedding model
+
+While a migration runs, ForgeRAG serves searches from the current index and
+dual-writes every change into a second index embedded with the new model
+(see DualWriteStore). This backfills the rest of the new index in the
+background, a small batch at a time under the index write lock and at a
+throttled rate so Ollama stays responsive for chat, then checks the two
+indexes hold the same chunk IDs and cuts over.
+"""
+
+import os
+import time
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Chunks re-embedded per batch (the index write lock is held for one batch at a time)
+MIGRATION_BATCH_SIZE = int(os.getenv("FORGE_MIGRATION_BATCH_SIZE", "32"))
+
+# Upper bound on chunks re-embedded per second (0 = as fast as Ollama allows)
+MIGRATION_MAX_CHUNKS_PER_SECOND = float(os.getenv("FORGE_MIGRATION_RATE", "20"))
+
+# IDs listed per read when walking the current index
+ID_PAGE_SIZE = 5000
+
+
+def _all_ids(store) -> List[str]:
+    ids = []
+    total = store.count()
+    for offset in range(0, total, ID_PAGE_SIZE):
+        ids.extend(store.get(include=[], limit=ID_PAGE_SIZE, offset=offset)['ids'])
+    return ids
+
+
+class EmbeddingMigration:
+    """Backfills one ForgeRAG's migration target and cuts over when it is complete"""
+
+    def __init__(self, rag, record: Dict[str, Any], vectorstore, embeddings):
+        self.rag = rag
+        self.model_name = record["model"]
+        self.collection = record["collection"]
+        self.files_collection = record["files_collection"]
+        self.started_at = record.get("started_at")
+        self.vectorstore = vectorstore
+        self.embeddings = embeddings
+        self.cancel_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.state = {"stage": "dual-write", "chunks_total": 0, "chunks_done": 0, "files_total": 0,
+                      "files_done": 0, "error": None}
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self.run, name=f"forge-migrate-{self.model_name}", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            for label, dual in (("chunks", "store"), ("files", "file_store")):
+                self.state["stage"] = f"backfill-{label}"
+                if not self._backfill(label, getattr(self.rag, dual)):
+                    return
+            self.state["stage"] = "cutover"
+            self._catch_up()
+            self.state.update(self.rag.finish_embedding_migration(self))
+            self.state["stage"] = "done"
+            self.state["completed_at"] = datetime.now().isoformat()
+            self.state["elapsed_s"] = round(time.perf_counter() - started, 1)
+            self.rag.last_migration = self.status()
+        except Exception as e:
+            if self.cancel_event.is_set():
+                return
+            logger.error(f"❌ Embedding migration to {self.model_name} failed: {e}")
+            self.state["error"] = str(e)
+            self.rag.cancel_embedding_migration(reason=str(e))
+
+    def _backfill(self, label: str, dual) -> bool:
+        """Re-embed every entry the target lacks, in throttled batches; False if cancelled"""
+        ids = _all_ids(dual.primary)
+        self.state[f"{label}_total"] = len(ids)
+        for i in range(0, len(ids), MIGRATION_BATCH_SIZE):
+            if self.cancel_event.is_set():
+                return False
+            batch_started = time.perf_counter()
+            with self.rag.write_lock:
+                if self.cancel_event.is_set():
+                    return False
+                self._copy(dual, ids[i:i + MIGRATION_BATCH_SIZE])
+            self.state[f"{label}_done"] = min(i + MIGRATION_BATCH_SIZE, len(ids))
+            if MIGRATION_MAX_CHUNKS_PER_SECOND > 0:
+                pause = MIGRATION_BATCH_SIZE / MIGRATION_MAX_CHUNKS_PER_SECOND - (time.perf_counter() - batch_started)
+                if pause > 0 and self.cancel_event.wait(pause):
+                    return False
+        logger.info(f"🔁 Backfilled {len(ids)} {label} with {self.model_name}")
+        return True
+
+    def _copy(self, dual, ids: List[str]):
+        """Embed entries missing from the target (or whose dual-write failed) from the current store (caller holds the write lock)"""
+        present = set(dual.target.get(ids=ids, include=[])['ids'])
+        todo = [doc_id for doc_id in ids if doc_id not in present or doc_id in dual.failed_ids]
+        if not todo:
+            return
+        # Entries deleted since the ID walk simply don't come back
+        records = dual.primary.get(ids=todo, include=["documents", "metadatas"])
+        if records['ids']:
+            dual.target.add(records['ids'], self.embeddings.embed_documents(list(records['documents'])),
+                            records['documents'], records['metadatas'])
+        dual.failed_ids.difference_update(todo)
+
+    def _catch_up(self):
+        """Make the target hold exactly the current IDs before cutting over"""
+        with self.rag.write_lock:
+            for dual in (self.rag.store, self.rag.file_store):
+                current, migrated = set(_all_ids(dual.primary)), set(_all_ids(dual.target))
+                extra = list(migrated - current)
+                if extra:
+                    dual.target.delete(extra)
+                missing = list((current - migrated) | dual.failed_ids)
+                for i in range(0, len(missing), MIGRATION_BATCH_SIZE):
+                    self._copy(dual, missing[i:i + MIGRATION_BATCH_SIZE])
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "started_at": self.started_at,
+            "running": bool(self.thread and self.thread.is_alive()),
+            "max_chunks_per_second": MIGRATION_MAX_CHUNKS_PER_SECOND,
+            **self.state,
+        }
@@ -0,0 +1,303 @@
+"""
+Columnar index of note frontmatter
+
+Keeps every frontmatter field as a typed column (path -> value) plus an
+inverted index (value -> paths) so list-style questions such as "all active
+projects" are answered exactly, over the whole vault, without embeddings.
+Multi-valued fields like tags are indexed per value. The vault catalog keeps
+it in sync with the watcher.
+"""
+
+import re
+import time
+import threading
+import logging
+from datetime import date, datetime
+from typing import Dict, List, Optional, Any, Iterable
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+FRONTMATTER_PATTERN = re.compile(r'^---\s*\n(.*?)\n---\s*(?:\n|$)', re.DOTALL)
+
+# Frontmatter is at the top of a note; never read more than this to find it
+MAX_FRONTMATTER_CHARS = 16 * 1024
+
+# Fields whose values are matched against words in chat queries
+QUERYABLE_FIELDS = ('type', 'status', 'tags')
+
+# Filter operators, written as field__op in queries
+_OPERATORS = ('eq', 'ne', 'in', 'gt', 'gte', 'lt', 'lte', 'contains', 'exists')
+
+
+def _normalize_value(value: Any) -> Any:
+    """Typed scalar for a frontmatter value (dates stay dates, wiki links become strings)"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, list) and len(value) == 1 and isinstance(value[0], list):
+        # YAML reads an unquoted [[Wiki Link]] as a nested list
+        return f"[[{', '.join(str(item) for item in value[0])}]]"
+    if isinstance(value, (dict, list)):
+        return str(value)
+    return value
+
+
+def normalize_frontmatter(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Typed field values, with lists kept as lists of scalars for multi-valued fields"""
+    fields = {}
+    for key, value in data.items():
+        if value is None or value == '':
+            continue
+        if isinstance(value, list) and not (len(value) == 1 and isinstance(value[0], list)):
+            values = [_normalize_value(item) for item in value if item is not None and item != '']
+            if values:
+                fields[str(key)] = values
+        else:
+            fields[str(key)] = _normalize_value(value)
+    return fields
+
+
+def parse_frontmatter(text: str) -> Dict[str, Any]:
+    """Typed fields from the frontmatter block at the top of a note's text"""
+    if not text.startswith('---'):
+        return {}
+    match = FRONTMATTER_PATTERN.match(text[:MAX_FRONTMATTER_CHARS])
+    if not match:
+        return {}
+    try:
+        data = yaml.safe_load(match.group(1)) or {}
+    except yaml.YAMLError as e:
+        logger.debug(f"Invalid frontmatter: {e}")
+        return {}
+    return normalize_frontmatter(data) if isinstance(data, dict) else {}
+
+
+def _key(value: Any) -> Any:
+    """Posting-list key: strings compare case-insensitively, everything else as-is"""
+    return value.lower() if isinstance(value, str) else value
+
+
+def _coerce(raw: Any, like: Any) -> Any:
+    """Convert a filter value (usually a string from JSON) to the type of a column value"""
+    if isinstance(raw, str):
+        if isinstance(like, bool):
+            return raw.lower() in ('1', 'true', 'yes')
+        if isinstance(like, date):
+            return date.fromisoformat(raw)
+        if isinstance(like, (int, float)):
+            return float(raw)
+        if isinstance(like, str):
+            return raw.lower()
+    return raw
+
+
+def _candidates(raw: Any) -> set:
+    """Posting keys a filter value could mean: "2025-08-18" may be a date, "3" a number"""
+    candidates = {_key(raw)}
+    if isinstance(raw, str):
+        if raw.lower() in ('true', 'false'):
+            candidates.add(raw.lower() == 'true')
+        for convert in (date.fromisoformat, int, float):
+            try:
+                candidates.add(convert(raw))
+            except ValueError:
+                continue
+    return candidates
+
+
+def _sortable(value: Any) -> tuple:
+    """Sort key that orders numbers numerically and dates/strings lexically"""
+    if isinstance(value, list):
+        value = value[0] if value else ''
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, float(value), '')
+    return (1, 0.0, str(_json_value(value)).lower())
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_json_value(item) for item in value]
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class FrontmatterIndex:
+    """Typed frontmatter columns with per-value posting lists"""
+
+    def __init__(self):
+        # field -> {rel_path: value or list of values}
+        self.columns: Dict[str, Dict[str, Any]] = {}
+        # field -> {normalized value: set of rel_paths}
+        self.postings: Dict[str, Dict[Any, set]] = {}
+        self.lock = threading.RLock()
+
+    def add(self, rel_path: str, fields: Dict[str, Any]):
+        """Index a note's fields, replacing anything indexed for it before"""
+        with self.lock:
+            self.remove(rel_path)
+            for field, value in fields.items():
+                self.columns.setdefault(field, {})[rel_path] = value
+                postings = self.postings.setdefault(field, {})
+                for item in (value if isinstance(value, list) else [value]):
+                    try:
+                        postings.setdefault(_key(item), set()).add(rel_path)
+                    except TypeError:
+                        continue  # Unhashable value, still available in the column
+
+    def remove(self, rel_path: str):
+        """Drop a note from every column"""
+        with self.lock:
+            for field in list(self.columns):
+                column = self.columns[field]
+                value = column.pop(rel_path, None)
+                if value is None:
+                    continue
+                postings = self.postings.get(field, {})
+                for item in (value if isinstance(value, list) else [value]):
+                    try:
+                        paths = postings.get(_key(item))
+                    except TypeError:
+                        continue
+                    if paths is not None:
+                        paths.discard(rel_path)
+                        if not paths:
+                            del postings[_key(item)]
+                if not column:
+                    del self.columns[field]
+                    self.postings.pop(field, None)
+
+    def clear(self):
+        with self.lock:
+            self.columns = {}
+            self.postings = {}
+
+    def _matching(self, field: str, op: str, raw: Any) -> set:
+        """Paths whose field satisfies one condition (caller holds lock)"""
+        column = self.columns.get(field, {})
+        if op == 'exists':
+            wanted = raw if isinstance(raw, bool) else str(raw).lower() in ('1', 'true', 'yes')
+            return set(column) if wanted else None  # None = complement, resolved by caller
+        if op in ('eq', 'in'):
+            postings = self.postings.get(field, {})
+            matched = set()
+            for item in (raw if isinstance(raw, list) else [raw]):
+                for candidate in _candidates(item):
+                    try:
+                        matched |= postings.get(candidate, set())
+                    except TypeError:
+                        continue
+            return matched
+        if op == 'ne':
+            return set(column) - self._matching(field, 'eq', raw)
+
+        matched = set()
+        for rel_path, value in column.items():
+            for item in (value if isinstance(value, list) else [value]):
+                try:
+                    target = _coerce(raw, item)
+                    item = _key(item)
+                    if op == 'contains':
+                        hit = isinstance(item, str) and str(target).lower() in item
+                    elif op == 'gt':
+                        hit = item > target
+                    elif op == 'gte':
+                        hit = item >= target
+                    elif op == 'lt':
+                        hit = item < target
+                    else:
+                        hit = item <= target
+                except (TypeError, ValueError):
+                    hit = False
+                if hit:
+                    matched.add(rel_path)
+                    break
+        return matched
+
+    def query(self, filters: Optional[Dict[str, Any]] = None, all_paths: Optional[Iterable[str]] = None,
+              fields: Optional[List[str]] = None, group_by: Optional[List[str]] = None,
+              sort: Optional[str] = None, limit: Optional[int] = 100) -> Dict[str, Any]:
+        """Exact filter over frontmatter with optional per-field value counts.
+
+        Filters map "field" or "field__op" to a value; a list means any of.
+        Operators: eq, ne, in, gt, gte, lt, lte, contains, exists.
+        A limit of None returns every matching row.
+        """
+        if limit is not None and limit < 0:
+            raise ValueError("limit must be non-negative")
+        started = time.perf_counter()
+        with self.lock:
+            universe = set(all_paths) if all_paths is not None else {
+                rel_path for column in self.columns.values() for rel_path in column}
+            matched = set(universe)
+            for name, raw in (filters or {}).items():
+                field, _, op = name.partition('__')
+                op = op or 'eq'
+                if op not in _OPERATORS:
+                    raise ValueError(f"Unknown filter operator '{op}' (expected one of {', '.join(_OPERATORS)})")
+                paths = self._matching(field, op, raw)
+                matched &= paths if paths is not None else universe - set(self.columns.get(field, {}))
+
+            aggregations = {}
+            for field in (group_by or []):
+                counts: Dict[Any, int] = {}
+                column = self.columns.get(field, {})
+                for rel_path in matched:
+                    value = column.get(rel_path)
+                    for item in (value if isinstance(value, list) else [value]):
+                        key = _json_value(item) if item is not None else None
+                        counts[key] = counts.get(key, 0) + 1
+                aggregations[field] = dict(sorted(counts.items(), key=lambda kv: (-kv[1], str(kv[0]))))
+
+            if sort:
+                # "-field" sorts descending; notes without the field go last either way
+                column = self.columns.get(sort.lstrip('-'), {})
+                present = sorted((p for p in matched if p in column),
+                                 key=lambda p: (_sortable(column[p]), p), reverse=sort.startswith('-'))
+                ordered = present + sorted(p for p in matched if p not in column)
+            else:
+                ordered = sorted(matched)
+
+            selected = ordered[:limit] if limit is not None else ordered
+            rows = []
+            for rel_path in selected:
+                row_fields = {field: _json_value(column[rel_path])
+                              for field, column in self.columns.items()
+                              if rel_path in column and (fields is None or field in fields)}
+                rows.append({'rel_path': rel_path, 'fields': row_fields})
+
+        return {
+            'total': len(matched),
+            'notes': rows,
+            'aggregations': aggregations,
+            'query_ms': round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    def field_summary(self) -> Dict[str, Dict[str, Any]]:
+        """Each field with how many notes set it and its most common values"""
+        with self.lock:
+            summary = {}
+            for field, column in self.columns.items():
+                postings = self.postings.get(field, {})
+                top = sorted(postings.items(), key=lambda kv: -len(kv[1]))[:10]
+                summary[field] = {
+                    'notes': len(column),
+                    'distinct_values': len(postings),
+                    'top_values': {str(_json_value(value)): len(paths) for value, paths in top},
+                }
+            return summary
+
+    def filters_for_text(self, text: str) -> Dict[str, List[Any]]:
+        """type/status/tags values mentioned in a chat message, e.g. "active projects" """
+        words = set(re.findall(r'[a-z0-9][a-z0-9_-]*', text.lower()))
+        # Accept simple plurals: "projects" matches type: project
+        words |= {word[:-1] for word in words if word.endswith('s')}
+        filters = {}
+        with self.lock:
+            for field in QUERYABLE_FIELDS:
+                values = [value for value in self.postings.get(field, {})
+                          if isinstance(value, str) and value in words]
+                if values:
+                    filters[field] = sorted(values)
+        return filters
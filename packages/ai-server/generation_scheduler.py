@@ -0,0 +1,209 @@
+"""
+Per-model generation scheduler with backpressure
+
+Limits how many generations run against each Ollama model at once, queues
+the rest in a bounded queue with round-robin fairness across sessions, and
+rejects new work immediately when the queue is full.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Concurrent generations per model (Ollama mostly serializes per model anyway)
+DEFAULT_MODEL_CONCURRENCY = int(os.getenv("FORGE_MODEL_CONCURRENCY", "1"))
+
+# Per-model overrides, e.g. "llama3.2:3b=2,deepseek-r1:8b=1"
+MODEL_CONCURRENCY_OVERRIDES = {
+    name.strip(): int(limit)
+    for name, limit in (
+        item.split("=", 1) for item in os.getenv("FORGE_MODEL_CONCURRENCY_OVERRIDES", "").split(",") if "=" in item
+    )
+}
+
+# Maximum requests waiting per model before new ones are rejected
+DEFAULT_MAX_QUEUED = int(os.getenv("FORGE_MAX_QUEUED_REQUESTS", "8"))
+
+# Maximum time a request may wait for a slot before giving up
+DEFAULT_QUEUE_TIMEOUT = float(os.getenv("FORGE_QUEUE_TIMEOUT", "300"))
+
+
+class QueueFullError(Exception):
+    """Raised when a model's queue is at capacity"""
+
+    def __init__(self, model: str, queued: int):
+        super().__init__(f"Generation queue for {model} is full ({queued} waiting)")
+        self.model = model
+        self.queued = queued
+
+
+class QueueTimeoutError(Exception):
+    """Raised when a request waited too long for a generation slot"""
+
+
+class SchedulerTicket:
+    """A single request's place in the scheduler"""
+
+    def __init__(self, model: str, session_id: str):
+        self.model = model
+        self.session_id = session_id
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.queue_position = 0  # Requests ahead of this one when it was queued (0 = ran immediately)
+        self.future: Optional[asyncio.Future] = None
+        self.queued = False
+
+    @property
+    def wait_ms(self) -> float:
+        end = self.started_at if self.started_at is not None else time.monotonic()
+        return (end - self.enqueued_at) * 1000
+
+
+class GenerationScheduler:
+    """Bounded, fair per-model queue in front of Ollama generation calls.
+
+    All methods must be called from the event loop thread.
+    """
+
+    def __init__(self, default_concurrency: int = DEFAULT_MODEL_CONCURRENCY,
+                 concurrency_overrides: Optional[Dict[str, int]] = None,
+                 max_queued: int = DEFAULT_MAX_QUEUED, queue_timeout: float = DEFAULT_QUEUE_TIMEOUT):
+        self.default_concurrency = max(1, default_concurrency)
+        self.concurrency_overrides = concurrency_overrides if concurrency_overrides is not None else dict(MODEL_CONCURRENCY_OVERRIDES)
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.models: Dict[str, Dict[str, Any]] = {}
+
+    def _state(self, model: str) -> Dict[str, Any]:
+        if model not in self.models:
+            self.models[model] = {
+                "limit": max(1, self.concurrency_overrides.get(model, self.default_concurrency)),
+                "active": 0,
+                "queued": 0,
+                "waiting": OrderedDict(),  # session_id -> deque of tickets, rotated for fairness
+                "completed": 0,
+                "rejected": 0,
+                "total_wait_ms": 0.0,
+            }
+        return self.models[model]
+
+    async def acquire(self, model: str, session_id: str) -> SchedulerTicket:
+        """Wait for a generation slot, raising QueueFullError if the queue is at capacity"""
+        state = self._state(model)
+        ticket = SchedulerTicket(model, session_id)
+
+        if state["active"] < state["limit"] and state["queued"] == 0:
+            state["active"] += 1
+            ticket.started_at = time.monotonic()
+            return ticket
+
+        if state["queued"] >= self.max_queued:
+            state["rejected"] += 1
+            raise QueueFullError(model, state["queued"])
+
+        ticket.queue_position = state["queued"] + 1
+        ticket.future = asyncio.get_running_loop().create_future()
+        ticket.queued = True
+        state["waiting"].setdefault(session_id, deque()).append(ticket)
+        state["queued"] += 1
+        logger.info(f"⏳ Queued {model} request for session {session_id[:8]} at position {ticket.queue_position}")
+
+        try:
+            await asyncio.wait_for(ticket.future, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._dequeue(state, ticket)
+            raise QueueTimeoutError(f"Waited {ticket.wait_ms / 1000:.0f}s for a {model} generation slot")
+        except asyncio.CancelledError:
+            # Client went away while waiting
+            self._dequeue(state, ticket)
+            raise
+
+        return ticket
+
+    def release(self, ticket: SchedulerTicket):
+        """Free a slot and hand it to the next waiting request"""
+        state = self._state(ticket.model)
+        state["active"] = max(0, state["active"] - 1)
+        state["completed"] += 1
+        state["total_wait_ms"] += ticket.wait_ms
+        self._grant(state)
+
+    def _grant(self, state: Dict[str, Any]):
+        """Start waiting requests, taking one per session in rotation"""
+        waiting = state["waiting"]
+        while state["active"] < state["limit"] and waiting:
+            session_id, tickets = next(iter(waiting.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                waiting.move_to_end(session_id)
+            else:
+                del waiting[session_id]
+
+            ticket.queued = False
+            state["queued"] -= 1
+            if ticket.future.done():
+                continue  # Timed out or cancelled before we got to it
+
+            state["active"] += 1
+            ticket.started_at = time.monotonic()
+            ticket.future.set_result(True)
+
+    def _dequeue(self, state: Dict[str, Any], ticket: SchedulerTicket):
+        """Remove a ticket that gave up waiting"""
+        if not ticket.queued:
+            # Already granted a slot at the same moment it gave up
+            if ticket.started_at is not None:
+                state["active"] = max(0, state["active"] - 1)
+                self._grant(state)
+            return
+
+        tickets = state["waiting"].get(ticket.session_id)
+        if tickets and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del state["waiting"][ticket.session_id]
+        ticket.queued = False
+        state["queued"] -= 1
+
+    def retry_after(self, model: str) -> int:
+        """Rough seconds until a queue slot frees up, for Retry-After headers"""
+        state = self._state(model)
+        completed = state["completed"]
+        avg_wait_s = (state["total_wait_ms"] / completed / 1000) if completed else 10.0
+        return max(1, int(avg_wait_s))
+
+    def status(self) -> Dict[str, Any]:
+        """Queue depth and wait statistics per model"""
+        models = {}
+        for model, state in self.models.items():
+            completed = state["completed"]
+            models[model] = {
+                "limit": state["limit"],
+                "active": state["active"],
+                "queued": state["queued"],
+                "queued_by_session": {sid: len(tickets) for sid, tickets in state["waiting"].items()},
+                "completed": completed,
+                "rejected": state["rejected"],
+                "avg_wait_ms": state["total_wait_ms"] / completed if completed else 0.0,
+            }
+        return {
+            "max_queued": self.max_queued,
+            "queue_timeout": self.queue_timeout,
+            "models": models,
+        }
+
+
+# Global scheduler instance
+_generation_scheduler = None
+
+def get_generation_scheduler() -> GenerationScheduler:
+    """Get or create global generation scheduler"""
+    global _generation_scheduler
+    if _generation_scheduler is None:
+        _generation_scheduler = GenerationScheduler()
+    return _generation_scheduler
@@ -0,0 +1,128 @@
+"""
+Index health reporting and background compaction
+
+Incremental updates delete and re-add every chunk of a touched file, so both
+backends accumulate dead entries (flat store tombstones, deleted Chroma HNSW nodes
+and dropped-collection segment files) and chunks of files that no longer
+exist. This reports those numbers per index and compacts in a background
+thread, either on request or on a schedule once enough of an index is dead.
+"""
+
+import os
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Hours between scheduled health checks (0 disables the schedule)
+COMPACTION_INTERVAL_HOURS = float(os.getenv("FORGE_COMPACTION_INTERVAL_HOURS", "24"))
+
+# Scheduled runs only compact an index once this share of its entries is dead
+COMPACTION_MIN_DEAD_RATIO = float(os.getenv("FORGE_COMPACTION_MIN_DEAD_RATIO", "0.2"))
+
+
+def needs_compaction(stats: Dict[str, Any], min_dead_ratio: float = COMPACTION_MIN_DEAD_RATIO) -> Optional[str]:
+    """Why an index is worth compacting, or None if it is healthy"""
+    if stats.get("dead_ratio", 0) >= min_dead_ratio:
+        return f"{stats['dead_ratio']:.0%} of entries are dead"
+    if stats.get("orphaned_sources"):
+        return f"{stats['orphaned_sources']} orphaned sources"
+    if stats.get("orphaned_segments"):
+        return f"{stats['orphaned_segments']} orphaned segment directories"
+    return None
+
+
+class IndexMaintenance:
+    """Runs compactions one at a time in the background and keeps their reports"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running: Optional[str] = None  # Name of the index being compacted
+        self.last_reports: Dict[str, Dict[str, Any]] = {}
+        self.schedule_thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+
+    def compact(self, name: str, rag, vault_root: Optional[str] = None) -> Dict[str, Any]:
+        """Compact one index now, waiting for any running compaction first"""
+        self.lock.acquire()
+        return self._compact_locked(name, rag, vault_root)
+
+    def start_compaction(self, name: str, rag, vault_root: Optional[str] = None) -> bool:
+        """Compact in a background thread; False if a compaction is already running"""
+        if not self.lock.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._compact_locked, args=(name, rag, vault_root),
+                         name=f"forge-compact-{name}", daemon=True).start()
+        return True
+
+    def _compact_locked(self, name: str, rag, vault_root: Optional[str]) -> Dict[str, Any]:
+        """Run a compaction; the caller has acquired self.lock, which is released here"""
+        self.running = name
+        try:
+            report = rag.compact(vault_root)
+        except Exception as e:
+            logger.error(f"❌ Compaction of '{name}' failed: {e}")
+            report = {"error": str(e)}
+        finally:
+            self.running = None
+            self.lock.release()
+        report["completed_at"] = datetime.now().isoformat()
+        self.last_reports[name] = report
+        return report
+
+    def run_scheduled(self, targets: List[Tuple[str, Any, Optional[str]]]) -> Dict[str, str]:
+        """Check each (name, rag, vault_root) and compact the ones that need it"""
+        decisions = {}
+        for name, rag, vault_root in targets:
+            try:
+                reason = needs_compaction(rag.index_stats(vault_root))
+            except Exception as e:
+                logger.warning(f"Could not check index health for '{name}': {e}")
+                continue
+            decisions[name] = reason or "healthy"
+            if reason:
+                logger.info(f"🧹 Scheduled compaction of '{name}': {reason}")
+                self.compact(name, rag, vault_root)
+        return decisions
+
+    def start_schedule(self, get_targets: Callable[[], List[Tuple[str, Any, Optional[str]]]],
+                       interval_hours: float = COMPACTION_INTERVAL_HOURS):
+        """Check every index's health every interval_hours, compacting where needed"""
+        if interval_hours <= 0 or self.schedule_thread is not None:
+            return
+
+        def loop():
+            while not self.stop_event.wait(interval_hours * 3600):
+                try:
+                    self.run_scheduled(get_targets())
+                except Exception as e:
+                    logger.error(f"❌ Scheduled index maintenance failed: {e}")
+
+        self.schedule_thread = threading.Thread(target=loop, name="forge-maintenance", daemon=True)
+        self.schedule_thread.start()
+        logger.info(f"🗓️ Index maintenance scheduled every {interval_hours:g}h "
+                    f"(compacting above {COMPACTION_MIN_DEAD_RATIO:.0%} dead entries)")
+
+    def stop_schedule(self):
+        self.stop_event.set()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "scheduled_every_hours": COMPACTION_INTERVAL_HOURS if self.schedule_thread else None,
+            "min_dead_ratio": COMPACTION_MIN_DEAD_RATIO,
+            "last_reports": self.last_reports,
+        }
+
+
+# Global index maintenance instance
+_index_maintenance = None
+
+def get_index_maintenance() -> IndexMaintenance:
+    """Get or create global index maintenance"""
+    global _index_maintenance
+    if _index_maintenance is None:
+        _index_maintenance = IndexMaintenance()
+    return _index_maintenance
@@ -0,0 +1,179 @@
+"""
+Reconciliation between the vault on disk and the search index
+
+Compares every markdown file's path, size and mtime against the file state
+recorded in chunk metadata, hashes only the files whose stat changed, and
+indexes just the difference. Runs at startup so edits made while the server
+was down (e.g. a git pull of the vault) are picked up without a full rebuild.
+"""
+
+import os
+import time
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Any
+
+from vault_catalog import file_content_hash, iter_vault_notes
+
+logger = logging.getLogger(__name__)
+
+# Files embedded per batch while applying a diff
+DEFAULT_BATCH_SIZE = int(os.getenv("FORGE_RECONCILE_BATCH_SIZE", "50"))
+
+# Paths listed per category in reports (counts are always complete)
+REPORT_PATH_LIMIT = 100
+
+
+def scan_vault(root: str) -> Dict[str, Dict[str, Any]]:
+    """Size and mtime of every tracked markdown file under root"""
+    files = {}
+    for path in iter_vault_notes(root):
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            continue
+        files[path] = {'size': stat_result.st_size, 'mtime': stat_result.st_mtime}
+    return files
+
+
+class IndexReconciler:
+    """Diffs disk against the index and queues only added, changed and deleted files"""
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.running = False
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    def diff(self, rag, root: str, disk_files: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Compare disk against the index without changing anything"""
+        started = time.perf_counter()
+        if disk_files is None:
+            disk_files = scan_vault(root)
+        indexed = rag.indexed_files()
+
+        added, changed, deleted, touched = [], [], [], []
+        hashed = 0
+        for path, on_disk in disk_files.items():
+            record = indexed.get(path)
+            if record is None:
+                added.append(path)
+                continue
+            if record['size'] == on_disk['size'] and record['mtime'] == on_disk['mtime']:
+                continue
+            # Stat changed: only the content hash can tell an edit from a touch or checkout
+            try:
+                hashed += 1
+                same_content = record['hash'] is not None and file_content_hash(path) == record['hash']
+            except OSError:
+                continue
+            if same_content:
+                touched.append(path)
+            else:
+                changed.append(path)
+
+        root_prefix = os.path.abspath(root).rstrip(os.sep) + os.sep
+        for path in indexed:
+            if path not in disk_files and (path.startswith(root_prefix) or not os.path.exists(path)):
+                deleted.append(path)
+
+        return {
+            'added': sorted(added),
+            'changed': sorted(changed),
+            'deleted': sorted(deleted),
+            'touched': sorted(touched),
+            'unchanged': len(disk_files) - len(added) - len(changed) - len(touched),
+            'files_on_disk': len(disk_files),
+            'files_indexed': len(indexed),
+            'files_hashed': hashed,
+            'indexed': indexed,
+            'scan_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def apply(self, rag, diff: Dict[str, Any], cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """Index the added and changed files, drop deleted ones, refresh touched stats.
+
+        Setting cancel_event stops it after the batch being embedded; the
+        next reconcile picks up whatever was left.
+        """
+        started = time.perf_counter()
+        indexed = diff['indexed']
+
+        removed_chunks = rag.remove_files(diff['deleted']) if diff['deleted'] else 0
+
+        for path in diff['touched']:
+            try:
+                stat_result = os.stat(path)
+                rag.update_file_stats(indexed[path]['ids'], stat_result.st_size, stat_result.st_mtime)
+            except Exception as e:
+                logger.warning(f"Could not refresh index stats for {path}: {e}")
+
+        to_index = diff['added'] + diff['changed']
+        indexed_chunks = 0
+        for i in range(0, len(to_index), self.batch_size):
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info(f"🛑 Reconcile cancelled after {i}/{len(to_index)} files")
+                return {
+                    'indexed_chunks': indexed_chunks,
+                    'removed_chunks': removed_chunks,
+                    'cancelled': True,
+                    'apply_ms': round((time.perf_counter() - started) * 1000, 1),
+                }
+            batch = to_index[i:i + self.batch_size]
+            indexed_chunks += rag.index_files(batch)
+            logger.info(f"🔄 Reconcile: indexed {min(i + len(batch), len(to_index))}/{len(to_index)} files")
+
+        # Notes indexed before file summaries existed, or loaded from a snapshot, get theirs here
+        try:
+            summarized = rag.index_missing_file_summaries()
+        except Exception as e:
+            logger.warning(f"Could not add missing file summaries: {e}")
+            summarized = 0
+
+        return {
+            'indexed_chunks': indexed_chunks,
+            'removed_chunks': removed_chunks,
+            'file_summaries_added': summarized,
+            'apply_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def reconcile(self, rag, root: str, disk_files: Optional[Dict[str, Dict[str, Any]]] = None,
+                  dry_run: bool = False, cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """Diff disk against the index and apply the difference, returning a report"""
+        with self.lock:
+            self.running = True
+            try:
+                diff = self.diff(rag, root, disk_files)
+                report = {key: value for key, value in diff.items() if key != 'indexed'}
+                for key in ('added', 'changed', 'deleted', 'touched'):
+                    report[f'{key}_count'] = len(report[key])
+                    report[key] = report[key][:REPORT_PATH_LIMIT]
+
+                logger.info(f"🔍 Reconcile diff: {report['added_count']} added, {report['changed_count']} changed, "
+                            f"{report['deleted_count']} deleted, {report['touched_count']} touched, "
+                            f"{report['unchanged']} unchanged ({report['scan_ms']:.0f}ms scan)")
+
+                if not dry_run:
+                    report.update(self.apply(rag, diff, cancel_event))
+                report['dry_run'] = dry_run
+                report['completed_at'] = datetime.now().isoformat()
+                self.last_report = report
+                return report
+            finally:
+                self.running = False
+
+    def status(self) -> Dict[str, Any]:
+        """Whether a reconcile is running and the last report"""
+        return {"running": self.running, "last_report": self.last_report}
+
+
+# Global reconciler instance
+_index_reconciler = None
+
+def get_index_reconciler() -> IndexReconciler:
+    """Get or create global index reconciler"""
+    global _index_reconciler
+    if _index_reconciler is None:
+        _index_reconciler = IndexReconciler()
+    return _index_reconciler
@@ -0,0 +1,281 @@
+"""
+Portable snapshots of the search index
+
+A snapshot is a zip holding the chunk vectors (raw float32 rows), chunk text
+and metadata with vault-relative paths, and a versioned manifest with each
+file's content hash and the embedding model. Importing it on another machine
+loads the chunks of every file whose content still matches, then reconciles,
+so only files that differ are re-embedded through Ollama.
+
+Usage:
+    python index_snapshot.py export forge-index.zip --vault ~/Vault
+    python index_snapshot.py import forge-index.zip --vault ~/Vault
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import zipfile
+import hashlib
+import argparse
+import tempfile
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+
+from vault_catalog import file_content_hash
+from index_reconciler import IndexReconciler, scan_vault
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "forge-index-snapshot"
+SNAPSHOT_VERSION = 1
+
+# Where /index/export writes when no path is given
+DEFAULT_SNAPSHOT_DIR = os.getenv("FORGE_SNAPSHOT_DIR", "./snapshots")
+
+# Chunks read from the index or written to it per batch
+SNAPSHOT_BATCH_SIZE = 2000
+
+MANIFEST_NAME = "manifest.json"
+VECTORS_NAME = "vectors.f32"
+CHUNKS_NAME = "chunks.jsonl"
+
+
+def default_snapshot_path() -> str:
+    return os.path.join(DEFAULT_SNAPSHOT_DIR, f"forge-index-{datetime.now().strftime('%Y%m%d-%H%M%S')}.zip")
+
+
+def _relative_source(source: str, root_prefix: str) -> Optional[str]:
+    """Vault-relative POSIX path for a chunk source, or None if it is outside the vault"""
+    if not source.startswith(root_prefix):
+        return None
+    return source[len(root_prefix):].replace(os.sep, '/')
+
+
+def export_snapshot(rag, vault_root: str, path: str) -> Dict[str, Any]:
+    """Write every chunk under vault_root to a snapshot file and return its manifest"""
+    started = time.perf_counter()
+    root_prefix = os.path.abspath(vault_root).rstrip(os.sep) + os.sep
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = path + ".partial"
+
+    files: Dict[str, Dict[str, Any]] = {}
+    vectors_digest = hashlib.sha256()
+    dimension = None
+    chunk_count = skipped = 0
+
+    # Writers wait until the export finishes, so offset paging can't skip or repeat chunks
+    with rag.write_lock, \
+            zipfile.ZipFile(temp_path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive, \
+            tempfile.TemporaryFile() as chunks_out:
+        total = rag.store.count()
+        # Vectors barely compress, so store them and spend the deflate on text and metadata.
+        # A zip takes one writer at a time: vectors stream in, chunk lines are spooled and copied after.
+        with archive.open(zipfile.ZipInfo(VECTORS_NAME), "w", force_zip64=True) as vectors_out:
+            for offset in range(0, total, SNAPSHOT_BATCH_SIZE):
+                records = rag.store.get(include=["embeddings", "documents", "metadatas"],
+                                        limit=SNAPSHOT_BATCH_SIZE, offset=offset)
+                embeddings = np.asarray(records['embeddings'], dtype='<f4')
+                lines, rows = [], []
+                for row, (document, metadata) in enumerate(zip(records['documents'], records['metadatas'])):
+                    metadata = metadata or {}
+                    rel_path = _relative_source(metadata.get('source', ''), root_prefix)
+                    if rel_path is None:
+                        skipped += 1
+                        continue
+                    file_record = files.setdefault(rel_path, {'hash': metadata.get('content_hash'),
+                                                              'size': metadata.get('file_size'), 'chunks': 0})
+                    file_record['chunks'] += 1
+                    metadata = {key: value for key, value in metadata.items() if key != 'source'}
+                    lines.append(json.dumps({'path': rel_path, 'document': document, 'metadata': metadata},
+                                            ensure_ascii=False) + "\n")
+                    rows.append(row)
+                if not rows:
+                    continue
+                block = np.ascontiguousarray(embeddings[rows]).tobytes()
+                dimension = embeddings.shape[1]
+                vectors_out.write(block)
+                vectors_digest.update(block)
+                chunks_out.write("".join(lines).encode("utf-8"))
+                chunk_count += len(rows)
+
+        chunks_out.seek(0)
+        with archive.open(CHUNKS_NAME, "w", force_zip64=True) as chunks_entry:
+            shutil.copyfileobj(chunks_out, chunks_entry)
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "created_at": datetime.now().isoformat(),
+            "embedding_model": rag.model_name,
+            "dimension": dimension,
+            "chunk_count": chunk_count,
+            "file_count": len(files),
+            "vectors_sha256": vectors_digest.hexdigest(),
+            "files": files,
+        }
+        archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+
+    os.replace(temp_path, path)
+    summary = {key: value for key, value in manifest.items() if key != 'files'}
+    summary.update({"path": os.path.abspath(path), "bytes": os.path.getsize(path), "skipped_outside_vault": skipped,
+                    "export_ms": round((time.perf_counter() - started) * 1000, 1)})
+    logger.info(f"📦 Exported {chunk_count} chunks from {len(files)} files to {path} "
+                f"({summary['bytes'] / 1024 / 1024:.1f} MB, {summary['export_ms']:.0f}ms)")
+    return summary
+
+
+def read_manifest(archive: zipfile.ZipFile) -> Dict[str, Any]:
+    """The snapshot manifest, after checking it is a format and version this code reads"""
+    manifest = json.loads(archive.read(MANIFEST_NAME))
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError("Not a Forge index snapshot")
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {manifest.get('version')} (expected {SNAPSHOT_VERSION})")
+    return manifest
+
+
+def import_snapshot(rag, vault_root: str, path: str,
+                    reconciler: Optional[IndexReconciler] = None) -> Dict[str, Any]:
+    """Load the chunks of files that still match the local vault, then re-embed only the rest.
+
+    Files are matched by vault-relative path and content hash, so a snapshot
+    taken on another machine (or at another vault location) applies as-is.
+    """
+    started = time.perf_counter()
+    root = os.path.abspath(vault_root)
+
+    with zipfile.ZipFile(path) as archive:
+        manifest = read_manifest(archive)
+        # Vectors from another model would sit in the index for good, answering queries with noise
+        if manifest["embedding_model"] != rag.model_name:
+            raise ValueError(f"Snapshot was embedded with {manifest['embedding_model']}, "
+                             f"this index uses {rag.model_name}; migrate or rebuild instead")
+        if manifest["dimension"] and rag.dimension and manifest["dimension"] != rag.dimension:
+            raise ValueError(f"Snapshot holds {manifest['dimension']}-dimensional vectors, "
+                             f"but the index holds {rag.dimension}-dimensional ones")
+
+        # Which snapshot files still match what is on disk here
+        disk_files = scan_vault(root)
+        matching: Dict[str, Dict[str, Any]] = {}
+        changed = missing = 0
+        for rel_path, record in manifest["files"].items():
+            local_path = os.path.join(root, *rel_path.split('/'))
+            on_disk = disk_files.get(local_path)
+            if on_disk is None:
+                missing += 1
+                continue
+            try:
+                same = record['hash'] is not None and file_content_hash(local_path) == record['hash']
+            except OSError:
+                same = False
+            if same:
+                matching[rel_path] = {'source': local_path, **on_disk}
+            else:
+                changed += 1
+
+        # Check the vectors before anything is written, so a corrupt snapshot leaves the index untouched
+        digest = hashlib.sha256()
+        with archive.open(VECTORS_NAME) as vectors_in:
+            for block in iter(lambda: vectors_in.read(1024 * 1024), b""):
+                digest.update(block)
+        if digest.hexdigest() != manifest["vectors_sha256"]:
+            raise ValueError(f"Snapshot vectors checksum mismatch in {path}; the file is corrupt or was modified")
+
+        row_bytes = 4 * manifest["dimension"] if manifest["dimension"] else 0
+        imported = 0
+        with rag.write_lock:
+            try:
+                # Matching files take the snapshot's chunks in place of whatever the index holds for them
+                indexed = rag.indexed_files()
+                stale_ids = [doc_id for entry in matching.values()
+                             for doc_id in indexed.get(entry['source'], {}).get('ids', [])]
+                for i in range(0, len(stale_ids), SNAPSHOT_BATCH_SIZE):
+                    rag.store.delete(stale_ids[i:i + SNAPSHOT_BATCH_SIZE])
+
+                with archive.open(VECTORS_NAME) as vectors_in, archive.open(CHUNKS_NAME) as chunks_in:
+                    batch: List[Dict[str, Any]] = []
+
+                    def flush(batch_records, block):
+                        rows = [i for i, record in enumerate(batch_records) if record['path'] in matching]
+                        if not rows:
+                            return 0
+                        vectors = np.frombuffer(block, dtype='<f4').reshape(len(batch_records),
+                                                                            manifest["dimension"])[rows]
+                        rag._record_dimension(vectors)
+                        ids, documents, metadatas = [], [], []
+                        for i in rows:
+                            record = batch_records[i]
+                            entry = matching[record['path']]
+                            metadata = {**record['metadata'], 'source': entry['source'],
+                                        'file_size': entry['size'], 'file_mtime': entry['mtime']}
+                            ids.append(rag._chunk_id(entry['source'], metadata.get('chunk_index', i)))
+                            documents.append(record['document'])
+                            metadatas.append(metadata)
+                        rag.store.add(ids, vectors, documents, metadatas)
+                        return len(ids)
+
+                    for line in chunks_in:
+                        batch.append(json.loads(line))
+                        if len(batch) == SNAPSHOT_BATCH_SIZE:
+                            imported += flush(batch, vectors_in.read(row_bytes * len(batch)))
+                            batch = []
+                    if batch:
+                        imported += flush(batch, vectors_in.read(row_bytes * len(batch)))
+            finally:
+                rag.generation += 1  # Written straight to the store, so invalidate caches derived from the index
+
+    load_ms = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"📦 Imported {imported} chunks for {len(matching)} files from {path} ({load_ms:.0f}ms), "
+                f"{changed} changed and {missing} missing files left to reconcile")
+
+    # Anything the snapshot could not supply (edited, new or removed files) is caught up here
+    reconcile_report = (reconciler or IndexReconciler()).reconcile(rag, root, disk_files)
+    return {
+        "snapshot_created_at": manifest["created_at"],
+        "embedding_model": manifest["embedding_model"],
+        "imported_files": len(matching),
+        "imported_chunks": imported,
+        "changed_files": changed,
+        "missing_files": missing,
+        "reembedded_files": reconcile_report['added_count'] + reconcile_report['changed_count'],
+        "load_ms": load_ms,
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        "reconcile": reconcile_report,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a portable Forge search index snapshot")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("snapshot", nargs="?", help="snapshot file (export defaults to FORGE_SNAPSHOT_DIR)")
+    parser.add_argument("--vault", default=os.getenv("FORGE_VAULT_PATH"), help="vault directory")
+    parser.add_argument("--persist-directory", default="./chroma_db", help="index directory")
+    args = parser.parse_args()
+
+    if not args.vault:
+        parser.error("--vault (or FORGE_VAULT_PATH) is required")
+    if args.command == "import" and not args.snapshot:
+        parser.error("import needs a snapshot file")
+
+    logging.basicConfig(level=logging.INFO)
+    from rag_service import ForgeRAG
+    rag = ForgeRAG(persist_directory=args.persist_directory)
+
+    if args.command == "export":
+        result = export_snapshot(rag, args.vault, args.snapshot or default_snapshot_path())
+    else:
+        result = import_snapshot(rag, args.vault, args.snapshot)
+        result["reconcile"] = {key: value for key, value in result["reconcile"].items()
+                               if not isinstance(value, list)}
+    print(json.dumps(result, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,48 @@
+import time
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 import requests
 import uuid
 from typing import Dict, List, Optional
-from datetime import datetime
+from datetime import datetime, date, timedelta
 import logging
 import os
+import re
 import json
 from pathlib import Path
 import threading
-import time
 
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+from model_manager import get_model_manager
+from model_router import get_model_router
+from conversation_store import get_conversation_store
+from vault_catalog import VaultCatalog, DAILY_FOLDER, WEEKLY_FOLDER, is_vault_note
+from note_cache import get_note_cache
+from index_reconciler import get_index_reconciler
+from vault_registry import get_vault_registry, DEFAULT_VAULT, ALL_VAULTS
+from index_maintenance import get_index_maintenance, needs_compaction
+from reranker import get_rerank_stage
+from generation_scheduler import get_generation_scheduler, QueueFullError, QueueTimeoutError
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Forge Local AI", description="Localhost-first AI knowledge management system")
 
-# Global variables for simple conversation memory
-conversations: Dict[str, List[Dict]] = {}
+# Bounded conversation memory (LRU in memory, optionally persisted to SQLite)
+conversations = get_conversation_store()
 vault_path = None
 
+# Additional named vaults, each with its own index and watcher
+vault_registry = get_vault_registry()
+
 # Persistent vault configuration file
 VAULT_CONFIG_FILE = ".vault_config.json"
 
@@ -35,6 +53,7 @@ def load_vault_config():
         if os.path.exists(VAULT_CONFIG_FILE):
             with open(VAULT_CONFIG_FILE, 'r') as f:
                 config = json.load(f)
+                vault_registry.configure(config.get('vaults', {}))
                 vault_path_str = config.get('vault_path')
                 if vault_path_str and os.path.exists(vault_path_str):
                     vault_path = Path(vault_path_str)
@@ -49,6 +68,7 @@ def save_vault_config():
     try:
         config = {
             'vault_path': str(vault_path) if vault_path else None,
+            'vaults': vault_registry.to_config(),
             'configured_at': datetime.now().isoformat()
         }
         with open(VAULT_CONFIG_FILE, 'w') as f:
@@ -64,76 +84,134 @@ load_vault_config()
 class VaultWatcher(FileSystemEventHandler):
     """Watches vault directory for file changes and updates search index automatically"""
 
-    def __init__(self):
+    def __init__(self, vault=None):
         super().__init__()
-        self.update_queue = set()
-        self.last_update_time = time.time()
+        self.vault = vault  # A registered vault, or None for the primary vault
+        self.pending_moves = []  # (src, dest, is_directory) in the order they happened
+        self.pending_changes = set()
+        self.pending_deletes = set()
         self.update_delay = 2.0  # Wait 2 seconds after last change before updating
-        self.update_thread = None
+        self.timer = None
         self.lock = threading.Lock()
 
+    def _is_note(self, path: str) -> bool:
+        """Markdown files only, skipping temporary and hidden files and hidden folders like .trash"""
+        root = self.vault.path if self.vault is not None else str(vault_path or os.path.dirname(path))
+        return is_vault_note(root, path)
+
     def on_any_event(self, event):
         """Handle any file system event"""
-        # Only process markdown files
-        if not event.src_path.endswith('.md'):
-            return
+        # Keep the in-memory catalog current, including directory events and atomic-save renames
+        if self.vault is None and vault_catalog is not None:
+            try:
+                vault_catalog.apply_event(event)
+            except Exception as e:
+                logger.warning(f"Could not update vault catalog for {event.src_path}: {e}")
 
-        # Skip temporary files and hidden files
-        filename = os.path.basename(event.src_path)
-        if filename.startswith('.') or filename.startswith('~') or filename.endswith('.tmp'):
-            return
+        # Drop cached note text for anything that changed
+        if event.event_type in ('modified', 'moved', 'deleted'):
+            get_note_cache().invalidate(event.src_path)
 
         # Only react to actual file changes (not just opening files to read)
         if event.event_type not in ['created', 'modified', 'moved', 'deleted']:
             return
 
-        logger.info(f"📁 Vault file event: {event.event_type} - {event.src_path}")
-
         with self.lock:
-            self.update_queue.add(event.src_path)
-            self.last_update_time = time.time()
-
-            # Start update thread if not already running
-            if self.update_thread is None or not self.update_thread.is_alive():
-                self.update_thread = threading.Thread(target=self._delayed_update)
-                self.update_thread.daemon = True
-                self.update_thread.start()
-
-    def _delayed_update(self):
-        """Wait for a quiet period, then update the index"""
-        while True:
-            with self.lock:
-                time_since_last_change = time.time() - self.last_update_time
-
-                if time_since_last_change >= self.update_delay:
-                    if self.update_queue:
-                        files_changed = len(self.update_queue)
-                        self.update_queue.clear()
-                        break
-                    else:
-                        # No changes pending, exit thread
-                        return
+            if event.event_type == 'moved':
+                if not self._queue_move(event):
+                    return
+            elif event.is_directory:
+                return
+            elif not self._is_note(event.src_path):
+                return
+            elif event.event_type == 'deleted':
+                self.pending_changes.discard(event.src_path)
+                self.pending_deletes.add(event.src_path)
+            else:
+                self.pending_deletes.discard(event.src_path)
+                self.pending_changes.add(event.src_path)
+
+            logger.info(f"📁 Vault file event: {event.event_type} - {event.src_path}")
+
+            # Debounce: restart the quiet-period timer on every event
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.update_delay, self._flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def cancel(self):
+        """Drop queued changes and stop a pending flush from firing"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self.pending_moves, self.pending_changes, self.pending_deletes = [], set(), set()
+
+    def _queue_move(self, event) -> bool:
+        """Record a rename so existing chunks are relabelled instead of re-embedded (caller holds lock)"""
+        src, dest = event.src_path, event.dest_path
+
+        if event.is_directory:
+            self.pending_moves.append((src, dest, True))
+            # Pending edits inside the folder now live at the new location
+            prefix = src.rstrip(os.sep) + os.sep
+            self.pending_changes = {dest + path[len(src.rstrip(os.sep)):] if path.startswith(prefix) else path
+                                    for path in self.pending_changes}
+            return True
+
+        src_is_note, dest_is_note = self._is_note(src), self._is_note(dest)
+        if src_is_note and dest_is_note:
+            self.pending_moves.append((src, dest, False))
+            if src in self.pending_changes:
+                self.pending_changes.discard(src)
+                self.pending_changes.add(dest)
+        elif dest_is_note:
+            # Atomic save (write temp file, rename over the note) is an edit of the destination
+            self.pending_deletes.discard(dest)
+            self.pending_changes.add(dest)
+        elif src_is_note:
+            # Renamed to something we don't index
+            self.pending_changes.discard(src)
+            self.pending_deletes.add(src)
+        else:
+            return False
+        return True
 
-            # Wait a bit before checking again
-            time.sleep(0.5)
+    def _flush(self):
+        """Apply everything that happened during the quiet period to the index"""
+        with self.lock:
+            moves, self.pending_moves = self.pending_moves, []
+            changes, self.pending_changes = self.pending_changes, set()
+            deletes, self.pending_deletes = self.pending_deletes, set()
+            self.timer = None
 
-        # Perform the actual update
-        self._update_search_index(files_changed)
+        if moves or changes or deletes:
+            self._update_search_index(moves, changes, deletes)
 
-    def _update_search_index(self, files_changed: int):
-        """Update the search index incrementally"""
+    def _update_search_index(self, moves: list, changes: set, deletes: set):
+        """Update the search index for just the files that changed"""
         try:
-            if not vault_path:
+            if self.vault is not None:
+                rag = self.vault.rag
+            elif not vault_path:
                 logger.warning("⚠️ Cannot update index: vault not configured")
                 return
+            else:
+                from rag_service import get_rag_instance
+                rag = get_rag_instance()
 
-            logger.info(f"🔄 Auto-updating search index ({files_changed} files changed)...")
+            logger.info(f"🔄 Auto-updating search index{f' for vault {self.vault.name!r}' if self.vault else ''} "
+                        f"({len(moves)} moved, {len(changes)} changed, {len(deletes)} deleted)...")
 
-            from rag_service import get_rag_instance
-            rag = get_rag_instance()
-            num_chunks = rag.update_directory_incremental(str(vault_path))
+            moved_chunks = 0
+            for src, dest, is_directory in moves:
+                moved_chunks += rag.rename_source(src, dest, is_directory=is_directory)
+            if deletes:
+                rag.remove_files(deletes)
+            num_chunks = rag.index_files(path for path in changes if os.path.exists(path)) if changes else 0
 
-            logger.info(f"✅ Search index auto-updated with {num_chunks} chunks")
+            logger.info(f"✅ Search index auto-updated: {moved_chunks} chunks moved, {num_chunks} chunks re-embedded")
 
         except Exception as e:
             logger.error(f"❌ Failed to auto-update search index: {e}")
@@ -142,6 +220,36 @@ class VaultWatcher(FileSystemEventHandler):
 vault_watcher = None
 vault_observer = None
 
+# In-memory catalog of vault files, kept current by the watcher
+vault_catalog = None
+
+def read_note(entry: dict) -> str:
+    """Read a cataloged note through the shared content cache"""
+    return get_note_cache().read(entry['path'], entry['mtime'], entry['size'])
+
+def read_note_preview(entry: dict, max_chars: int) -> tuple[str, bool]:
+    """Read just the start of a cataloged note, returning (preview, truncated)"""
+    return get_note_cache().preview(entry['path'], max_chars, entry['mtime'], entry['size'])
+
+def build_vault_catalog():
+    """Build the vault catalog with a single walk of the vault"""
+    global vault_catalog
+
+    catalog_root = vault_path or os.getenv("FORGE_VAULT_PATH")
+    if not catalog_root or not os.path.exists(catalog_root):
+        vault_catalog = None
+        return
+
+    try:
+        catalog = VaultCatalog(catalog_root)
+        catalog.build()
+        vault_catalog = catalog
+        # Frontmatter, tasks and highlights are read after startup instead of during the walk
+        threading.Thread(target=catalog.load_contents, name="forge-catalog-contents", daemon=True).start()
+    except Exception as e:
+        logger.error(f"❌ Failed to build vault catalog: {e}")
+        vault_catalog = None
+
 def start_vault_watching():
     """Start watching the vault directory for changes"""
     global vault_watcher, vault_observer
@@ -173,18 +281,123 @@ def stop_vault_watching():
         vault_observer.join(timeout=1.0)
         logger.info("🛑 Stopped vault watching")
 
-# Initialize RAG service on startup
-try:
-    from rag_service import get_rag_instance
-    rag_instance = get_rag_instance()
-    logger.info("🚀 LangChain RAG service initialized")
-except Exception as e:
-    logger.error(f"Failed to initialize RAG service: {e}")
-    rag_instance = None
+# RAG engine, set by the background startup thread once the index is loaded
+rag_instance = None
+
+# Staged startup: /health answers immediately, heavy services come up in the background
+startup_state = {
+    "ready": False,
+    "stage": "starting",
+    "error": None,
+    "timings_ms": {},
+}
+services_ready = threading.Event()
+
+def initialize_services():
+    """Build the catalog, load the RAG engine and start watching, timing each stage"""
+    global rag_instance
+    timings = startup_state["timings_ms"]
+
+    def run_stage(name, func):
+        startup_state["stage"] = name
+        stage_started = time.perf_counter()
+        try:
+            return func()
+        finally:
+            timings[name] = round((time.perf_counter() - stage_started) * 1000, 1)
+
+    def load_rag():
+        # LangChain, Chroma and the Ollama client are only imported here, off the request path
+        from rag_service import get_rag_instance
+        return get_rag_instance()
+
+    # Registered vaults load on their own threads, independent of the primary vault and each other
+    vault_registry.start_all(VaultWatcher)
 
-# Start vault watching if vault is configured
-if vault_path:
-    start_vault_watching()
+    try:
+        run_stage("vault_catalog", build_vault_catalog)
+        try:
+            rag_instance = run_stage("rag_engine", load_rag)
+            logger.info("🚀 LangChain RAG service initialized")
+        except Exception as e:
+            logger.error(f"Failed to initialize RAG service: {e}")
+            startup_state["error"] = str(e)
+            rag_instance = None
+        if vault_path:
+            run_stage("vault_watcher", start_vault_watching)
+    finally:
+        startup_state["ready"] = rag_instance is not None
+        startup_state["stage"] = "ready" if rag_instance is not None else "degraded"
+        services_ready.set()
+        logger.info("⏱️ Startup breakdown: " + ", ".join(f"{name} {ms:.0f}ms" for name, ms in timings.items()))
+
+    get_index_maintenance().start_schedule(maintenance_targets)
+
+    # Catch up on edits made while the server was down; search is already being served
+    if rag_instance is not None and vault_path:
+        try:
+            run_stage("reconcile", reconcile_index)
+        except Exception as e:
+            logger.error(f"❌ Startup reconciliation failed: {e}")
+        finally:
+            startup_state["stage"] = "ready"
+
+    # Carry on with (or start) an embedding model migration once the index has caught up
+    if rag_instance is not None:
+        rag_instance.resume_embedding_migration()
+
+def reconcile_index(dry_run: bool = False) -> dict:
+    """Index only what differs between the vault on disk and the search index"""
+    disk_files = None
+    if vault_catalog is not None:
+        # The catalog already holds size and mtime for every note, no second walk needed
+        with vault_catalog.lock:
+            disk_files = {entry['path']: {'size': entry['size'], 'mtime': entry['mtime']}
+                          for entry in vault_catalog.entries.values()}
+    return get_index_reconciler().reconcile(rag_instance, str(vault_path), disk_files, dry_run=dry_run)
+
+def require_rag():
+    """Raise 503 while the search index is still loading"""
+    if not services_ready.is_set():
+        raise HTTPException(status_code=503, detail=f"Search index is still loading ({startup_state['stage']})",
+                            headers={"Retry-After": "1"})
+    if rag_instance is None:
+        raise HTTPException(status_code=503, detail=f"Search index unavailable: {startup_state['error']}")
+
+def require_vault_rag(name: Optional[str]):
+    """The index for a vault name (None or "default" is the primary vault), or 404/503"""
+    if name in (None, DEFAULT_VAULT):
+        require_rag()
+        return rag_instance
+    vault = vault_registry.get(name)
+    if vault is None:
+        raise HTTPException(status_code=404, detail=f"Unknown vault '{name}'")
+    if not vault.ready.is_set():
+        raise HTTPException(status_code=503, detail=f"Vault '{name}' is still loading ({vault.state['stage']})",
+                            headers={"Retry-After": "1"})
+    if vault.rag is None:
+        raise HTTPException(status_code=503, detail=f"Vault '{name}' unavailable: {vault.state['error']}")
+    return vault.rag
+
+def vault_root(name: Optional[str]) -> Optional[str]:
+    """Directory of a vault by name (None or "default" is the primary vault)"""
+    if name in (None, DEFAULT_VAULT):
+        return str(vault_path) if vault_path else None
+    vault = vault_registry.get(name)
+    return vault.path if vault else None
+
+def maintenance_targets() -> list:
+    """(name, index, vault root) for every loaded index, for scheduled compaction"""
+    return [(name, rag, vault_root(name)) for name, rag in searchable_vaults().items()]
+
+def searchable_vaults() -> dict:
+    """Name -> index for every vault that can answer a search right now"""
+    rags = {DEFAULT_VAULT: rag_instance} if rag_instance is not None and vault_path else {}
+    for name in vault_registry.names():
+        vault = vault_registry.get(name)
+        if vault is not None and vault.ready.is_set() and vault.rag is not None:
+            rags[name] = vault.rag
+    return rags
 
 class ChatMessage(BaseModel):
     message: str
@@ -195,6 +408,8 @@ class ChatResponse(BaseModel):
     response: str
     model: str
     session_id: str
+    queue_position: int = 0
+    queue_wait_ms: float = 0.0
 
 class DocumentUpload(BaseModel):
     filename: str
@@ -204,10 +419,29 @@ class DocumentUpload(BaseModel):
 class SearchRequest(BaseModel):
     query: str
     limit: int = 10
+    vault: Optional[str] = None  # A registered vault name, "all" for every vault, default the primary vault
 
 class VaultRequest(BaseModel):
     vault_directory: str
 
+class SnapshotRequest(BaseModel):
+    path: Optional[str] = None  # Snapshot file on this machine; export defaults to FORGE_SNAPSHOT_DIR
+
+class MigrationRequest(BaseModel):
+    model: Optional[str] = None  # Embedding model to migrate to; defaults to FORGE_EMBEDDING_MODEL
+
+class NamedVaultRequest(BaseModel):
+    name: str
+    vault_directory: str
+
+class NotesQuery(BaseModel):
+    filters: Dict = {}
+    fields: Optional[List[str]] = None
+    group_by: List[str] = []
+    sort: Optional[str] = None
+    limit: int = 100
+    exclude_folders: List[str] = []
+
 def perform_document_analysis(relevant_docs: List[Dict], query: str) -> str:
     """First pass: Analyze documents for patterns, relationships, and gaps"""
     if not relevant_docs:
@@ -257,45 +491,124 @@ def perform_document_analysis(relevant_docs: List[Dict], query: str) -> str:
     analysis_parts.append("")
     return "\n".join(analysis_parts)
 
-def get_daily_note_info(query_type: str) -> dict:
-    """Get information about daily notes from file system"""
+# Notes listed in full from a frontmatter match before the answer is summarized by counts only
+MAX_FRONTMATTER_NOTES = 40
+
+# Note templates carry placeholder frontmatter and shouldn't count as real notes
+TEMPLATE_FOLDERS = ['_templates', 'Templates']
+
+def get_frontmatter_context(message: str) -> List[str]:
+    """Exhaustive list of notes whose type/status/tags the message mentions"""
+    if vault_catalog is None:
+        return []
+
+    vault_catalog.load_contents()
+    filters = vault_catalog.frontmatter.filters_for_text(message)
+    if 'type' not in filters and 'tags' not in filters:
+        return []  # A status on its own ("active") is too broad to list
+
+    result = vault_catalog.query_notes(filters, fields=['type', 'status', 'tags'], group_by=['type', 'status'],
+                                       sort='type', limit=MAX_FRONTMATTER_NOTES,
+                                       exclude_folders=TEMPLATE_FOLDERS)
+    if not result['total']:
+        return []
+
+    description = ", ".join(f"{field}={'|'.join(values)}" for field, values in filters.items())
+    context_parts = [f"=== NOTES WITH {description.upper()} ({result['total']} total, complete list from frontmatter) ==="]
+    for note in result['notes']:
+        fields = note['fields']
+        details = ", ".join(f"{field}: {fields[field]}" for field in ('type', 'status') if field in fields)
+        context_parts.append(f"  {note['name']} ({note['folder']}) - {details}")
+    if result['total'] > len(result['notes']):
+        context_parts.append(f"  ... and {result['total'] - len(result['notes'])} more")
+    for field, counts in result['aggregations'].items():
+        summary = ", ".join(f"{value}: {count}" for value, count in counts.items() if value is not None)
+        if summary:
+            context_parts.append(f"By {field}: {summary}")
+    context_parts.append("")
+    return context_parts
+
+TASK_INTENT_PATTERN = re.compile(r'\b(tasks?|todos?|to-dos?|checkbox(es)?|open items|action items)\b')
+DONE_TASK_PATTERN = re.compile(r'\b(completed?|done|finished|checked off|closed)\b')
+
+# Tasks listed in full before the rest are summarized per note
+MAX_CONTEXT_TASKS = 60
+
+def is_task_query(message: str) -> bool:
+    """Whether a message asks about checkbox tasks"""
+    return bool(TASK_INTENT_PATTERN.search(message.lower()))
+
+def get_task_context(message: str) -> List[str]:
+    """Complete task list for a task question, scoped to a project when one is named"""
+    if vault_catalog is None:
+        return []
+
+    message_lower = message.lower()
+    state = 'done' if DONE_TASK_PATTERN.search(message_lower) else 'open'
+    vault_catalog.load_contents()
+    project = next((name for name in vault_catalog.tasks.projects() if name.lower() in message_lower), None)
+
+    result = vault_catalog.query_tasks(state=state, project=project, limit=MAX_CONTEXT_TASKS,
+                                       exclude_folders=TEMPLATE_FOLDERS)
+    scope = f" FOR PROJECT {project.upper()}" if project else ""
+    counts = ", ".join(f"{count} {name}" for name, count in sorted(result['counts'].items()))
+    context_parts = [f"=== {state.upper()} TASKS{scope} ({result['total']} total, complete list from checkboxes) ==="]
+    if counts:
+        context_parts.append(f"All tasks in scope: {counts}")
+
+    current_file = None
+    for task in result['tasks']:
+        if task['rel_path'] != current_file:
+            current_file = task['rel_path']
+            context_parts.append(f"📄 {current_file}")
+        mark = 'x' if task['state'] == 'done' else ' '
+        section = f" ({task['section']})" if task['section'] else ""
+        context_parts.append(f"{'  ' * (task['depth'] + 1)}- [{mark}] {task['text']}{section} [line {task['line']}]")
+    if result['total'] > len(result['tasks']):
+        context_parts.append(f"  ... and {result['total'] - len(result['tasks'])} more")
+    if not result['total']:
+        context_parts.append(f"No {state} checkbox tasks found")
+    context_parts.append("")
+    return context_parts
+
+def get_daily_note_info(query_type: str, preview_chars: Optional[int] = None) -> dict:
+    """Get information about daily notes from the vault catalog.
+
+    With preview_chars only the start of the note is read and 'content' holds the preview.
+    """
     try:
-        import os
-        import glob
-        from datetime import datetime, timedelta
-        
-        daily_path = os.path.join(vault_path, "Logs/Daily") if vault_path else None
-        if not daily_path or not os.path.exists(daily_path):
+        if vault_catalog is None:
             return {"error": "Daily notes directory not found"}
-            
-        # Get all daily note files sorted by date
-        pattern = os.path.join(daily_path, "*.md")
-        files = sorted(glob.glob(pattern), reverse=True)  # Most recent first
-        
+
+        # Daily notes sorted by date, most recent first
+        files = vault_catalog.daily_notes()
+
         if not files:
             return {"error": "No daily notes found"}
-            
+
         # Get the most recent file
         most_recent = files[0]
-        filename = os.path.basename(most_recent)
-        
+
         # Read the content
-        with open(most_recent, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
+        if preview_chars:
+            content, truncated = read_note_preview(most_recent, preview_chars)
+        else:
+            content, truncated = read_note(most_recent), False
+
         return {
-            "filename": filename,
-            "path": most_recent,
+            "filename": most_recent['name'],
+            "path": most_recent['path'],
             "content": content,
+            "truncated": truncated,
             "count": len(files)
         }
-        
+
     except Exception as e:
         logger.error(f"Error getting daily note info: {e}")
         return {"error": str(e)}
 
-# Global cache for vault metadata
-vault_metadata_cache = {"data": None, "last_updated": None}
+# Cap on daily notes included for date-range questions
+MAX_RANGE_DAILY_NOTES = 14
 
 def get_context_strategy(query: str) -> dict:
     """Determine context strategy based on query patterns"""
@@ -322,198 +635,266 @@ def get_context_strategy(query: str) -> dict:
     }
 
 def get_vault_metadata() -> dict:
-    """Get or update cached vault metadata"""
+    """Get vault metadata from the watcher-maintained catalog (always current)"""
     from datetime import datetime, timedelta
-    import os
-    import glob
 
-    # Check if cache is fresh (update every 5 minutes)
-    now = datetime.now()
-    if (vault_metadata_cache["last_updated"] and
-        now - vault_metadata_cache["last_updated"] < timedelta(minutes=5)):
-        return vault_metadata_cache["data"]
-
-    # Use global vault_path or fallback to default
-    current_vault_path = vault_path or os.getenv("FORGE_VAULT_PATH", "./example-vault")
-
-    if not current_vault_path or not os.path.exists(current_vault_path):
+    if vault_catalog is None:
         return {"error": "Vault not configured"}
 
     try:
-        metadata = {}
+        now = datetime.now()
 
-        # Count files by directory
-        for root, dirs, files in os.walk(current_vault_path):
-            if files:
-                relative_path = os.path.relpath(root, current_vault_path)
-                md_files = [f for f in files if f.endswith('.md')]
-                if md_files:
-                    metadata[relative_path] = len(md_files)
+        # Per-directory counts and the recent-files heap are updated on every watcher event
+        metadata = vault_catalog.directory_counts()
 
         # Get recent files (last 7 days)
-        recent_files = []
         week_ago = now - timedelta(days=7)
-        for root, dirs, files in os.walk(current_vault_path):
-            for file in files:
-                if file.endswith('.md'):
-                    file_path = os.path.join(root, file)
-                    try:
-                        mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
-                        if mtime > week_ago:
-                            rel_path = os.path.relpath(file_path, current_vault_path)
-                            recent_files.append({'file': rel_path, 'modified': mtime})
-                    except:
-                        continue
+        recent_files = [
+            {'file': entry['rel_path'], 'modified': datetime.fromtimestamp(entry['mtime'])}
+            for entry in vault_catalog.recent_files(week_ago.timestamp(), limit=10)  # Top 10 recent files
+        ]
 
-        recent_files.sort(key=lambda x: x['modified'], reverse=True)
-
-        vault_metadata_cache["data"] = {
+        return {
             'directory_counts': metadata,
             'total_files': sum(metadata.values()),
-            'recent_files': recent_files[:10],  # Top 10 recent files
+            'recent_files': recent_files,
             'last_updated': now
         }
-        vault_metadata_cache["last_updated"] = now
-
-        return vault_metadata_cache["data"]
 
     except Exception as e:
         logger.error(f"Error getting vault metadata: {e}")
         return {"error": str(e)}
 
+MONTH_NAMES = {'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+               'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12}
+
+# "august 25", "august 25th, 2024" or "2025-08-25"
+DATE_TOKEN_PATTERN = re.compile(
+    r'\b(' + '|'.join(MONTH_NAMES) + r')\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?\b|\b(\d{4})-(\d{1,2})-(\d{1,2})\b'
+)
+
+def _resolve_month_day(month: int, day: int, year: Optional[int], today: date) -> Optional[date]:
+    """Turn a month/day (and optional year) into a date, preferring years that have a daily note"""
+    if year:
+        try:
+            return date(year, month, day)
+        except ValueError:
+            return None
+
+    # No year given: use the most recent year with a daily note on that day
+    year_range = vault_catalog.note_year_range(DAILY_FOLDER) if vault_catalog else None
+    if year_range:
+        for candidate_year in range(year_range[1], year_range[0] - 1, -1):
+            try:
+                candidate = date(candidate_year, month, day)
+            except ValueError:
+                continue
+            if vault_catalog.notes_on(DAILY_FOLDER, candidate):
+                return candidate
+
+    # Otherwise the most recent occurrence that isn't in the future
+    for candidate_year in (today.year, today.year - 1):
+        try:
+            candidate = date(candidate_year, month, day)
+        except ValueError:
+            continue
+        if candidate <= today:
+            return candidate
+    return None
+
+def _find_dates(query_lower: str, today: date) -> List[tuple]:
+    """All dates mentioned in a query as (date, match start, match end)"""
+    found = []
+    for match in DATE_TOKEN_PATTERN.finditer(query_lower):
+        if match.group(1):
+            resolved = _resolve_month_day(MONTH_NAMES[match.group(1)], int(match.group(2)),
+                                          int(match.group(3)) if match.group(3) else None, today)
+        else:
+            try:
+                resolved = date(int(match.group(4)), int(match.group(5)), int(match.group(6)))
+            except ValueError:
+                resolved = None
+        if resolved:
+            found.append((resolved, match.start(), match.end()))
+    return found
+
+def parse_temporal_query(query: str, today: Optional[date] = None) -> Optional[dict]:
+    """Work out which date range a temporal question is about.
+
+    Returns {'kind': 'week' | 'range' | 'day', 'start': date, 'end': date} or None.
+    """
+    today = today or date.today()
+    query_lower = query.lower()
+
+    def week_of(day: date) -> dict:
+        monday = day - timedelta(days=day.weekday())
+        return {'kind': 'week', 'start': monday, 'end': monday + timedelta(days=6)}
+
+    # ISO week ids: "2025-W35" or "week 35 (of 2025)"
+    iso_week = re.search(r'\b(\d{4})-w(\d{1,2})\b', query_lower)
+    week_number = re.search(r'\bweek\s+(\d{1,2})(?:\s+of\s+(\d{4}))?\b', query_lower)
+    for match, year_group, week_group in ((iso_week, 1, 2), (week_number, 2, 1)):
+        if match:
+            year = int(match.group(year_group)) if match.group(year_group) else today.year
+            try:
+                return week_of(date.fromisocalendar(year, int(match.group(week_group)), 1))
+            except ValueError:
+                pass
+
+    dates = _find_dates(query_lower, today)
+
+    # "week of august 25"
+    for day, match_start, _ in dates:
+        if re.search(r'week\s+of\s+$', query_lower[:match_start]):
+            return week_of(day)
+
+    # "between august 18 and august 24" / "from 2025-08-18 to 2025-08-24"
+    if len(dates) >= 2 and re.search(r'\b(between|from)\b', query_lower):
+        start, end = sorted((dates[0][0], dates[1][0]))
+        return {'kind': 'range', 'start': start, 'end': end}
+
+    # "last 10 days" / "past 2 weeks"
+    last_n = re.search(r'\b(?:last|past)\s+(\d{1,3})\s+(day|week)s?\b', query_lower)
+    if last_n:
+        days = int(last_n.group(1)) * (7 if last_n.group(2) == 'week' else 1)
+        return {'kind': 'range', 'start': today - timedelta(days=max(days, 1) - 1), 'end': today}
+
+    if re.search(r'\bthis\s+week\b', query_lower):
+        return week_of(today)
+    if re.search(r'\blast\s+week\b', query_lower):
+        return week_of(today - timedelta(days=7))
+
+    if dates:
+        return {'kind': 'day', 'start': dates[0][0], 'end': dates[0][0]}
+    if 'yesterday' in query_lower:
+        yesterday = today - timedelta(days=1)
+        return {'kind': 'day', 'start': yesterday, 'end': yesterday}
+
+    return None
+
 def get_temporal_context(query: str, strategy: dict) -> tuple[list, bool]:
     """Get context focused on temporal/recent activities"""
     context_parts = []
 
     try:
-        import os
-        import glob
-        import re
-        from datetime import datetime, timedelta
-
-        daily_path = os.path.join(vault_path, "Logs/Daily") if vault_path else None
-        if not daily_path or not os.path.exists(daily_path):
+        if not vault_path or vault_catalog is None:
             return context_parts, False
 
-        # Check if query mentions a week
-        week_match = re.search(r'week\s+of\s+(january|february|march|april|may|june|july|august|september|october|november|december)\s*(\d{1,2})', query.lower())
+        period = parse_temporal_query(query)
+        logger.info(f"🗓️ Date detection for '{query}': {period}")
 
-        # Check if query mentions a specific date
-        date_match = re.search(r'(january|february|march|april|may|june|july|august|september|october|november|december)\s*(\d{1,2})|(\d{4}-\d{2}-\d{2})', query.lower())
-        logger.info(f"🗓️ Date detection for '{query}': week_match={week_match is not None}, date_match={date_match is not None}")
+        if period and period['kind'] == 'week':
+            monday, sunday = period['start'], period['end']
+            year, week_num, _ = monday.isocalendar()
+            week_id = f"{year}-W{week_num:02d}"
 
-        if week_match:
-            # Weekly query - find the week containing the specified date
-            month_names = {'january': '01', 'february': '02', 'march': '03', 'april': '04', 'may': '05', 'june': '06',
-                          'july': '07', 'august': '08', 'september': '09', 'october': '10', 'november': '11', 'december': '12'}
+            context_parts.append(f"=== ACTIVITIES DURING WEEK {week_id} ===")
+            context_parts.append(f"NOTE: The user is asking about activities during the week {week_id}.")
+            context_parts.append(f"Week dates: {monday.isoformat()} to {sunday.isoformat()}")
+            context_parts.append("")
 
-            month = month_names.get(week_match.group(1).lower())
-            day = week_match.group(2).zfill(2) if week_match.group(2) else None
-            logger.info(f"🗓️ Parsed week query: month={month}, day={day}")
+            # Try to find and include the weekly note
+            weekly_entry = vault_catalog.weekly_note_for(monday)
+            logger.info(f"🗓️ Looking for weekly note {week_id}, exists={weekly_entry is not None}")
 
-            if month and day:
-                from datetime import datetime, timedelta
-                import calendar
+            if weekly_entry:
+                try:
+                    weekly_content, _ = read_note_preview(weekly_entry, 1200)  # Reduced weekly content for efficiency
+                    context_parts.append(f"📊 Weekly summary ({week_id}):")
+                    context_parts.append(weekly_content)
+                    context_parts.append("")
+                    logger.info(f"🗓️ Added weekly note {week_id}, size={weekly_entry['size']}")
+                except Exception as e:
+                    logger.warning(f"Could not read weekly note {week_id}: {e}")
 
-                target_date_str = f"2025-{month}-{day}"
-                target_date = datetime.strptime(target_date_str, "%Y-%m-%d")
+            # Include all daily notes from this week
+            daily_content_found = False
+            for daily_entry in vault_catalog.notes_between(DAILY_FOLDER, monday, sunday):
+                note_day = daily_entry['note_date'].isoformat()
+                try:
+                    daily_content, _ = read_note_preview(daily_entry, 800)  # Reduced content per day for efficiency
+                    context_parts.append(f"📅 Daily note from {note_day}:")
+                    context_parts.append(daily_content)
+                    context_parts.append("")
+                    daily_content_found = True
+                    logger.info(f"🗓️ Added daily note {note_day}, size={daily_entry['size']}")
+                except Exception as e:
+                    logger.warning(f"Could not read daily note {note_day}: {e}")
 
-                # Calculate ISO week number
-                year, week_num, weekday = target_date.isocalendar()
-                week_id = f"{year}-W{week_num:02d}"
-                logger.info(f"🗓️ Target date {target_date_str} is in {week_id}")
+            if daily_content_found or weekly_entry:
+                logger.info(f"🗓️ Returning weekly content for {week_id}")
+                return context_parts, True  # True = found specific week content
 
-                # Find the Monday of this week
-                monday = target_date - timedelta(days=target_date.weekday())
-                week_dates = [monday + timedelta(days=i) for i in range(7)]
+        elif period and period['kind'] == 'range':
+            start, end = period['start'], period['end']
+            daily_entries = vault_catalog.notes_between(DAILY_FOLDER, start, end)
+            weekly_entries = vault_catalog.notes_between(WEEKLY_FOLDER, start - timedelta(days=6), end)
 
-                context_parts.append(f"=== ACTIVITIES DURING WEEK OF {target_date_str} ({week_id}) ===")
-                context_parts.append(f"NOTE: The user is asking about activities during the week containing {target_date_str}.")
-                context_parts.append(f"Week dates: {monday.strftime('%Y-%m-%d')} to {(monday + timedelta(days=6)).strftime('%Y-%m-%d')}")
+            if daily_entries or weekly_entries:
+                context_parts.append(f"=== ACTIVITIES FROM {start.isoformat()} TO {end.isoformat()} ===")
+                context_parts.append(f"NOTE: The user is asking about activities between {start.isoformat()} and {end.isoformat()}.")
                 context_parts.append("")
 
-                # Try to find and include the weekly note
-                weekly_path = os.path.join(vault_path, "Logs/Weekly") if vault_path else None
-                if weekly_path and os.path.exists(weekly_path):
-                    weekly_file = os.path.join(weekly_path, f"{week_id}.md")
-                    logger.info(f"🗓️ Looking for weekly file: {weekly_file}, exists={os.path.exists(weekly_file)}")
-
-                    if os.path.exists(weekly_file):
-                        try:
-                            with open(weekly_file, 'r', encoding='utf-8') as f:
-                                weekly_content = f.read()
-                            context_parts.append(f"📊 Weekly summary ({week_id}):")
-                            context_parts.append(weekly_content[:1200])  # Reduced weekly content for efficiency
-                            context_parts.append("")
-                            logger.info(f"🗓️ Added weekly note {week_id}, length={len(weekly_content)}")
-                        except Exception as e:
-                            logger.warning(f"Could not read weekly file {weekly_file}: {e}")
-
-                # Include all daily notes from this week
-                daily_content_found = False
-                for date_obj in week_dates:
-                    daily_file = os.path.join(daily_path, f"{date_obj.strftime('%Y-%m-%d')}.md")
-                    if os.path.exists(daily_file):
-                        try:
-                            with open(daily_file, 'r', encoding='utf-8') as f:
-                                daily_content = f.read()
-                            context_parts.append(f"📅 Daily note from {date_obj.strftime('%Y-%m-%d')}:")
-                            context_parts.append(daily_content[:800])  # Reduced content per day for efficiency
-                            context_parts.append("")
-                            daily_content_found = True
-                            logger.info(f"🗓️ Added daily note {date_obj.strftime('%Y-%m-%d')}, length={len(daily_content)}")
-                        except Exception as e:
-                            logger.warning(f"Could not read daily file {daily_file}: {e}")
-
-                if daily_content_found or os.path.exists(weekly_file):
-                    logger.info(f"🗓️ Returning weekly content for {week_id}")
-                    return context_parts, True  # True = found specific week content
-
-        elif date_match:
-            # Specific date query - try to find that exact date
-            month_names = {'january': '01', 'february': '02', 'march': '03', 'april': '04', 'may': '05', 'june': '06',
-                          'july': '07', 'august': '08', 'september': '09', 'october': '10', 'november': '11', 'december': '12'}
-
-            if date_match.group(1):  # Month name format
-                month = month_names.get(date_match.group(1).lower())
-                day = date_match.group(2).zfill(2) if date_match.group(2) else None
-                logger.info(f"🗓️ Parsed date: month={month}, day={day}")
-                if month and day:
-                    target_date = f"2025-{month}-{day}"
-                    target_file = os.path.join(daily_path, f"{target_date}.md")
-                    logger.info(f"🗓️ Looking for file: {target_file}, exists={os.path.exists(target_file)}")
-
-                    if os.path.exists(target_file):
-                        context_parts.append(f"=== ACTIVITIES ON {target_date} (PAST DATE) ===")
-                        context_parts.append("NOTE: The user is asking about activities that happened on this specific past date.")
+                for weekly_entry in weekly_entries[-2:]:
+                    try:
+                        weekly_content, _ = read_note_preview(weekly_entry, 800)
+                        context_parts.append(f"📊 Weekly summary ({weekly_entry['name'][:-3]}):")
+                        context_parts.append(weekly_content)
                         context_parts.append("")
-                        try:
-                            with open(target_file, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                            context_parts.append(f"📅 Daily note from {target_date}:")
-                            context_parts.append(content[:2000])  # More content for specific dates
-                            context_parts.append("")
-                            logger.info(f"🗓️ Returning specific date content for {target_date}, length={len(content)}")
-                            return context_parts, True  # True = found specific date content
-                        except Exception as e:
-                            logger.warning(f"Could not read {target_file}: {e}")
+                    except Exception as e:
+                        logger.warning(f"Could not read weekly note {weekly_entry['name']}: {e}")
+
+                # Most recent days first, with a shared budget so long ranges stay compact
+                selected = daily_entries[-MAX_RANGE_DAILY_NOTES:]
+                preview_length = max(200, 6000 // max(len(selected), 1))
+                for daily_entry in reversed(selected):
+                    note_day = daily_entry['note_date'].isoformat()
+                    try:
+                        daily_content, _ = read_note_preview(daily_entry, preview_length)
+                        context_parts.append(f"📅 Daily note from {note_day}:")
+                        context_parts.append(daily_content)
+                        context_parts.append("")
+                    except Exception as e:
+                        logger.warning(f"Could not read daily note {note_day}: {e}")
+
+                if len(daily_entries) > len(selected):
+                    context_parts.append(f"({len(daily_entries) - len(selected)} earlier daily notes in this range omitted)")
+                    context_parts.append("")
+
+                logger.info(f"🗓️ Returning {len(selected)} daily notes for {start} to {end}")
+                return context_parts, True
+
+        elif period and period['kind'] == 'day':
+            target_date = period['start'].isoformat()
+            target_entries = vault_catalog.notes_on(DAILY_FOLDER, period['start'])
+            logger.info(f"🗓️ Looking for daily note {target_date}, exists={bool(target_entries)}")
+
+            if target_entries:
+                context_parts.append(f"=== ACTIVITIES ON {target_date} (PAST DATE) ===")
+                context_parts.append("NOTE: The user is asking about activities that happened on this specific past date.")
+                context_parts.append("")
+                try:
+                    content, _ = read_note_preview(target_entries[0], 2000)  # More content for specific dates
+                    context_parts.append(f"📅 Daily note from {target_date}:")
+                    context_parts.append(content)
+                    context_parts.append("")
+                    logger.info(f"🗓️ Returning specific date content for {target_date}, size={target_entries[0]['size']}")
+                    return context_parts, True  # True = found specific date content
+                except Exception as e:
+                    logger.warning(f"Could not read daily note {target_date}: {e}")
 
         # Fall back to recent daily notes
-        pattern = os.path.join(daily_path, "*.md")
-        files = sorted(glob.glob(pattern), reverse=True)[:7]  # Last 7 days
+        files = vault_catalog.daily_notes(limit=7)  # Last 7 days
 
         if files:
             context_parts.append("=== RECENT DAILY ACTIVITY ===")
-            for i, file_path in enumerate(files[:3]):  # Show top 3
-                filename = os.path.basename(file_path)
+            for i, entry in enumerate(files[:3]):  # Show top 3
+                filename = entry['name']
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-
                     # Extract key info from daily note
                     preview_length = 400 if i == 0 else 200  # More detail for most recent
-                    preview = content[:preview_length]
-                    if len(content) > preview_length:
+                    preview, truncated = read_note_preview(entry, preview_length)
+                    if truncated:
                         preview += "..."
 
                     context_parts.append(f"📅 {filename}:")
@@ -524,51 +905,34 @@ def get_temporal_context(query: str, strategy: dict) -> tuple[list, bool]:
                     continue
 
         # Include weekly notes if available
-        weekly_path = os.path.join(vault_path, "Logs/Weekly") if vault_path else None
-        if weekly_path and os.path.exists(weekly_path):
-            pattern = os.path.join(weekly_path, "*.md")
-            files = sorted(glob.glob(pattern), reverse=True)[:2]  # Last 2 weeks
-
-            if files:
-                context_parts.append("=== RECENT WEEKLY SUMMARIES ===")
-                for file_path in files:
-                    filename = os.path.basename(file_path)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-
-                        # Extract highlights and decisions from weekly notes
-                        lines = content.split('\n')
-                        relevant_lines = []
-                        for line in lines:
-                            if any(keyword in line.lower() for keyword in ['highlight', 'decision', 'project', 'progress']):
-                                relevant_lines.append(line)
-
-                        if relevant_lines:
-                            context_parts.append(f"📊 {filename}:")
-                            context_parts.extend(relevant_lines[:5])  # Top 5 relevant lines
-                            context_parts.append("")
-                    except Exception as e:
-                        logger.warning(f"Could not read {filename}: {e}")
-                        continue
+        files = vault_catalog.weekly_notes(limit=2)  # Last 2 weeks
+
+        if files:
+            context_parts.append("=== RECENT WEEKLY SUMMARIES ===")
+            for entry in files:
+                filename = entry['name']
+                # Highlights and decisions are extracted once by the catalog when the note changes
+                relevant_lines = vault_catalog.highlights(entry)
+                if relevant_lines:
+                    context_parts.append(f"📊 {filename}:")
+                    context_parts.extend(relevant_lines[:5])  # Top 5 relevant lines
+                    context_parts.append("")
 
     except Exception as e:
         logger.error(f"Error getting temporal context: {e}")
 
     return context_parts, False  # False = general recent notes, not specific date
 
-def build_conversation_context(session_id: str, new_message: str) -> str:
+def build_conversation_context(session_id: str, new_message: str, strategy: Optional[dict] = None) -> str:
     """Build smart conversation context based on query type and patterns"""
-    if session_id not in conversations:
-        conversations[session_id] = []
-
     # Determine context strategy based on query patterns
-    strategy = get_context_strategy(new_message)
+    if strategy is None:
+        strategy = get_context_strategy(new_message)
     logger.info(f"Query strategy: {strategy['primary']} (scores: {strategy['scores']})")
 
     # Get recent conversation history (adaptive based on strategy)
     history_limit = 2 if strategy['primary'] == 'structural' else 3
-    recent_messages = conversations[session_id][-history_limit:] if conversations[session_id] else []
+    recent_messages = conversations.recent(session_id, history_limit)
 
     # Build context string
     context_parts = []
@@ -587,6 +951,10 @@ def build_conversation_context(session_id: str, new_message: str) -> str:
     context_parts.append(f"Vault path: {vault_path if vault_path else 'Not configured'}")
     context_parts.append("")
 
+    # Task questions get the exact checkbox list instead of relying on chunks that happen to contain tasks
+    task_context = get_task_context(new_message) if is_task_query(new_message) else []
+    context_parts.extend(task_context)
+
     # Strategy-based context selection
     if strategy['primary'] == 'temporal':
         # Temporal queries get extensive daily/weekly note context
@@ -643,20 +1011,28 @@ def build_conversation_context(session_id: str, new_message: str) -> str:
                     context_parts.append(f"  {item['file']} ({modified_str})")
             context_parts.append("")
 
+        # Exact, whole-vault answers for list-style questions ("all my hardware")
+        context_parts.extend(get_frontmatter_context(new_message))
+
         # Include current daily note for context
         if vault_path:
-            daily_info = get_daily_note_info('daily_note')
+            daily_info = get_daily_note_info('daily_note', preview_chars=400)
             if "error" not in daily_info:
                 context_parts.append("=== TODAY'S ACTIVITY ===")
                 context_parts.append(f"Current daily note: {daily_info['filename']}")
-                preview = daily_info['content'][:400]
-                if len(daily_info['content']) > 400:
+                preview = daily_info['content']
+                if daily_info['truncated']:
                     preview += "..."
                 context_parts.append(preview)
                 context_parts.append("")
 
     elif strategy['primary'] == 'project':
-        # Project queries get daily notes + project-focused search
+        # Project queries get the project list from frontmatter, daily notes + project-focused search
+        project_list = get_frontmatter_context(new_message)
+        if not project_list and vault_catalog is not None:
+            project_list = get_frontmatter_context("project")
+        context_parts.extend(project_list)
+
         if vault_path:
             daily_info = get_daily_note_info('daily_note')
             if "error" not in daily_info:
@@ -680,7 +1056,7 @@ def build_conversation_context(session_id: str, new_message: str) -> str:
         # Enhanced search for project-related documents
         if rag_instance and vault_path:
             try:
-                from rag_service import search_documents
+                from rag_service import search_documents, collapse_near_duplicates
                 # Determine search limit based on query type
                 search_limit = 4  # Default
                 if strategy['primary'] == 'structural':
@@ -688,7 +1064,8 @@ def build_conversation_context(session_id: str, new_message: str) -> str:
                 elif strategy['primary'] == 'project':
                     search_limit = 8   # More for project queries
 
-                relevant_docs = search_documents(new_message, limit=search_limit)
+                # Collapse overlapping and templated chunks, keeping the highest-scoring copy
+                relevant_docs = collapse_near_duplicates(search_documents(new_message, limit=search_limit))
 
                 # For inventory/structural queries, enhance search but avoid overwhelming context
                 if strategy['primary'] == 'structural' and any(term in new_message.lower() for term in ['hardware', 'inventory', 'all my', 'what do i have']):
@@ -705,7 +1082,7 @@ def build_conversation_context(session_id: str, new_message: str) -> str:
                     # Only add non-duplicate docs from additional search
                     if additional_docs and relevant_docs:
                         seen_files = {doc['filename'] for doc in relevant_docs}
-                        for doc in additional_docs:
+                        for doc in collapse_near_duplicates(additional_docs):
                             if doc['filename'] not in seen_files and len(relevant_docs) < 10:
                                 relevant_docs.append(doc)
 
@@ -738,12 +1115,12 @@ def build_conversation_context(session_id: str, new_message: str) -> str:
     else:
         # Default/specific queries use original approach with slight enhancements
         if vault_path:
-            daily_info = get_daily_note_info('daily_note')
+            daily_info = get_daily_note_info('daily_note', preview_chars=300)  # Shorter for specific queries
             if "error" not in daily_info:
                 context_parts.append("=== TODAY'S CONTEXT ===")
                 context_parts.append(f"Current daily note: {daily_info['filename']}")
-                preview = daily_info['content'][:300]  # Shorter for specific queries
-                if len(daily_info['content']) > 300:
+                preview = daily_info['content']
+                if daily_info['truncated']:
                     preview += "..."
                 context_parts.append(preview)
                 context_parts.append("")
@@ -830,12 +1207,19 @@ def build_conversation_context(session_id: str, new_message: str) -> str:
     context_parts.append("• If tasks/info aren't in provided chunks, say 'No tasks found in available content'")
     context_parts.append("• Each 📄 section above is a separate chunk from the document")
     context_parts.append("")
-    context_parts.append("TASK DETECTION RULES:")
-    context_parts.append("• Tasks are ONLY markdown checkboxes: `- [ ]` (open) and `- [x]` (completed)")
-    context_parts.append("• NEVER infer tasks from goals, decisions, or descriptions")
-    context_parts.append("• If no checkbox tasks visible in chunks, report 'No checkbox tasks found'")
-    context_parts.append("• Only list tasks that literally use `[ ]` or `[x]` syntax")
-    context_parts.append("")
+    if task_context:
+        context_parts.append("TASK LIST:")
+        context_parts.append("• The TASKS section above is the COMPLETE list of checkbox tasks in scope, read from the vault")
+        context_parts.append("• Answer task questions from that list; do not add tasks that are not in it")
+        context_parts.append("")
+    else:
+        # Rules for spotting tasks in chunks; not needed when the task index supplied the list
+        context_parts.append("TASK DETECTION RULES:")
+        context_parts.append("• Tasks are ONLY markdown checkboxes: `- [ ]` (open) and `- [x]` (completed)")
+        context_parts.append("• NEVER infer tasks from goals, decisions, or descriptions")
+        context_parts.append("• If no checkbox tasks visible in chunks, report 'No checkbox tasks found'")
+        context_parts.append("• Only list tasks that literally use `[ ]` or `[x]` syntax")
+        context_parts.append("")
     context_parts.append("FRONTMATTER CONTEXT:")
     context_parts.append("• Documents have YAML frontmatter with metadata: type, status, tags, created")
     context_parts.append("• type: project = may contain task lists for project work")
@@ -885,57 +1269,77 @@ async def root():
 
 @app.post("/preload-model")
 async def preload_model(model_request: dict):
-    """Pre-load a model to avoid delays during chat"""
+    """Pre-load a model and pin it in memory to avoid delays during chat"""
     try:
         model_name = model_request.get("model")
         if not model_name:
             return {"error": "Model name required"}
 
         logger.info(f"🔄 Pre-loading model: {model_name}")
+        result = get_model_manager().ensure_loaded(model_name)
+        logger.info(f"✅ Model {model_name} pre-loaded successfully ({result['status']})")
+        return {
+            "status": "success",
+            "message": f"Model {model_name} loaded",
+            "load_latency_ms": result["load_latency_ms"]
+        }
 
-        # Send a minimal request to load the model
-        ollama_response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": model_name,
-                "prompt": "Hello",
-                "stream": False
-            },
-            timeout=60
-        )
-
-        if ollama_response.status_code == 200:
-            logger.info(f"✅ Model {model_name} pre-loaded successfully")
-            return {"status": "success", "message": f"Model {model_name} loaded"}
-        else:
-            logger.error(f"❌ Failed to pre-load model {model_name}: {ollama_response.text}")
-            return {"error": f"Failed to load model: {ollama_response.text}"}
-
+    except requests.exceptions.HTTPError as e:
+        logger.error(f"❌ Failed to pre-load model {model_name}: {e}")
+        return {"error": f"Failed to load model: {e}"}
     except Exception as e:
         logger.error(f"Error pre-loading model: {e}")
         return {"error": str(e)}
 
+@app.get("/models/loaded")
+async def loaded_models():
+    """Report which models are resident in Ollama and their load latency"""
+    return get_model_manager().status()
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(chat_message: ChatMessage):
     """Handle chat messages and communicate with Ollama"""
+    scheduler = get_generation_scheduler()
+    ticket = None
     try:
+        start_time = time.time()
+
         # Generate session ID if not provided
         session_id = chat_message.session_id or str(uuid.uuid4())
 
+        # Route by query strategy (fast model for lookups, large model for reasoning)
+        strategy = get_context_strategy(chat_message.message)
+        routing = get_model_router().route(chat_message.model, strategy)
+        model = routing["model"]
+
         # Log the model being used
-        logger.info(f"🤖 Using model: {chat_message.model} for query: {chat_message.message[:50]}...")
+        logger.info(f"🤖 Using model: {model} for query: {chat_message.message[:50]}...")
 
-        # Build conversation context
-        context_prompt = build_conversation_context(session_id, chat_message.message)
+        # Build conversation context (off the event loop so queued requests stay responsive)
+        context_prompt = await run_in_threadpool(build_conversation_context, session_id, chat_message.message, strategy)
         logger.info(f"🎯 Context prompt (first 500 chars): {context_prompt[:500]}...")
 
+        # Wait for a generation slot for this model
+        ticket = await scheduler.acquire(model, session_id)
+        if ticket.queue_position:
+            logger.info(f"⏱️ Started {model} generation after {ticket.wait_ms:.0f}ms in queue")
+
+        # Make sure the model is warm, evicting idle models if over the RAM budget
+        model_manager = get_model_manager()
+        try:
+            await run_in_threadpool(model_manager.ensure_loaded, model)
+        except Exception as e:
+            logger.warning(f"Could not preload {model}, generation will load it: {e}")
+
         # Send request to Ollama
-        ollama_response = requests.post(
+        ollama_response = await run_in_threadpool(
+            requests.post,
             "http://localhost:11434/api/generate",
             json={
-                "model": chat_message.model,
+                "model": model,
                 "prompt": context_prompt,
-                "stream": False
+                "stream": False,
+                "keep_alive": model_manager.keep_alive
             },
             timeout=120
         )
@@ -948,12 +1352,11 @@ async def chat(chat_message: ChatMessage):
         
         result = ollama_response.json()
         ai_response = result.get("response", "No response from model")
+        model_manager.record_generation(model, result)
+        get_model_router().record(routing, (time.time() - start_time) * 1000)
         
-        # Store conversation in simple memory
-        if session_id not in conversations:
-            conversations[session_id] = []
-        
-        conversations[session_id].append({
+        # Store conversation in bounded memory
+        conversations.append(session_id, {
             "human": chat_message.message,
             "assistant": ai_response,
             "timestamp": datetime.now().isoformat()
@@ -961,10 +1364,25 @@ async def chat(chat_message: ChatMessage):
         
         return ChatResponse(
             response=ai_response,
-            model=chat_message.model,
-            session_id=session_id
+            model=model,
+            session_id=session_id,
+            queue_position=ticket.queue_position,
+            queue_wait_ms=ticket.wait_ms
         )
         
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(scheduler.retry_after(e.model))}
+        )
+    except QueueTimeoutError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
     except requests.exceptions.ConnectionError:
         raise HTTPException(
             status_code=503, 
@@ -980,11 +1398,29 @@ async def chat(chat_message: ChatMessage):
             status_code=500, 
             detail=f"Internal server error: {str(e)}"
         )
+    finally:
+        if ticket is not None:
+            scheduler.release(ticket)
+
+@app.get("/scheduler/status")
+async def scheduler_status():
+    """Generation queue depth, active slots and wait times per model"""
+    return get_generation_scheduler().status()
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "ok", "message": "AI server is running"}
+    """Health check endpoint, answered before the search index has finished loading"""
+    return {
+        "status": "ok",
+        "message": "AI server is running",
+        "ready": startup_state["ready"],
+        "stage": startup_state["stage"],
+    }
+
+@app.get("/startup-status")
+async def startup_status():
+    """Readiness and per-stage startup timings"""
+    return startup_state
 
 @app.get("/models")
 async def list_models():
@@ -998,32 +1434,110 @@ async def list_models():
     except:
         return {"models": []}
 
+@app.get("/conversations/stats")
+async def conversation_stats():
+    """Conversation store memory usage and eviction counters"""
+    return conversations.stats()
+
+@app.get("/cache/notes")
+async def note_cache_stats():
+    """Note content cache hit rate and memory usage"""
+    return get_note_cache().stats()
+
+@app.get("/models/routing")
+async def routing_stats():
+    """Routing decisions and answer latency per model and strategy"""
+    return get_model_router().stats()
+
+@app.post("/notes/query")
+async def query_notes(request: NotesQuery):
+    """Exact frontmatter filters and aggregations over every note, no embeddings involved"""
+    if not 1 <= request.limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be 1-1000")
+    if vault_catalog is None:
+        raise HTTPException(status_code=400, detail="No vault directory configured")
+
+    try:
+        # The first query after startup waits for the catalog to finish reading notes
+        return await run_in_threadpool(vault_catalog.query_notes, request.filters, fields=request.fields,
+                                       group_by=request.group_by, sort=request.sort, limit=request.limit,
+                                       exclude_folders=request.exclude_folders)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/notes/fields")
+async def note_fields():
+    """Frontmatter fields in the vault with their most common values"""
+    if vault_catalog is None:
+        raise HTTPException(status_code=400, detail="No vault directory configured")
+    await run_in_threadpool(vault_catalog.load_contents)
+    return vault_catalog.frontmatter.field_summary()
+
+@app.get("/tasks")
+async def list_tasks(state: Optional[str] = "open", project: Optional[str] = None, folder: Optional[str] = None,
+                     section: Optional[str] = None, text: Optional[str] = None, since: Optional[date] = None,
+                     until: Optional[date] = None, limit: int = 200):
+    """Checkbox tasks from every note, filtered by state (open/done/in_progress/cancelled or all)"""
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be 1-1000")
+    if vault_catalog is None:
+        raise HTTPException(status_code=400, detail="No vault directory configured")
+
+    try:
+        return await run_in_threadpool(vault_catalog.query_tasks, state=None if state == "all" else state,
+                                       project=project, folder=folder, section=section, text=text,
+                                       since=since, until=until, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/browse-documents")
-async def browse_documents(limit: int = 50, offset: int = 0):
-    """Browse documents using LangChain RAG implementation"""
-    from rag_service import get_all_documents
-    
+async def browse_documents(limit: int = 50, offset: int = 0, cursor: Optional[str] = None,
+                           group_by_file: bool = True, vault: str = DEFAULT_VAULT):
+    """Page through indexed files (or chunks with group_by_file=false), ordered by path.
+
+    Pass the previous page's next_cursor as cursor to keep paging stable while
+    the index changes; offset is used when no cursor is given.
+    """
+    if not 1 <= limit <= 1000 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit must be 1-1000 and offset non-negative")
+    rag = require_vault_rag(vault)
+
     try:
-        documents = get_all_documents()
-        return {"documents": documents, "total": len(documents)}
-        
+        return await run_in_threadpool(rag.browse, limit, offset, cursor, group_by_file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to browse documents: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to browse documents: {str(e)}")
 
 @app.post("/search-documents")
 async def search_documents(request: SearchRequest):
-    """Search documents using LangChain RAG implementation"""
-    from rag_service import search_documents as rag_search
-    
+    """Search documents using LangChain RAG implementation, in one vault or across all of them"""
+    if request.vault == ALL_VAULTS:
+        rags = searchable_vaults()
+        if not rags:
+            raise HTTPException(status_code=503, detail="No vault index is ready yet", headers={"Retry-After": "1"})
+        try:
+            result = await run_in_threadpool(vault_registry.fan_out_search, rags, request.query, request.limit)
+            return {**result, "total": len(result["documents"])}
+        except Exception as e:
+            logger.error(f"Failed to search across vaults: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to search documents: {str(e)}")
+
+    rag = require_vault_rag(request.vault)
     try:
-        documents = rag_search(request.query, request.limit)
+        documents = await run_in_threadpool(rag.search, request.query, request.limit)
         return {"documents": documents, "total": len(documents)}
         
     except Exception as e:
         logger.error(f"Failed to search documents: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to search documents: {str(e)}")
 
+@app.get("/search/rerank")
+async def rerank_status():
+    """Configured reranker, its budget, and how often it reranked, fell back or hit the cache"""
+    return get_rerank_stage().status()
+
 @app.post("/configure-vault")
 async def configure_vault(request: VaultRequest):
     """Configure vault directory"""
@@ -1039,6 +1553,10 @@ async def configure_vault(request: VaultRequest):
         # Save configuration persistently
         save_vault_config()
 
+        # Catalog the new vault before the watcher starts feeding it events
+        build_vault_catalog()
+        get_note_cache().clear()
+
         # Start watching the vault for changes
         start_vault_watching()
 
@@ -1057,10 +1575,11 @@ async def get_vault_status():
 @app.post("/rebuild-index")
 async def rebuild_search_index():
     """Rebuild the search index using LangChain RAG"""
-    from rag_service import rebuild_index
-    
     if not vault_path:
         raise HTTPException(status_code=400, detail="No vault directory configured")
+    require_rag()
+
+    from rag_service import rebuild_index
     
     try:
         num_chunks = rebuild_index(str(vault_path))
@@ -1071,23 +1590,198 @@ async def rebuild_search_index():
 
 @app.post("/update-index")
 async def update_search_index():
-    """Update search index incrementally - remove deleted files and add new ones"""
+    """Update search index incrementally - index only added/changed files and remove deleted ones"""
     if not vault_path:
         raise HTTPException(status_code=400, detail="No vault directory configured")
+    require_rag()
 
     try:
-        from rag_service import get_rag_instance
-        rag = get_rag_instance()
-        num_chunks = rag.update_directory_incremental(str(vault_path))
-        return {"message": f"Search index updated successfully with {num_chunks} chunks", "status": "success"}
+        report = await run_in_threadpool(reconcile_index)
+        num_chunks = report.get('indexed_chunks', 0)
+        return {
+            "message": f"Search index updated successfully with {num_chunks} chunks",
+            "status": "success",
+            "diff": report,
+        }
     except Exception as e:
         logger.error(f"Failed to update index: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to update index: {str(e)}")
 
+@app.get("/index/reconcile")
+async def reconcile_status():
+    """Last reconciliation diff between the vault on disk and the search index"""
+    return get_index_reconciler().status()
+
+@app.post("/index/reconcile")
+async def run_reconcile(dry_run: bool = False):
+    """Diff disk against the index and (unless dry_run) index only the difference"""
+    if not vault_path:
+        raise HTTPException(status_code=400, detail="No vault directory configured")
+    require_rag()
+
+    try:
+        return await run_in_threadpool(reconcile_index, dry_run)
+    except Exception as e:
+        logger.error(f"Failed to reconcile index: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to reconcile index: {str(e)}")
+
+@app.post("/index/export")
+async def export_index(request: SnapshotRequest):
+    """Write a portable snapshot of the index (vectors, chunks, manifest) to a file"""
+    if not vault_path:
+        raise HTTPException(status_code=400, detail="No vault directory configured")
+    require_rag()
+    from index_snapshot import export_snapshot, default_snapshot_path
+
+    try:
+        return await run_in_threadpool(export_snapshot, rag_instance, str(vault_path),
+                                       request.path or default_snapshot_path())
+    except Exception as e:
+        logger.error(f"Failed to export index: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to export index: {str(e)}")
+
+@app.post("/index/import")
+async def import_index(request: SnapshotRequest):
+    """Load a snapshot, re-embedding only the files whose content differs from this vault"""
+    if not vault_path:
+        raise HTTPException(status_code=400, detail="No vault directory configured")
+    if not request.path or not os.path.isfile(request.path):
+        raise HTTPException(status_code=400, detail=f"Snapshot file not found: {request.path}")
+    require_rag()
+    from index_snapshot import import_snapshot
+
+    try:
+        return await run_in_threadpool(import_snapshot, rag_instance, str(vault_path), request.path,
+                                       get_index_reconciler())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to import index: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to import index: {str(e)}")
+
+@app.get("/index/stats")
+async def index_stats(vault: Optional[str] = None):
+    """Live and deleted entries, bytes on disk and orphaned sources of a vault's index"""
+    rag = require_vault_rag(vault)
+    try:
+        stats = await run_in_threadpool(rag.index_stats, vault_root(vault))
+    except Exception as e:
+        logger.error(f"Failed to read index stats: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to read index stats: {str(e)}")
+    return {**stats, "compaction_recommended": needs_compaction(stats)}
+
+@app.post("/index/compact")
+async def compact_index(vault: Optional[str] = None, wait: bool = False):
+    """Compact a vault's index in the background (searches keep working; index writes wait)"""
+    rag = require_vault_rag(vault)
+    maintenance = get_index_maintenance()
+    name = vault or DEFAULT_VAULT
+    if wait:
+        return await run_in_threadpool(maintenance.compact, name, rag, vault_root(vault))
+    if not maintenance.start_compaction(name, rag, vault_root(vault)):
+        raise HTTPException(status_code=409, detail=f"Compaction of '{maintenance.running}' is already running")
+    return {"message": f"Compaction of '{name}' started", "status": "started"}
+
+@app.get("/index/compact")
+async def compaction_status():
+    """Running compaction, schedule and the last report per index"""
+    return get_index_maintenance().status()
+
+@app.get("/index/embedding")
+async def embedding_status(vault: Optional[str] = None):
+    """Embedding model and dimension of a vault's index, and any migration in progress"""
+    rag = require_vault_rag(vault)
+    return rag.embedding_status()
+
+@app.post("/index/embedding/migrate")
+async def migrate_embeddings(request: MigrationRequest, vault: Optional[str] = None):
+    """Re-embed a vault's index with another model in the background; search keeps working and switches over at the end"""
+    rag = require_vault_rag(vault)
+    model = request.model or rag.configured_model
+    if model == rag.model_name:
+        raise HTTPException(status_code=400, detail=f"Index already uses {model}")
+    try:
+        migration = await run_in_threadpool(rag.start_embedding_migration, model)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"message": f"Migrating to {model}", "status": "started", "migration": migration}
+
+@app.delete("/index/embedding/migrate")
+async def cancel_embedding_migration(vault: Optional[str] = None):
+    """Stop a migration and drop its partial index"""
+    rag = require_vault_rag(vault)
+    if not await run_in_threadpool(rag.cancel_embedding_migration):
+        raise HTTPException(status_code=404, detail="No embedding migration is running")
+    return {"message": "Migration cancelled", "status": "success"}
+
+@app.get("/vaults")
+async def list_vaults():
+    """The primary vault and every registered vault with its load state"""
+    primary = {
+        "name": DEFAULT_VAULT,
+        "vault_path": str(vault_path) if vault_path else None,
+        "ready": startup_state["ready"],
+        "stage": startup_state["stage"],
+        "watching": bool(vault_observer and vault_observer.is_alive()),
+    }
+    registered = [vault_registry.get(name).status() for name in vault_registry.names()]
+    return {"vaults": [primary] + registered}
+
+@app.post("/vaults")
+async def add_vault(request: NamedVaultRequest):
+    """Register another vault; it is indexed and watched in the background"""
+    try:
+        vault = vault_registry.add(request.name, str(Path(request.vault_directory).resolve()),
+                                   primary_path=str(vault_path) if vault_path else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=409, detail=str(e.args[0]))
+    save_vault_config()
+    logger.info(f"📁 Vault '{vault.name}' registered: {vault.path}")
+    return {"message": f"Vault '{vault.name}' registered, indexing in the background", "vault": vault.status()}
+
+@app.delete("/vaults/{name}")
+async def remove_vault(name: str, delete_index: bool = False):
+    """Unregister a vault and stop watching it, optionally deleting its index"""
+    if vault_registry.get(name) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown vault '{name}'")
+    await run_in_threadpool(vault_registry.remove, name, delete_index)
+    save_vault_config()
+    return {"message": f"Vault '{name}' removed", "status": "success"}
+
+@app.post("/vaults/{name}/reconcile")
+async def reconcile_vault(name: str, dry_run: bool = False):
+    """Diff a registered vault against its own index and (unless dry_run) apply the difference"""
+    if name == DEFAULT_VAULT:
+        return await run_reconcile(dry_run)
+    rag = require_vault_rag(name)
+    vault = vault_registry.get(name)
+    try:
+        return await run_in_threadpool(vault.reconciler.reconcile, rag, vault.path, None, dry_run)
+    except Exception as e:
+        logger.error(f"Failed to reconcile vault '{name}': {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to reconcile vault: {str(e)}")
+
+@app.get("/index/hnsw")
+async def hnsw_settings():
+    """Configured and effective HNSW parameters of the Chroma index"""
+    require_rag()
+    return {"backend": rag_instance.backend_name, **rag_instance.hnsw_status()}
+
+@app.on_event("startup")
+async def startup_event():
+    """Answer /health right away and bring up the heavy services in the background"""
+    logger.info(f"⏱️ Server importable in {(time.perf_counter() - _import_started) * 1000:.0f}ms, loading services in background")
+    threading.Thread(target=initialize_services, name="forge-startup", daemon=True).start()
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up on server shutdown"""
     stop_vault_watching()
+    vault_registry.stop_all()
+    get_index_maintenance().stop_schedule()
+    conversations.close()
     logger.info("🛑 Server shutdown complete")
 
 if __name__ == "__main__":
@@ -0,0 +1,249 @@
+"""
+Model residency manager for Ollama
+
+Tracks which models Ollama currently holds in memory (via /api/ps), preloads
+models with an empty prompt and an explicit keep_alive so they stay pinned,
+and evicts the least recently used models when a RAM budget is configured.
+"""
+
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_BASE_URL = os.getenv("FORGE_OLLAMA_URL", "http://localhost:11434")
+
+# How long Ollama should keep a model resident after its last use
+DEFAULT_KEEP_ALIVE = os.getenv("FORGE_MODEL_KEEP_ALIVE", "30m")
+
+# RAM budget for resident models in MB (0 = no budget, let Ollama decide)
+DEFAULT_RAM_BUDGET_MB = int(os.getenv("FORGE_MODEL_RAM_BUDGET_MB", "0"))
+
+# Don't hit /api/ps more often than this when checking residency
+PS_REFRESH_INTERVAL = 5.0
+
+
+class ModelManager:
+    """Keeps chat models warm in Ollama and evicts by LRU under a RAM budget"""
+
+    def __init__(self, base_url: str = OLLAMA_BASE_URL, keep_alive: str = DEFAULT_KEEP_ALIVE,
+                 ram_budget_mb: int = DEFAULT_RAM_BUDGET_MB):
+        self.base_url = base_url.rstrip('/')
+        self.keep_alive = keep_alive
+        self.ram_budget_bytes = ram_budget_mb * 1024 * 1024 if ram_budget_mb > 0 else None
+        # model name -> residency info, ordered least to most recently used
+        self.resident: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Last observed resident size per model, used to plan evictions before a load
+        self.known_sizes: Dict[str, int] = {}
+        self.load_latencies: Dict[str, float] = {}
+        self.last_refresh = 0.0
+        self.lock = threading.RLock()
+
+    def refresh(self, force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Sync residency state with Ollama's process-status API"""
+        with self.lock:
+            if not force and time.time() - self.last_refresh < PS_REFRESH_INTERVAL:
+                return dict(self.resident)
+
+            try:
+                response = requests.get(f"{self.base_url}/api/ps", timeout=5)
+                response.raise_for_status()
+                running = response.json().get("models", [])
+            except Exception as e:
+                logger.warning(f"Could not query Ollama process status: {e}")
+                return dict(self.resident)
+
+            running_names = set()
+            for model in running:
+                name = model.get("name") or model.get("model")
+                if not name:
+                    continue
+                running_names.add(name)
+                size = model.get("size_vram") or model.get("size") or 0
+                if size:
+                    self.known_sizes[name] = size
+
+                info = self.resident.get(name)
+                if info is None:
+                    # Loaded outside of the manager (e.g. by another client)
+                    info = {"loaded_at": time.time(), "last_used": 0.0}
+                    self.resident[name] = info
+                    self.resident.move_to_end(name, last=False)
+                info["size"] = size
+                info["size_vram"] = model.get("size_vram", 0)
+                info["expires_at"] = model.get("expires_at")
+
+            # Drop models Ollama has unloaded on its own
+            for name in list(self.resident.keys()):
+                if name not in running_names:
+                    del self.resident[name]
+
+            self.last_refresh = time.time()
+            return dict(self.resident)
+
+    def is_resident(self, model: str) -> bool:
+        """Check whether a model is currently loaded"""
+        self.refresh()
+        with self.lock:
+            return model in self.resident
+
+    def touch(self, model: str):
+        """Mark a model as most recently used"""
+        with self.lock:
+            if model in self.resident:
+                self.resident[model]["last_used"] = time.time()
+                self.resident.move_to_end(model)
+
+    def ensure_loaded(self, model: str) -> Dict[str, Any]:
+        """Make sure a model is resident, preloading it if necessary"""
+        if self.is_resident(model):
+            self.touch(model)
+            return {"model": model, "status": "resident", "load_latency_ms": 0.0}
+        return self.preload(model)
+
+    def preload(self, model: str) -> Dict[str, Any]:
+        """Load a model with an empty prompt and pin it with keep_alive"""
+        self._make_room_for(model)
+
+        logger.info(f"🔄 Loading model {model} (keep_alive={self.keep_alive})")
+        start = time.time()
+        response = requests.post(
+            f"{self.base_url}/api/generate",
+            json={"model": model, "prompt": "", "keep_alive": self.keep_alive, "stream": False},
+            timeout=120
+        )
+        response.raise_for_status()
+        elapsed_ms = (time.time() - start) * 1000
+
+        # Ollama reports the time spent loading weights in nanoseconds
+        load_duration_ns = response.json().get("load_duration", 0)
+        load_latency_ms = load_duration_ns / 1e6 if load_duration_ns else elapsed_ms
+
+        with self.lock:
+            self.load_latencies[model] = load_latency_ms
+            self.resident[model] = {
+                **self.resident.get(model, {}),
+                "loaded_at": time.time(),
+                "last_used": time.time(),
+                "size": self.known_sizes.get(model, 0),
+            }
+            self.resident.move_to_end(model)
+            # Pick up the actual resident size on the next check
+            self.last_refresh = 0.0
+
+        logger.info(f"✅ Model {model} resident after {load_latency_ms:.0f}ms")
+        return {"model": model, "status": "loaded", "load_latency_ms": load_latency_ms}
+
+    def evict(self, model: str) -> bool:
+        """Ask Ollama to unload a model immediately"""
+        try:
+            response = requests.post(
+                f"{self.base_url}/api/generate",
+                json={"model": model, "keep_alive": 0},
+                timeout=30
+            )
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"Could not evict model {model}: {e}")
+            return False
+
+        with self.lock:
+            self.resident.pop(model, None)
+        logger.info(f"🧹 Evicted model {model}")
+        return True
+
+    def record_generation(self, model: str, result: Dict[str, Any]):
+        """Update residency from a generate response (which may have paid a cold load)"""
+        load_duration_ns = result.get("load_duration", 0)
+        with self.lock:
+            if model not in self.resident:
+                self.resident[model] = {"loaded_at": time.time(), "size": self.known_sizes.get(model, 0)}
+            # Anything over a few hundred ms means the weights were (re)loaded
+            if load_duration_ns and load_duration_ns > 5e8:
+                self.load_latencies[model] = load_duration_ns / 1e6
+            self.touch(model)
+
+    def _make_room_for(self, model: str):
+        """Evict least recently used models until the new model fits the budget.
+
+        Victims are picked under the lock; the unload requests run after it is
+        released so residency checks aren't stalled behind Ollama.
+        """
+        if not self.ram_budget_bytes:
+            return
+
+        self.refresh(force=True)
+        needed = self.known_sizes.get(model) or self._estimate_size(model)
+        with self.lock:
+            used = sum(info.get("size", 0) for name, info in self.resident.items() if name != model)
+            victims = []
+            planned = used
+            for name, info in self.resident.items():
+                if planned + needed <= self.ram_budget_bytes:
+                    break
+                if name == model:
+                    continue
+                victims.append((name, info.get("size", 0)))
+                planned -= info.get("size", 0)
+
+        for name, size in victims:
+            if self.evict(name):
+                used -= size
+
+        if used + needed > self.ram_budget_bytes:
+            logger.warning(f"⚠️ Model {model} (~{needed // (1024 * 1024)}MB) exceeds RAM budget even after eviction")
+
+    def _estimate_size(self, model: str) -> int:
+        """Estimate resident size from the on-disk model size"""
+        try:
+            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response.raise_for_status()
+            for entry in response.json().get("models", []):
+                if entry.get("name") == model or entry.get("model") == model:
+                    # KV cache and runtime buffers add roughly 20% on top of the weights
+                    return int(entry.get("size", 0) * 1.2)
+        except Exception as e:
+            logger.debug(f"Could not estimate size for {model}: {e}")
+        return 0
+
+    def status(self) -> Dict[str, Any]:
+        """Residency and load latency summary"""
+        self.refresh()
+        with self.lock:
+            models = []
+            for name, info in reversed(self.resident.items()):  # Most recently used first
+                models.append({
+                    "name": name,
+                    "size_mb": round(info.get("size", 0) / (1024 * 1024), 1),
+                    "size_vram_mb": round(info.get("size_vram", 0) / (1024 * 1024), 1),
+                    "loaded_at": info.get("loaded_at"),
+                    "last_used": info.get("last_used"),
+                    "expires_at": info.get("expires_at"),
+                    "load_latency_ms": self.load_latencies.get(name),
+                })
+
+            used = sum(info.get("size", 0) for info in self.resident.values())
+            return {
+                "models": models,
+                "keep_alive": self.keep_alive,
+                "ram_used_mb": round(used / (1024 * 1024), 1),
+                "ram_budget_mb": self.ram_budget_bytes // (1024 * 1024) if self.ram_budget_bytes else None,
+                "load_latencies_ms": dict(self.load_latencies),
+            }
+
+
+# Global model manager instance
+_model_manager = None
+
+def get_model_manager() -> ModelManager:
+    """Get or create global model manager"""
+    global _model_manager
+    if _model_manager is None:
+        _model_manager = ModelManager()
+    return _model_manager
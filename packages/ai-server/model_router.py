@@ -0,0 +1,121 @@
+"""
+Latency-aware model routing by query strategy
+
+Sends low-complexity queries (structural counts, specific lookups) to a fast
+model and reasoning-heavy ones to the large model. Every decision is logged
+together with the answer latency so the policy can be tuned.
+"""
+
+import os
+import time
+import logging
+import statistics
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+ROUTING_ENABLED = os.getenv("FORGE_MODEL_ROUTING", "false").lower() in ("1", "true", "yes")
+FAST_MODEL = os.getenv("FORGE_FAST_MODEL", "llama3.2:3b")
+LARGE_MODEL = os.getenv("FORGE_LARGE_MODEL", "deepseek-r1:8b")
+
+# Strategies from get_context_strategy that a small model answers well
+FAST_STRATEGIES = {s.strip() for s in os.getenv("FORGE_FAST_STRATEGIES", "structural,specific").split(",") if s.strip()}
+
+# Requests for these models may be rerouted; any other explicit model is respected
+AUTO_MODEL = "auto"
+
+
+class ModelRouter:
+    """Picks a model per turn based on the context strategy"""
+
+    def __init__(self, enabled: bool = ROUTING_ENABLED, fast_model: str = FAST_MODEL,
+                 large_model: str = LARGE_MODEL, fast_strategies: Optional[set] = None,
+                 history_size: int = 500):
+        self.enabled = enabled
+        self.fast_model = fast_model
+        self.large_model = large_model
+        self.fast_strategies = fast_strategies if fast_strategies is not None else set(FAST_STRATEGIES)
+        self.history = deque(maxlen=history_size)
+        self.lock = threading.Lock()
+
+    def route(self, requested_model: str, strategy: dict) -> Dict[str, Any]:
+        """Decide which model should answer this turn"""
+        decision = {
+            "requested": requested_model,
+            "model": requested_model,
+            "strategy": strategy['primary'],
+            "routed": False,
+            "reason": "routing disabled",
+        }
+
+        if not self.enabled:
+            if requested_model == AUTO_MODEL:
+                decision["model"] = self.large_model
+            return decision
+
+        if requested_model not in (AUTO_MODEL, self.fast_model, self.large_model):
+            decision["reason"] = "explicit model requested"
+            return decision
+
+        if strategy['is_mixed']:
+            decision["model"] = self.large_model
+            decision["reason"] = "mixed strategy needs reasoning"
+        elif strategy['primary'] in self.fast_strategies:
+            decision["model"] = self.fast_model
+            decision["reason"] = f"low-complexity {strategy['primary']} query"
+        else:
+            decision["model"] = self.large_model
+            decision["reason"] = f"reasoning-heavy {strategy['primary']} query"
+
+        decision["routed"] = decision["model"] != requested_model
+        return decision
+
+    def record(self, decision: Dict[str, Any], latency_ms: float):
+        """Log a routing decision with its end-to-end answer latency"""
+        entry = {**decision, "latency_ms": latency_ms, "timestamp": time.time()}
+        with self.lock:
+            self.history.append(entry)
+        logger.info(f"🧭 Routing: {decision['strategy']} -> {decision['model']} "
+                    f"({decision['reason']}) in {latency_ms:.0f}ms")
+
+    def stats(self) -> Dict[str, Any]:
+        """Latency summary per model and strategy for tuning the policy"""
+        with self.lock:
+            history = list(self.history)
+
+        def summarize(entries):
+            latencies = [e['latency_ms'] for e in entries]
+            return {
+                "count": len(latencies),
+                "median_ms": statistics.median(latencies) if latencies else None,
+                "max_ms": max(latencies) if latencies else None,
+            }
+
+        by_model, by_strategy = {}, {}
+        for entry in history:
+            by_model.setdefault(entry['model'], []).append(entry)
+            by_strategy.setdefault(entry['strategy'], []).append(entry)
+
+        return {
+            "enabled": self.enabled,
+            "fast_model": self.fast_model,
+            "large_model": self.large_model,
+            "fast_strategies": sorted(self.fast_strategies),
+            "overall": summarize(history),
+            "by_model": {model: summarize(entries) for model, entries in by_model.items()},
+            "by_strategy": {name: summarize(entries) for name, entries in by_strategy.items()},
+            "recent": history[-20:],
+        }
+
+
+# Global router instance
+_model_router = None
+
+def get_model_router() -> ModelRouter:
+    """Get or create global model router"""
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter()
+    return _model_router
@@ -0,0 +1,152 @@
+"""
+Read-through note content cache
+
+Caches note text keyed by path and validated by (mtime, size), so hot notes
+such as the latest daily note are served from memory on every chat turn.
+Entries are evicted least recently used first under a byte budget.
+Previews read only the bytes they need instead of the whole file.
+"""
+
+import os
+import codecs
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Byte budget for cached note text
+DEFAULT_MAX_BYTES = int(float(os.getenv("FORGE_NOTE_CACHE_MB", "16")) * 1024 * 1024)
+
+
+class NoteContentCache:
+    """LRU cache of note contents under a byte cap"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # path -> (mtime, size, content, nbytes), least recently used first
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def read(self, path: str, mtime: Optional[float] = None, size: Optional[int] = None) -> str:
+        """Return a note's content, reading from disk only if it changed or isn't cached.
+
+        Pass mtime/size from the vault catalog to skip the stat call.
+        """
+        if mtime is None or size is None:
+            stat_result = os.stat(path)
+            mtime, size = stat_result.st_mtime, stat_result.st_size
+
+        with self.lock:
+            cached = self.entries.get(path)
+            if cached and cached[0] == mtime and cached[1] == size:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return cached[2]
+            self.misses += 1
+
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        self.put(path, mtime, size, content)
+        return content
+
+    def preview(self, path: str, max_chars: int, mtime: Optional[float] = None,
+                size: Optional[int] = None) -> Tuple[str, bool]:
+        """First max_chars characters of a note and whether the note is longer.
+
+        Served from the cache when the full text is already there, otherwise
+        read with bounded reads that never split a UTF-8 sequence.
+        """
+        if mtime is not None and size is not None:
+            with self.lock:
+                cached = self.entries.get(path)
+                if cached and cached[0] == mtime and cached[1] == size:
+                    self.entries.move_to_end(path)
+                    self.hits += 1
+                    return cached[2][:max_chars], len(cached[2]) > max_chars
+
+        return read_preview(path, max_chars)
+
+    def put(self, path: str, mtime: float, size: int, content: str):
+        """Store content for a path, evicting older entries to stay under the cap"""
+        nbytes = len(content.encode('utf-8'))
+        with self.lock:
+            self._discard(path)
+            if nbytes > self.max_bytes:
+                return  # Larger than the whole budget, don't cache
+            self.entries[path] = (mtime, size, content, nbytes)
+            self.bytes_used += nbytes
+            while self.bytes_used > self.max_bytes and self.entries:
+                _, (_, _, _, evicted_bytes) = self.entries.popitem(last=False)
+                self.bytes_used -= evicted_bytes
+                self.evictions += 1
+
+    def _discard(self, path: str):
+        cached = self.entries.pop(path, None)
+        if cached:
+            self.bytes_used -= cached[3]
+
+    def invalidate(self, path: str):
+        """Drop a file (or everything under a directory) after a watcher event"""
+        prefix = path.rstrip(os.sep) + os.sep
+        with self.lock:
+            self._discard(path)
+            for cached_path in [p for p in self.entries if p.startswith(prefix)]:
+                self._discard(cached_path)
+
+    def clear(self):
+        """Drop everything, e.g. when the vault changes"""
+        with self.lock:
+            self.entries.clear()
+            self.bytes_used = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and memory usage"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes_used": self.bytes_used,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+def read_preview(path: str, max_chars: int) -> Tuple[str, bool]:
+    """Read at most about max_chars characters from the start of a UTF-8 file"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    parts = []
+    decoded = 0
+    with open(path, 'rb') as f:
+        while decoded <= max_chars:
+            # Most notes are ASCII, so one read of max_chars + 1 bytes usually suffices
+            chunk = f.read(max_chars + 1 - decoded)
+            if not chunk:
+                break
+            # The incremental decoder holds back a partial multi-byte sequence until the next read
+            text = decoder.decode(chunk)
+            parts.append(text)
+            decoded += len(text)
+
+    text = ''.join(parts).replace('\r\n', '\n')
+    return text[:max_chars], len(text) > max_chars
+
+
+# Global note cache instance
+_note_cache = None
+
+def get_note_cache() -> NoteContentCache:
+    """Get or create global note content cache"""
+    global _note_cache
+    if _note_cache is None:
+        _note_cache = NoteContentCache()
+    return _note_cache
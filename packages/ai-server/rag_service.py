@@ -3,20 +3,773 @@ Clean RAG implementation using LangChain best practices
 """
 
 import os
+import json
+import time
+import base64
+import bisect
+import shutil
+import threading
+import functools
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 import logging
+import hashlib
 import yaml
 import re
 
+import numpy as np
+import chromadb
+
 from langchain_community.document_loaders import DirectoryLoader, TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
 from langchain_ollama import OllamaEmbeddings
 from langchain.schema import Document
 
+from vault_catalog import is_date_filename, parse_note_date, content_hash, iter_vault_notes
+from reranker import get_rerank_stage
+
 logger = logging.getLogger(__name__)
 
+# Embedding model for new indexes. An existing index keeps the model it was built with
+# (recorded in forge_index.json) until a migration to this one completes.
+DEFAULT_EMBEDDING_MODEL = os.getenv("FORGE_EMBEDDING_MODEL", "nomic-embed-text")
+
+# "auto" starts that migration on load when the configured model differs; "manual" waits for /index/embedding/migrate
+EMBEDDING_MIGRATION_MODE = os.getenv("FORGE_EMBEDDING_MIGRATION", "auto")
+
+# Vector store backend: "chroma" (persistent HNSW) or "flat" (memory-mapped NumPy, exact search)
+DEFAULT_VECTOR_BACKEND = os.getenv("FORGE_VECTOR_BACKEND", "chroma")
+
+# Flat backend scan precision: "none" (float32) or "int8"; full vectors stay on disk for rescoring
+DEFAULT_QUANTIZATION = os.getenv("FORGE_VECTOR_QUANTIZATION", "none")
+
+# Candidates rescored exactly per result when quantized (k * factor)
+DEFAULT_RESCORE_FACTOR = int(os.getenv("FORGE_RESCORE_FACTOR", "4"))
+
+# Chroma HNSW graph parameters (defaults are Chroma's own). construction_ef and M are fixed
+# when the collection is created and need a full rebuild to change; search_ef applies in place.
+# Use hnsw_sweep.py to pick values for a given vault.
+DEFAULT_HNSW_CONSTRUCTION_EF = int(os.getenv("FORGE_HNSW_CONSTRUCTION_EF", "100"))
+DEFAULT_HNSW_SEARCH_EF = int(os.getenv("FORGE_HNSW_SEARCH_EF", "10"))
+DEFAULT_HNSW_M = int(os.getenv("FORGE_HNSW_M", "16"))
+
+
+def hnsw_metadata(construction_ef: int = DEFAULT_HNSW_CONSTRUCTION_EF, search_ef: int = DEFAULT_HNSW_SEARCH_EF,
+                  m: int = DEFAULT_HNSW_M) -> Dict[str, Any]:
+    """Chroma collection metadata for a cosine HNSW index with the given parameters"""
+    return {
+        "hnsw:space": "cosine",
+        "hnsw:construction_ef": construction_ef,
+        "hnsw:search_ef": search_ef,
+        "hnsw:M": m,
+    }
+
+
+# Collection ForgeRAG reads and writes unless compaction or a model migration has switched it
+# (LangChain's default name); the flat backend's equivalents are directories under persist_directory
+DEFAULT_COLLECTION_NAME = "langchain"
+DEFAULT_FLAT_DIRECTORY = "flat"
+DEFAULT_FLAT_FILES_DIRECTORY = "flat-files"
+INDEX_STATE_FILE = "forge_index.json"
+
+# Two-stage retrieval: notes are ranked by one summary vector each (title, frontmatter, headings),
+# then only the chunks of the top FORGE_FILE_CANDIDATES notes are scored. Used once the index
+# holds FORGE_HIERARCHICAL_MIN_CHUNKS chunks (0 always, -1 never); smaller vaults search chunks directly.
+FILE_CANDIDATES = int(os.getenv("FORGE_FILE_CANDIDATES", "20"))
+HIERARCHICAL_MIN_CHUNKS = int(os.getenv("FORGE_HIERARCHICAL_MIN_CHUNKS", "5000"))
+FILE_COLLECTION_NAME = "forge-files"
+FILE_SUMMARY_MAX_CHARS = 2000
+FILE_SUMMARY_BATCH_SIZE = 200
+
+# Metadata recorded for index bookkeeping rather than taken from frontmatter
+FILE_STATE_KEYS = ('source', 'file_size', 'file_mtime', 'content_hash')
+HEADING_PATTERN = re.compile(r'^#{1,6}\s+(.+)$', re.MULTILINE)
+
+# Chunks copied per batch when compacting
+COMPACTION_BATCH_SIZE = 1000
+
+# Seconds collections replaced by compaction or an embedding migration stay readable for searches already using them
+COMPACTION_GRACE_SECONDS = float(os.getenv("FORGE_COMPACTION_GRACE_SECONDS", "60"))
+
+
+def _read_index_state(persist_directory: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(persist_directory, INDEX_STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _update_index_state(persist_directory: str, **updates):
+    """Merge updates into the index state file, replacing it atomically"""
+    state = {**_read_index_state(persist_directory), **updates}
+    path = os.path.join(persist_directory, INDEX_STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def _exclusive_write(method):
+    """Run a ForgeRAG index write under its write lock, so it never interleaves with compaction"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.write_lock:
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.generation += 1
+    return wrapper
+
+
+# Chunks per metadata-only read when building the browse listing
+LISTING_BATCH_SIZE = 5000
+
+
+def encode_cursor(key: Tuple[str, int]) -> str:
+    """Opaque browse cursor for the last (source, chunk_index) on a page"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Raises ValueError for a cursor this code did not produce"""
+    try:
+        source, chunk_index = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(source), int(chunk_index)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+# Recent query embeddings per model, most recently used last
+QUERY_EMBEDDING_CACHE_SIZE = 256
+_query_embedding_cache: Dict[Tuple[str, str], List[float]] = {}
+_query_embedding_lock = threading.Lock()
+
+
+def _directory_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def _matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate the subset of Chroma's where syntax ForgeRAG uses: equality, $in, $ne, $and, $or"""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(_matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(_matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op == '$eq' and value != operand:
+                    return False
+                if op == '$ne' and value == operand:
+                    return False
+                if op == '$in' and value not in operand:
+                    return False
+                if op == '$nin' and value in operand:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class VectorStoreBackend:
+    """Storage and nearest-neighbour search for chunk embeddings.
+
+    Mirrors the parts of Chroma's collection API that ForgeRAG uses, so the
+    backends are interchangeable. Distances are cosine distances (1 - cos).
+    """
+
+    name = "base"
+
+    def add(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Insert or replace chunks by ID"""
+        raise NotImplementedError
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            include: Iterable[str] = ("documents", "metadatas"), limit: Optional[int] = None,
+            offset: Optional[int] = None) -> Dict[str, Any]:
+        """Chunks by ID and/or metadata filter, as {'ids', 'documents', 'metadatas', 'embeddings'}"""
+        raise NotImplementedError
+
+    def update(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Replace metadata for existing chunks without touching their embeddings"""
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]):
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def query(self, embedding, k: int, where: Optional[Dict[str, Any]] = None) -> List[Tuple[str, str, Dict[str, Any], float]]:
+        """k nearest chunks as (id, document, metadata, cosine distance), closest first"""
+        raise NotImplementedError
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.add(ids, embeddings, documents, metadatas)
+
+    def stats(self) -> Dict[str, Any]:
+        """Live and deleted entry counts and bytes on disk"""
+        raise NotImplementedError
+
+
+class ChromaBackend(VectorStoreBackend):
+    """Chroma collection (persistent HNSW index), the default backend"""
+
+    name = "chroma"
+
+    def __init__(self, collection, persist_directory: Optional[str] = None):
+        self.collection = collection
+        self.persist_directory = persist_directory
+
+    def add(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(ids=list(ids), embeddings=[list(map(float, e)) for e in embeddings],
+                               documents=list(documents), metadatas=list(metadatas))
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas"), limit=None, offset=None):
+        return self.collection.get(ids=ids, where=where, include=list(include), limit=limit, offset=offset)
+
+    def update(self, ids, metadatas):
+        self.collection.update(ids=list(ids), metadatas=list(metadatas))
+
+    def delete(self, ids):
+        if ids:
+            self.collection.delete(ids=list(ids))
+            if self.persist_directory:
+                # Deleted HNSW nodes stay in the graph until compaction; Chroma doesn't report them
+                state = _read_index_state(self.persist_directory)
+                _update_index_state(self.persist_directory, deleted=state.get("deleted", 0) + len(ids))
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def query(self, embedding, k, where=None):
+        k = min(k, self.count())
+        if k <= 0:
+            return []
+        result = self.collection.query(query_embeddings=[list(map(float, embedding))], n_results=k, where=where,
+                                       include=["documents", "metadatas", "distances"])
+        return list(zip(result['ids'][0], result['documents'][0], result['metadatas'][0], result['distances'][0]))
+
+    def hnsw_settings(self) -> Dict[str, Any]:
+        """construction_ef, search_ef and M the collection is actually using"""
+        configuration = getattr(self.collection, "configuration", None) or {}
+        hnsw = configuration.get("hnsw") if isinstance(configuration, dict) else None
+        if hnsw:
+            # Chroma 1.x keeps the live values in the collection configuration
+            return {"construction_ef": hnsw.get("ef_construction"), "search_ef": hnsw.get("ef_search"),
+                    "M": hnsw.get("max_neighbors")}
+        metadata = self.collection.metadata or {}
+        return {"construction_ef": metadata.get("hnsw:construction_ef", 100),
+                "search_ef": metadata.get("hnsw:search_ef", 10), "M": metadata.get("hnsw:M", 16)}
+
+    def _segment_directories(self) -> Tuple[List[str], List[str]]:
+        """(live, orphaned) HNSW segment directories; Chroma leaves dropped collections' files behind"""
+        import sqlite3
+        database = os.path.join(self.persist_directory, "chroma.sqlite3")
+        with sqlite3.connect(f"file:{database}?mode=ro", uri=True) as connection:
+            segment_ids = {row[0] for row in connection.execute("SELECT id FROM segments")}
+        directories = [name for name in os.listdir(self.persist_directory)
+                       if os.path.isdir(os.path.join(self.persist_directory, name))]
+        return ([name for name in directories if name in segment_ids],
+                [name for name in directories if name not in segment_ids and re.fullmatch(r'[0-9a-f-]{36}', name)])
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"live": self.count(), "collection": self.collection.name}
+        if not self.persist_directory:
+            return stats
+        import sqlite3
+        database = os.path.join(self.persist_directory, "chroma.sqlite3")
+        deletes = _read_index_state(self.persist_directory).get("deleted", 0)
+        try:
+            with sqlite3.connect(f"file:{database}?mode=ro", uri=True) as connection:
+                # Operations Chroma has logged but not yet folded into the persisted HNSW files
+                log_entries = connection.execute("SELECT COUNT(*) FROM embeddings_queue WHERE topic LIKE ?",
+                                                 (f"%{self.collection.id}",)).fetchone()[0]
+                free_pages = connection.execute("PRAGMA freelist_count").fetchone()[0]
+                page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+            _, orphaned = self._segment_directories()
+        except Exception as e:
+            logger.debug(f"Could not read Chroma storage stats: {e}")
+            return {**stats, "deleted": deletes, "bytes_on_disk": _directory_bytes(self.persist_directory)}
+        return {
+            **stats,
+            "deleted": deletes,
+            "log_entries": log_entries,
+            "dead_ratio": round(deletes / (stats["live"] + deletes), 4) if stats["live"] + deletes else 0.0,
+            "free_bytes": free_pages * page_size,
+            "orphaned_segments": len(orphaned),
+            "orphaned_segment_bytes": sum(_directory_bytes(os.path.join(self.persist_directory, name))
+                                          for name in orphaned),
+            "bytes_on_disk": _directory_bytes(self.persist_directory),
+        }
+
+    def remove_orphaned_segments(self) -> int:
+        """Delete segment directories no collection refers to"""
+        _, orphaned = self._segment_directories()
+        for name in orphaned:
+            shutil.rmtree(os.path.join(self.persist_directory, name), ignore_errors=True)
+        return len(orphaned)
+
+    def set_search_ef(self, search_ef: int):
+        """Change the query-time beam width without rebuilding the graph"""
+        try:
+            self.collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+        except TypeError:
+            # Chroma before 1.0 has no configuration argument and reads search_ef from metadata
+            self.collection.modify(metadata={**(self.collection.metadata or {}), "hnsw:search_ef": search_ef})
+
+
+class FlatVectorStore(VectorStoreBackend):
+    """Exact cosine search over a memory-mapped float32 matrix.
+
+    Rows are unit-normalized embeddings, so a query is one matrix-vector
+    product plus argpartition. Chunk IDs, text and metadata live in Python
+    lists persisted as an append-only JSON-lines log; deletes and upserts
+    tombstone the old row instead of rewriting the matrix.
+
+    With int8 quantization (with a per-vector scale) the scan runs over the
+    compact copy only, and the best candidates are rescored exactly from the
+    float32 rows, which stay on disk and are read per hit.
+    """
+
+    name = "flat"
+    VECTORS_FILE = "vectors.f32"
+    RECORDS_FILE = "records.jsonl"
+    META_FILE = "flat_store.json"
+    INITIAL_CAPACITY = 1024
+    # Rows converted to float32 at a time when scanning quantized vectors; small enough to stay in cache
+    SCAN_BLOCK_ROWS = 256
+    QUANTIZED_FILES = {"int8": ("vectors.i8", np.int8)}
+    SCALES_FILE = "scales.f32"
+
+    def __init__(self, directory: str, quantization: Optional[str] = DEFAULT_QUANTIZATION,
+                 rescore_factor: int = DEFAULT_RESCORE_FACTOR):
+        if quantization == "float16":
+            # NumPy has no fast float16 -> float32 conversion, so float16 scans were ~8x slower than float32
+            logger.warning("⚠️ float16 vector quantization is no longer supported, using int8")
+            quantization = "int8"
+            if os.path.exists(os.path.join(directory, "vectors.f16")):
+                os.remove(os.path.join(directory, "vectors.f16"))
+        if quantization not in (None, "", "none", *self.QUANTIZED_FILES):
+            raise ValueError(f"Unknown quantization '{quantization}' (expected int8 or none)")
+        self.directory = directory
+        self.quantization = quantization if quantization in self.QUANTIZED_FILES else None
+        self.rescore_factor = max(1, rescore_factor)
+        self._recover_compaction()
+        os.makedirs(directory, exist_ok=True)
+        self.dim: Optional[int] = None
+        self.size = 0  # Rows used, including tombstoned rows
+        self.capacity = 0
+        self.matrix: Optional[np.memmap] = None
+        self.quantized: Optional[np.memmap] = None
+        self.scales: Optional[np.memmap] = None
+        self.alive = np.zeros(0, dtype=bool)
+        self.row_ids: List[Optional[str]] = []
+        self.documents: List[Optional[str]] = []
+        self.metadatas: List[Optional[Dict[str, Any]]] = []
+        self.id_to_row: Dict[str, int] = {}
+        self.tombstones = 0
+        self.lock = threading.RLock()
+        self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _recover_compaction(self):
+        """Finish or roll back a compaction that was interrupted between its two renames"""
+        previous, pending = self.directory + ".old", self.directory + ".compact"
+        if os.path.isdir(previous):
+            if os.path.isdir(self.directory):
+                shutil.rmtree(previous, ignore_errors=True)
+            else:
+                os.rename(previous, self.directory)
+        shutil.rmtree(pending, ignore_errors=True)
+
+    def _map(self, name: str, dtype, row_shape: tuple) -> np.memmap:
+        """Memory-map a row array file, growing it to the current capacity"""
+        path = self._path(name)
+        nbytes = self.capacity * int(np.prod(row_shape)) * np.dtype(dtype).itemsize
+        with open(path, 'ab') as f:
+            if f.tell() < nbytes:
+                f.truncate(nbytes)
+        return np.memmap(path, dtype=dtype, mode='r+', shape=(self.capacity, *row_shape))
+
+    def _map_arrays(self):
+        self.matrix = self._map(self.VECTORS_FILE, np.float32, (self.dim,))
+        if self.quantization:
+            name, dtype = self.QUANTIZED_FILES[self.quantization]
+            self.quantized = self._map(name, dtype, (self.dim,))
+            self.scales = self._map(self.SCALES_FILE, np.float32, ())
+
+    def _quantize(self, vectors: np.ndarray) -> tuple:
+        """int8 rows and per-row scales for unit-normalized float32 vectors"""
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales
+
+    def _load(self):
+        meta_path = self._path(self.META_FILE)
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path) as f:
+            meta = json.load(f)
+        self.dim = meta['dim']
+        self.capacity = meta['capacity']
+        self._map_arrays()
+        self.alive = np.zeros(self.capacity, dtype=bool)
+
+        # Replay the record log; rows past the last logged add are unused
+        with open(self._path(self.RECORDS_FILE), encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record['op'] == 'add':
+                    self._append_record(record['row'], record['id'], record['document'], record['metadata'])
+                elif record['op'] == 'update':
+                    self.metadatas[record['row']] = record['metadata']
+                else:
+                    self._tombstone(record['row'])
+
+        if self.quantization and meta.get('quantization') != self.quantization:
+            # Quantization mode changed since the store was written: derive the compact copy once
+            for start in range(0, self.size, self.INITIAL_CAPACITY):
+                end = min(start + self.INITIAL_CAPACITY, self.size)
+                compact, scales = self._quantize(np.asarray(self.matrix[start:end]))
+                self.quantized[start:end] = compact
+                if scales is not None:
+                    self.scales[start:end] = scales
+            self.quantized.flush()
+            self._write_meta()
+        elif not self.quantization and meta.get('quantization'):
+            self._write_meta()
+        logger.info(f"✅ Loaded flat vector store with {len(self.id_to_row)} vectors from {self.directory}"
+                    f" ({self.quantization or 'float32'})")
+
+    def _append_record(self, row: int, doc_id: str, document: str, metadata: Dict[str, Any]):
+        while len(self.row_ids) <= row:
+            self.row_ids.append(None)
+            self.documents.append(None)
+            self.metadatas.append(None)
+        previous = self.id_to_row.get(doc_id)
+        if previous is not None:
+            self._tombstone(previous)
+        self.row_ids[row] = doc_id
+        self.documents[row] = document
+        self.metadatas[row] = metadata
+        self.id_to_row[doc_id] = row
+        self.alive[row] = True
+        self.size = max(self.size, row + 1)
+
+    def _tombstone(self, row: int):
+        if self.alive[row]:
+            self.alive[row] = False
+            self.tombstones += 1
+            doc_id = self.row_ids[row]
+            if self.id_to_row.get(doc_id) == row:
+                del self.id_to_row[doc_id]
+            # Text and metadata of dead rows aren't needed in memory
+            self.documents[row] = None
+            self.metadatas[row] = None
+
+    def _ensure_capacity(self, needed: int, dim: int):
+        if self.dim is None:
+            self.dim = dim
+        elif dim != self.dim:
+            raise ValueError(f"Embedding dimension {dim} does not match store dimension {self.dim}")
+        if needed <= self.capacity:
+            return
+
+        capacity = max(self.INITIAL_CAPACITY, self.capacity)
+        while capacity < needed:
+            capacity *= 2
+        for array in (self.matrix, self.quantized, self.scales):
+            if array is not None:
+                array.flush()
+        # Grow the backing files in place; existing rows keep their offsets
+        self.capacity = capacity
+        self._map_arrays()
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self.alive)] = self.alive
+        self.alive = alive
+        self._write_meta()
+
+    def _write_meta(self):
+        with open(self._path(self.META_FILE), 'w') as f:
+            json.dump({'dim': self.dim, 'capacity': self.capacity, 'quantization': self.quantization,
+                       'version': 1}, f)
+
+    def _log(self, records: List[Dict[str, Any]]):
+        with open(self._path(self.RECORDS_FILE), 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + '\n')
+
+    def add(self, ids, embeddings, documents, metadatas):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if len(ids) == 0:
+            return
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        with self.lock:
+            start = self.size
+            end = start + len(ids)
+            self._ensure_capacity(end, vectors.shape[1])
+            self.matrix[start:end] = vectors
+            self.matrix.flush()
+            if self.quantization:
+                compact, scales = self._quantize(vectors)
+                self.quantized[start:end] = compact
+                self.quantized.flush()
+                if scales is not None:
+                    self.scales[start:end] = scales
+                    self.scales.flush()
+            records = []
+            for offset, (doc_id, document, metadata) in enumerate(zip(ids, documents, metadatas)):
+                self._append_record(start + offset, doc_id, document, metadata)
+                records.append({'op': 'add', 'row': start + offset, 'id': doc_id,
+                                'document': document, 'metadata': metadata})
+            self._log(records)
+
+    def _rows(self, ids=None, where=None) -> List[int]:
+        if ids is not None:
+            rows = [self.id_to_row[doc_id] for doc_id in ids if doc_id in self.id_to_row]
+        else:
+            rows = [int(row) for row in np.flatnonzero(self.alive[:self.size])]
+        if where:
+            rows = [row for row in rows if _matches_where(self.metadatas[row], where)]
+        return rows
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas"), limit=None, offset=None):
+        with self.lock:
+            rows = self._rows(ids, where)
+            rows = rows[offset or 0:]
+            if limit is not None:
+                rows = rows[:limit]
+            result = {'ids': [self.row_ids[row] for row in rows]}
+            if 'documents' in include:
+                result['documents'] = [self.documents[row] for row in rows]
+            if 'metadatas' in include:
+                result['metadatas'] = [self.metadatas[row] for row in rows]
+            if 'embeddings' in include:
+                result['embeddings'] = np.array(self.matrix[rows]) if rows else np.zeros((0, self.dim or 0), np.float32)
+            return result
+
+    def update(self, ids, metadatas):
+        with self.lock:
+            records = []
+            for doc_id, metadata in zip(ids, metadatas):
+                row = self.id_to_row.get(doc_id)
+                if row is not None:
+                    self.metadatas[row] = metadata
+                    records.append({'op': 'update', 'row': row, 'metadata': metadata})
+            self._log(records)
+
+    def delete(self, ids):
+        with self.lock:
+            rows = [self.id_to_row[doc_id] for doc_id in ids if doc_id in self.id_to_row]
+            for row in rows:
+                self._tombstone(row)
+            self._log([{'op': 'delete', 'row': row} for row in rows])
+
+    def count(self) -> int:
+        return len(self.id_to_row)
+
+    def _scan(self, query: np.ndarray) -> np.ndarray:
+        """Similarity of the query to every row, approximate when quantized"""
+        if not self.quantization:
+            return self.matrix[:self.size] @ query
+        scores = np.empty(self.size, dtype=np.float32)
+        buffer = np.empty((self.SCAN_BLOCK_ROWS, self.dim), dtype=np.float32)
+        for start in range(0, self.size, self.SCAN_BLOCK_ROWS):
+            end = min(start + self.SCAN_BLOCK_ROWS, self.size)
+            block = buffer[:end - start]
+            np.copyto(block, self.quantized[start:end], casting='unsafe')
+            np.dot(block, query, out=scores[start:end])
+        if self.scales is not None:
+            scores *= self.scales[:self.size]
+        return scores
+
+    def query(self, embedding, k, where=None):
+        with self.lock:
+            if self.matrix is None or not self.id_to_row:
+                return []
+            query = np.asarray(embedding, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1.0)
+
+            scores = self._scan(query)
+            mask = self.alive[:self.size].copy()
+            if where:
+                for row in np.flatnonzero(mask):
+                    mask[row] = _matches_where(self.metadatas[row], where)
+            scores = np.where(mask, scores, -np.inf)
+
+            available = int(mask.sum())
+            k = min(k, available)
+            if k <= 0:
+                return []
+
+            if self.quantization:
+                # Shortlist on the compact vectors, then rescore exactly from the float32 rows on disk
+                shortlist = min(available, k * self.rescore_factor)
+                candidates = np.sort(np.argpartition(-scores, shortlist - 1)[:shortlist])
+                exact = np.asarray(self.matrix[candidates]) @ query
+                order = np.argsort(-exact)[:k]
+                top, top_scores = candidates[order], exact[order]
+            else:
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top])]
+                top_scores = scores[top]
+
+            return [(self.row_ids[row], self.documents[row], self.metadatas[row], float(1.0 - score))
+                    for row, score in zip(top, top_scores)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            dead = self.size - len(self.id_to_row)
+            return {
+                "live": len(self.id_to_row),
+                "deleted": dead,
+                "rows": self.size,
+                "capacity": self.capacity,
+                "dead_ratio": round(dead / self.size, 4) if self.size else 0.0,
+                "bytes_on_disk": _directory_bytes(self.directory),
+                "quantization": self.quantization or "none",
+            }
+
+    def compact(self) -> Dict[str, Any]:
+        """Rewrite the store with only its live rows.
+
+        The copy is built next to the store while queries keep running against
+        the current files; only the final swap takes the lock. Callers must not
+        write to the store until this returns.
+        """
+        started = time.perf_counter()
+        before = self.stats()
+        pending = self.directory + ".compact"
+        shutil.rmtree(pending, ignore_errors=True)
+
+        with self.lock:
+            rows = [int(row) for row in np.flatnonzero(self.alive[:self.size])]
+        compacted = FlatVectorStore(pending, quantization=self.quantization, rescore_factor=self.rescore_factor)
+        for start in range(0, len(rows), self.INITIAL_CAPACITY):
+            batch = rows[start:start + self.INITIAL_CAPACITY]
+            compacted.add([self.row_ids[row] for row in batch], np.asarray(self.matrix[batch]),
+                          [self.documents[row] for row in batch], [self.metadatas[row] for row in batch])
+        if compacted.dim is None and self.dim is not None:
+            compacted._ensure_capacity(1, self.dim)  # Nothing live: keep an empty store of the same shape
+        compacted._log([])
+
+        with self.lock:
+            for array in (self.matrix, self.quantized, self.scales):
+                if array is not None:
+                    array.flush()
+            self.matrix = self.quantized = self.scales = None
+            os.rename(self.directory, self.directory + ".old")
+            os.rename(pending, self.directory)
+            # Adopt the compacted state, then map the files at their final location
+            for name in ('dim', 'size', 'capacity', 'alive', 'row_ids', 'documents', 'metadatas',
+                         'id_to_row', 'tombstones'):
+                setattr(self, name, getattr(compacted, name))
+            if self.dim is not None and self.capacity:
+                self._map_arrays()
+        compacted.matrix = compacted.quantized = compacted.scales = None
+        shutil.rmtree(self.directory + ".old", ignore_errors=True)
+
+        after = self.stats()
+        logger.info(f"🧹 Compacted flat store: {before['rows']} -> {after['rows']} rows, "
+                    f"{before['bytes_on_disk'] / 1024 / 1024:.1f} -> {after['bytes_on_disk'] / 1024 / 1024:.1f} MB")
+        return {"before": before, "after": after, "compact_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    def memory_bytes(self) -> int:
+        """Bytes of vector data touched by every query (the working set kept hot in RAM)"""
+        if self.dim is None:
+            return 0
+        if self.quantization:
+            _, dtype = self.QUANTIZED_FILES[self.quantization]
+            scale_bytes = 4 if self.scales is not None else 0
+            return self.size * (self.dim * np.dtype(dtype).itemsize + scale_bytes)
+        return self.size * self.dim * 4
+
+
+class DualWriteStore(VectorStoreBackend):
+    """Serves reads from the current store and mirrors every write into a migration target.
+
+    Documents added to the target are embedded with the target's model, so
+    chunks written during an embedding model migration never need a second
+    backfill pass. IDs whose target write failed are kept for the backfill.
+    """
+
+    name = "dual-write"
+
+    def __init__(self, primary: VectorStoreBackend, target: VectorStoreBackend, embeddings):
+        self.primary = primary
+        self.target = target
+        self.embeddings = embeddings
+        self.failed_ids: set = set()
+
+    def __getattr__(self, name):
+        # Backend-specific helpers (HNSW settings, segment cleanup) apply to the store being served
+        return getattr(self.primary, name)
+
+    def add(self, ids, embeddings, documents, metadatas):
+        self.primary.add(ids, embeddings, documents, metadatas)
+        try:
+            self.target.add(ids, self.embeddings.embed_documents(list(documents)), documents, metadatas)
+        except Exception as e:
+            logger.warning(f"Migration target missed {len(ids)} chunks, the backfill will retry them: {e}")
+            self.failed_ids.update(ids)
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas"), limit=None, offset=None):
+        return self.primary.get(ids=ids, where=where, include=include, limit=limit, offset=offset)
+
+    def update(self, ids, metadatas):
+        self.primary.update(ids, metadatas)
+        try:
+            self.target.update(ids, metadatas)
+        except Exception as e:
+            logger.warning(f"Migration target missed a metadata update, the backfill will retry it: {e}")
+            self.failed_ids.update(ids)
+
+    def delete(self, ids):
+        self.primary.delete(ids)
+        # A delete the target misses leaves an extra ID, which cutover removes
+        try:
+            self.target.delete(ids)
+        except Exception as e:
+            logger.warning(f"Migration target missed a delete of {len(ids)} chunks: {e}")
+
+    def count(self) -> int:
+        return self.primary.count()
+
+    def query(self, embedding, k, where=None):
+        return self.primary.query(embedding, k, where)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.primary.stats()
+
+
+def stored_dimension(store: VectorStoreBackend) -> Optional[int]:
+    """Dimension of the vectors in a store, or None if it is empty"""
+    records = store.get(include=["embeddings"], limit=1)
+    embeddings = records.get('embeddings')
+    return len(embeddings[0]) if embeddings is not None and len(embeddings) else None
+
+
 class YAMLFrontmatterLoader(TextLoader):
     """Custom loader that parses YAML frontmatter from markdown files"""
 
@@ -27,8 +780,11 @@ class YAMLFrontmatterLoader(TextLoader):
     def load(self) -> List[Document]:
         """Load markdown file and parse YAML frontmatter"""
         logger.info(f"🔍 YAMLFrontmatterLoader processing: {self.file_path}")
-        with open(self.file_path, encoding=self.encoding) as f:
-            content = f.read()
+        stat_result = os.stat(self.file_path)
+        with open(self.file_path, 'rb') as f:
+            raw = f.read()
+        # Decode with universal newlines, as text-mode open() would
+        content = raw.decode(self.encoding or 'utf-8').replace('\r\n', '\n').replace('\r', '\n')
 
         # Parse YAML frontmatter
         frontmatter_data = {}
@@ -53,6 +809,10 @@ class YAMLFrontmatterLoader(TextLoader):
         # Create document with enhanced metadata
         metadata = {
             'source': self.file_path,
+            # File state at index time, compared by the startup reconciliation scan
+            'file_size': stat_result.st_size,
+            'file_mtime': stat_result.st_mtime,
+            'content_hash': content_hash(raw),
         }
 
         # Convert complex metadata types to strings for ChromaDB compatibility
@@ -69,10 +829,32 @@ class YAMLFrontmatterLoader(TextLoader):
 
         return [result_doc]
 
+
+def file_summary(document: Document) -> str:
+    """Text behind a note's file-level vector: title, frontmatter, headings, then the opening text"""
+    lines = [Path(document.metadata.get('source', '')).stem]
+    lines += [f"{key}: {value}" for key, value in document.metadata.items() if key not in FILE_STATE_KEYS]
+    lines += HEADING_PATTERN.findall(document.page_content)
+    summary = "\n".join(lines)
+    # Notes without headings would otherwise be little more than a title
+    if len(summary) < FILE_SUMMARY_MAX_CHARS:
+        summary += "\n" + document.page_content.strip()[:FILE_SUMMARY_MAX_CHARS - len(summary) - 1]
+    return summary[:FILE_SUMMARY_MAX_CHARS]
+
+
 class ForgeRAG:
-    def __init__(self, persist_directory: str = "./chroma_db", model_name: str = "nomic-embed-text"):
+    def __init__(self, persist_directory: str = "./chroma_db", model_name: str = DEFAULT_EMBEDDING_MODEL,
+                 backend: str = DEFAULT_VECTOR_BACKEND, hnsw_construction_ef: int = DEFAULT_HNSW_CONSTRUCTION_EF,
+                 hnsw_search_ef: int = DEFAULT_HNSW_SEARCH_EF, hnsw_m: int = DEFAULT_HNSW_M):
         self.persist_directory = persist_directory
         self.model_name = model_name
+        # The model asked for; differs from model_name while the index still holds another model's vectors
+        self.configured_model = model_name
+        self.dimension: Optional[int] = None
+        self.migration = None  # Running EmbeddingMigration, if any
+        self.last_migration: Optional[Dict[str, Any]] = None
+        self.backend_name = backend
+        self.hnsw = {"construction_ef": hnsw_construction_ef, "search_ef": hnsw_search_ef, "M": hnsw_m}
         self.embeddings = OllamaEmbeddings(model=model_name)
         # Use markdown-aware text splitter that keeps sections together
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -90,7 +872,19 @@ class ForgeRAG:
             keep_separator=True,  # Keep section headers with content
         )
         self.vectorstore = None
+        # One Chroma client per index directory, shared by every collection and closed by close()
+        self.chroma_client = None
+        self.store: Optional[VectorStoreBackend] = None
+        self.file_store: Optional[VectorStoreBackend] = None  # One summary vector per note
+        # Held by every index write; compaction holds it so writers wait while searches carry on
+        self.write_lock = threading.RLock()
+        # Pending drops of collections replaced by compaction or migration, cancelled by close()
+        self.retire_timers: List[threading.Timer] = []
+        # Bumped after every index write; caches derived from the index compare against it
+        self.generation = 0
+        self._listing: Optional[Tuple[int, List[Tuple[str, int, str]]]] = None
         self._initialize_vectorstore()
+        self._check_embedding_model()
 
     def _smart_chunk_document(self, document: Document) -> List[Document]:
         """Smart chunking that keeps task lists and project sections together"""
@@ -232,53 +1026,325 @@ class ForgeRAG:
         return chunks if chunks else [Document(page_content=content, metadata=metadata)]
 
     def _initialize_vectorstore(self):
-        """Initialize or load existing Chroma vectorstore"""
-        try:
-            # Try to load existing vectorstore
-            self.vectorstore = Chroma(
-                persist_directory=self.persist_directory,
-                embedding_function=self.embeddings,
-                collection_metadata={"hnsw:space": "cosine"}  # Use cosine distance
-            )
+        """Initialize or load the configured vector store backend"""
+        self.vectorstore, self.store, self.file_store = self._open_stores(*self._store_names(), self.embeddings)
+        # Nothing can still be reading collections an earlier compaction or migration replaced
+        self._drop_retired_collections()
+        if self.vectorstore is not None:
             logger.info(f"✅ Loaded existing vectorstore from {self.persist_directory}")
+            self._sync_hnsw_settings()
+
+    def _open_stores(self, chunks_name: str, files_name: str, embeddings,
+                     count_deletes: bool = True) -> Tuple[Any, VectorStoreBackend, VectorStoreBackend]:
+        """(LangChain vectorstore or None, chunk store, file summary store) for the given names"""
+        if self.backend_name == FlatVectorStore.name:
+            return (None, FlatVectorStore(os.path.join(self.persist_directory, chunks_name)),
+                    FlatVectorStore(os.path.join(self.persist_directory, files_name)))
+
+        # Cosine distance; the HNSW parameters only take effect when the collection is created
+        collection_metadata = hnsw_metadata(self.hnsw["construction_ef"], self.hnsw["search_ef"], self.hnsw["M"])
+        if self.chroma_client is None:
+            self.chroma_client = chromadb.PersistentClient(path=self.persist_directory)
+        vectorstore = Chroma(
+            collection_name=chunks_name,
+            client=self.chroma_client,
+            embedding_function=embeddings,
+            collection_metadata=collection_metadata
+        )
+        store = ChromaBackend(vectorstore._collection, self.persist_directory if count_deletes else None)
+        file_store = ChromaBackend(self.chroma_client.get_or_create_collection(files_name, metadata=collection_metadata))
+        return vectorstore, store, file_store
+
+    def _store_names(self) -> Tuple[str, str]:
+        """Active chunk and file summary collections (directories for the flat backend)"""
+        state = _read_index_state(self.persist_directory)
+        if self.backend_name == FlatVectorStore.name:
+            defaults = (DEFAULT_FLAT_DIRECTORY, DEFAULT_FLAT_FILES_DIRECTORY)
+        else:
+            defaults = (DEFAULT_COLLECTION_NAME, FILE_COLLECTION_NAME)
+        return state.get("collection") or defaults[0], state.get("files_collection") or defaults[1]
+
+    def _use_embedding_model(self, model_name: str):
+        self.model_name = model_name
+        self.embeddings = OllamaEmbeddings(model=model_name)
+        if self.vectorstore is not None:
+            self.vectorstore._embedding_function = self.embeddings
+
+    def _check_embedding_model(self):
+        """Check the recorded embedding model against the configured one, keeping search consistent"""
+        state = _read_index_state(self.persist_directory)
+        recorded = state.get("embedding_model")
+        if not self.store.count():
+            if recorded != self.configured_model or state.get("migration"):
+                # Nothing to migrate: an empty index simply takes the configured model
+                _update_index_state(self.persist_directory, embedding_model=self.configured_model, dimension=None,
+                                    migration=None)
+            return
+
+        self.dimension = state.get("dimension") or stored_dimension(self.store)
+        if recorded is None:
+            # Indexes from before the model was recorded were built with the then-hardcoded default
+            recorded = "nomic-embed-text"
+            _update_index_state(self.persist_directory, embedding_model=recorded, dimension=self.dimension)
+        if recorded != self.model_name:
+            # Query vectors have to come from the model that built the index, or search returns noise
+            self._use_embedding_model(recorded)
+            logger.warning(f"⚠️ Index at {self.persist_directory} was embedded with {recorded}; "
+                           f"searching with it until a migration to {self.configured_model} completes")
+
+        migration = state.get("migration")
+        if migration:
+            # Resume dual-writing right away; the backfill restarts with resume_embedding_migration()
+            self._attach_migration(migration)
+
+    def _record_dimension(self, vectors):
+        """Record the index dimension on first write and refuse vectors of another size"""
+        if not len(vectors):
+            return
+        dimension = len(vectors[0])
+        if self.dimension is None:
+            self.dimension = dimension
+            _update_index_state(self.persist_directory, embedding_model=self.model_name, dimension=dimension)
+        elif dimension != self.dimension:
+            raise ValueError(f"{self.model_name} returned {dimension}-dimensional vectors, "
+                             f"but the index holds {self.dimension}-dimensional ones")
+
+    def _attach_migration(self, migration: Dict[str, Any]):
+        """Open a migration's target stores and start dual-writing into them"""
+        from embedding_migration import EmbeddingMigration
+        embeddings = OllamaEmbeddings(model=migration["model"])
+        vectorstore, store, file_store = self._open_stores(migration["collection"], migration["files_collection"],
+                                                           embeddings, count_deletes=False)
+        self.store = DualWriteStore(self.store, store, embeddings)
+        self.file_store = DualWriteStore(self.file_store, file_store, embeddings)
+        self.migration = EmbeddingMigration(self, migration, vectorstore, embeddings)
+
+    def start_embedding_migration(self, model_name: Optional[str] = None) -> Dict[str, Any]:
+        """Start moving the index to another embedding model without interrupting search.
+
+        New writes go to both indexes from here on, the rest is re-embedded in
+        the background at a throttled rate, and searches switch over once the
+        new index is complete.
+        """
+        model_name = model_name or self.configured_model
+        with self.write_lock:
+            if self.migration is not None:
+                raise ValueError(f"Already migrating to {self.migration.model_name}")
+            if model_name == self.model_name:
+                raise ValueError(f"Index already uses {model_name}")
+            suffix = int(time.time() * 1000)
+            if self.backend_name == FlatVectorStore.name:
+                names = (f"{DEFAULT_FLAT_DIRECTORY}-{suffix}", f"{DEFAULT_FLAT_FILES_DIRECTORY}-{suffix}")
+            else:
+                names = (f"forge-{suffix}", f"{FILE_COLLECTION_NAME}-{suffix}")
+            migration = {"model": model_name, "collection": names[0], "files_collection": names[1],
+                         "started_at": datetime.now().isoformat()}
+            _update_index_state(self.persist_directory, migration=migration)
+            self._attach_migration(migration)
+        logger.info(f"🔁 Migrating {self.persist_directory} from {self.model_name} to {model_name}")
+        self.migration.start()
+        return self.migration.status()
+
+    def resume_embedding_migration(self) -> bool:
+        """Continue a migration recorded before a restart, or start one if the configured model changed"""
+        if self.migration is not None:
+            self.migration.start()
+            return True
+        if self.model_name != self.configured_model and EMBEDDING_MIGRATION_MODE == "auto":
+            try:
+                self.start_embedding_migration()
+                return True
+            except Exception as e:
+                logger.error(f"❌ Could not start embedding migration to {self.configured_model}: {e}")
+        return False
+
+    def cancel_embedding_migration(self, reason: Optional[str] = None) -> bool:
+        """Stop a migration, dropping its partial index and keeping the current model"""
+        migration = self.migration
+        if migration is None:
+            return False
+        migration.cancel_event.set()
+        with self.write_lock:
+            targets = (self.store.target, self.file_store.target)
+            self.store, self.file_store = self.store.primary, self.file_store.primary
+            self.migration = None
+            self.last_migration = {**migration.status(), "stage": "failed" if reason else "cancelled", "error": reason}
+            _update_index_state(self.persist_directory, migration=None)
+            self._drop_stores(migration.vectorstore, *targets)
+        logger.info(f"🛑 Migration to {migration.model_name} stopped" + (f": {reason}" if reason else ""))
+        return True
+
+    def close(self):
+        """Stop background work and release the index's files so its directory can be deleted"""
+        if self.migration is not None:
+            self.migration.cancel_event.set()
+        with self.write_lock:
+            for timer in self.retire_timers:
+                timer.cancel()
+            self.retire_timers = []
+            if self.chroma_client is None:
+                return
+            # Releases this directory's Chroma system once its last client closes; other indexes keep theirs
+            self.chroma_client.close()
+            self.chroma_client = None
+
+    def _drop_stores(self, vectorstore, store: VectorStoreBackend, file_store: VectorStoreBackend):
+        """Delete a pair of stores that are no longer served"""
+        if isinstance(store, FlatVectorStore):
+            for directory in (store.directory, file_store.directory):
+                shutil.rmtree(directory, ignore_errors=True)
+            return
+        try:
+            vectorstore.delete_collection()
+            self.chroma_client.delete_collection(file_store.collection.name)
+            self.store.remove_orphaned_segments()
         except Exception as e:
-            # Create new vectorstore if loading fails
-            logger.info(f"Creating new vectorstore: {e}")
-            self.vectorstore = Chroma(
-                persist_directory=self.persist_directory,
-                embedding_function=self.embeddings,
-                collection_metadata={"hnsw:space": "cosine"}  # Use cosine distance
-            )
-    
+            logger.warning(f"Could not drop collections {store.collection.name}/{file_store.collection.name}: {e}")
+
+    def finish_embedding_migration(self, migration) -> Dict[str, Any]:
+        """Switch searches and writes to the migrated index and retire the old one (caller checked completeness)"""
+        with self.write_lock:
+            if self.migration is not migration:
+                raise RuntimeError("Migration was cancelled")
+            old_names = [self._store_name(self.store.primary), self._store_name(self.file_store.primary)]
+            new_store, new_file_store = self.store.target, self.file_store.target
+            dimension = stored_dimension(new_store)
+            _update_index_state(self.persist_directory, collection=migration.collection,
+                                files_collection=migration.files_collection, embedding_model=migration.model_name,
+                                dimension=dimension, deleted=0, migration=None)
+            self._retire_collections(old_names)
+            if isinstance(new_store, ChromaBackend):
+                new_store.persist_directory = self.persist_directory
+            previous_model = self.model_name
+            self.vectorstore, self.store, self.file_store = migration.vectorstore, new_store, new_file_store
+            self.model_name, self.embeddings, self.dimension = migration.model_name, migration.embeddings, dimension
+            self.configured_model = migration.model_name if self.configured_model == previous_model else self.configured_model
+            self.migration = None
+            self.generation += 1
+        logger.info(f"✅ Switched {self.persist_directory} from {previous_model} to {migration.model_name} "
+                    f"({dimension} dimensions)")
+        return {"previous_model": previous_model, "model": migration.model_name, "dimension": dimension}
+
+    def embedding_status(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "dimension": self.dimension,
+            "configured_model": self.configured_model,
+            "migration": self.migration.status() if self.migration else None,
+            "last_migration": self.last_migration,
+        }
+
+    def _sync_hnsw_settings(self):
+        """Apply a changed search_ef to an existing collection and flag graph parameters that need a rebuild"""
+        current = self.store.hnsw_settings()
+        if current["search_ef"] != self.hnsw["search_ef"]:
+            try:
+                self.store.set_search_ef(self.hnsw["search_ef"])
+                logger.info(f"🔧 HNSW search_ef {current['search_ef']} -> {self.hnsw['search_ef']}")
+            except Exception as e:
+                logger.warning(f"Could not change HNSW search_ef: {e}")
+        if self.hnsw_rebuild_needed():
+            logger.warning(f"⚠️ Index was built with HNSW construction_ef={current['construction_ef']}, "
+                           f"M={current['M']}; configured {self.hnsw['construction_ef']}/{self.hnsw['M']} "
+                           f"takes effect on the next full rebuild")
+
+    def hnsw_rebuild_needed(self) -> bool:
+        """Whether the collection's graph was built with different construction_ef or M than configured"""
+        if not isinstance(self.store, ChromaBackend):
+            return False
+        current = self.store.hnsw_settings()
+        return (current["construction_ef"], current["M"]) != (self.hnsw["construction_ef"], self.hnsw["M"])
+
+    def hnsw_status(self) -> Dict[str, Any]:
+        """Configured and effective HNSW parameters (empty for the flat backend, which is exact)"""
+        if not isinstance(self.store, ChromaBackend):
+            return {}
+        return {"configured": dict(self.hnsw), "effective": self.store.hnsw_settings(),
+                "rebuild_needed": self.hnsw_rebuild_needed()}
+
+    def embed_query(self, query: str) -> List[float]:
+        """Query embedding, shared by every index using the same model (e.g. a cross-vault fan-out)"""
+        key = (self.model_name, query)
+        with _query_embedding_lock:
+            embedding = _query_embedding_cache.pop(key, None)
+            if embedding is not None:
+                _query_embedding_cache[key] = embedding
+                return embedding
+        embedding = self.embeddings.embed_query(query)
+        with _query_embedding_lock:
+            _query_embedding_cache[key] = embedding
+            while len(_query_embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+                _query_embedding_cache.pop(next(iter(_query_embedding_cache)))
+        return embedding
+
+    def _similarity_search_with_score(self, query: str, k: int) -> List[tuple]:
+        """(Document, cosine distance) pairs for a query, closest first, from any backend"""
+        embedding = self.embed_query(query)
+        if self._use_hierarchical_search():
+            results = self._hierarchical_query(embedding, k)
+        else:
+            results = self.store.query(embedding, k)
+        return [(Document(id=doc_id, page_content=document, metadata=metadata or {}), distance)
+                for doc_id, document, metadata, distance in results]
+
+    def _use_hierarchical_search(self) -> bool:
+        if HIERARCHICAL_MIN_CHUNKS < 0 or self.file_store is None or self.file_store.count() == 0:
+            return False
+        return self.store.count() >= HIERARCHICAL_MIN_CHUNKS
+
+    def _hierarchical_query(self, embedding, k: int) -> List[Tuple[str, str, Dict[str, Any], float]]:
+        """Rank notes by their summary vectors, then score only the chunks of the top ones exactly"""
+        files = self.file_store.query(embedding, max(FILE_CANDIDATES, k))
+        # Chunk IDs are derived from source and position, so the candidates' chunks are fetched directly
+        ids = [self._chunk_id(metadata['source'], index) for _, _, metadata, _ in files
+               for index in range(metadata.get('chunk_count', 0))]
+        if not ids:
+            return self.store.query(embedding, k)
+        records = self.store.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+        if not len(records['ids']):
+            return self.store.query(embedding, k)
+
+        vectors = np.asarray(records['embeddings'], dtype=np.float32)
+        query = np.asarray(embedding, dtype=np.float32)
+        similarities = vectors @ query / np.maximum(np.linalg.norm(vectors, axis=1) * np.linalg.norm(query), 1e-12)
+        top = np.argsort(-similarities)[:k]
+        return [(records['ids'][i], records['documents'][i], records['metadatas'][i], float(1.0 - similarities[i]))
+                for i in top]
+
+    @_exclusive_write
     def load_and_index_directory(self, directory_path: str, incremental: bool = False) -> int:
         """Load all markdown files from directory and index them"""
         try:
-            if not incremental:
+            if not incremental and self.migration is None and self.hnsw_rebuild_needed():
+                # Graph parameters are fixed per collection: recreate it with the configured ones
+                logger.info(f"🔧 Recreating collection with HNSW construction_ef={self.hnsw['construction_ef']}, "
+                            f"M={self.hnsw['M']}")
+                self.vectorstore.delete_collection()
+                self._initialize_vectorstore()
+                self.file_store.delete(self.file_store.get(include=[])['ids'])
+            elif not incremental:
                 # Full rebuild: Clear existing documents first
                 try:
-                    if hasattr(self.vectorstore._collection, 'count') and self.vectorstore._collection.count() > 0:
+                    if self.store.count() > 0:
                         # Get all document IDs first
-                        all_docs = self.vectorstore._collection.get()
+                        all_docs = self.store.get(include=[])
                         if all_docs and all_docs.get('ids'):
-                            self.vectorstore._collection.delete(ids=all_docs['ids'])
+                            self.store.delete(all_docs['ids'])
                             logger.info(f"🗑️ Cleared {len(all_docs['ids'])} existing documents")
+                    self.file_store.delete(self.file_store.get(include=[])['ids'])
                 except Exception as e:
                     logger.warning(f"Could not clear existing documents: {e}")
                     # Create new vectorstore if clearing fails
-                    self.vectorstore = Chroma(
-                        persist_directory=self.persist_directory,
-                        embedding_function=self.embeddings
-                    )
+                    self._initialize_vectorstore()
             else:
                 # Incremental update: Remove deleted files AND existing chunks from files being reprocessed
                 self._clean_deleted_files(directory_path)
 
             # Load documents with YAML frontmatter parsing (direct approach due to DirectoryLoader issues)
             documents = []
-            import glob as glob_module
 
-            # Find all markdown files
-            md_files = glob_module.glob(os.path.join(directory_path, "**/*.md"), recursive=True)
+            # Same notes reconciliation and the catalog track, so a rebuild and the next reconcile agree
+            md_files = list(iter_vault_notes(directory_path))
             logger.info(f"Found {len(md_files)} markdown files to process")
 
             for file_path in md_files:
@@ -297,37 +1363,367 @@ class ForgeRAG:
             if incremental:
                 self._remove_existing_file_chunks(documents)
 
-            # Split documents into chunks using smart chunking
-            text_chunks = []
-            for doc in documents:
-                chunks = self._smart_chunk_document(doc)
-                text_chunks.extend(chunks)
-
-            # Enhance chunks with filename keywords for better searchability
-            enhanced_chunks = []
-            for chunk in text_chunks:
-                # Extract filename without extension
-                filename = Path(chunk.metadata.get('source', '')).stem
-                # Add filename terms to the beginning of content for better matching
-                enhanced_content = f"[{filename}] {chunk.page_content}"
-                chunk.page_content = enhanced_content
-                enhanced_chunks.append(chunk)
+            # Split, enhance and add chunks to vectorstore
+            num_chunks = self._index_documents(documents)
+
+            logger.info(f"✅ Indexed {num_chunks} chunks from {len(documents)} documents")
+            return num_chunks
 
-            # Add documents to vectorstore
-            self.vectorstore.add_documents(enhanced_chunks)
-            
-            logger.info(f"✅ Indexed {len(text_chunks)} chunks from {len(documents)} documents")
-            return len(text_chunks)
-            
         except Exception as e:
             logger.error(f"Error indexing directory {directory_path}: {e}")
             return 0
 
+    @staticmethod
+    def _chunk_id(source: str, index: int) -> str:
+        """Deterministic chunk ID derived from the source path and chunk position"""
+        return f"{hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]}-{index:04d}"
+
+    def _prepare_chunks(self, documents: List[Document]) -> tuple:
+        """Chunk documents and return (chunks, ids) ready for the vectorstore"""
+        all_chunks, all_ids = [], []
+        for doc in documents:
+            source = doc.metadata.get('source', '')
+            # Extract filename without extension
+            filename = Path(source).stem
+            for index, chunk in enumerate(self._smart_chunk_document(doc)):
+                # Add filename terms to the beginning of content for better matching
+                chunk.page_content = f"[{filename}] {chunk.page_content}"
+                chunk.metadata = {**chunk.metadata, 'chunk_index': index}
+                all_chunks.append(chunk)
+                all_ids.append(self._chunk_id(source, index))
+        return all_chunks, all_ids
+
+    def _index_documents(self, documents: List[Document]) -> int:
+        """Split documents into chunks using smart chunking and add them to the vectorstore"""
+        chunks, ids = self._prepare_chunks(documents)
+        if chunks:
+            texts = [chunk.page_content for chunk in chunks]
+            vectors = self.embeddings.embed_documents(texts)
+            self._record_dimension(vectors)
+            self.store.add(ids, vectors, texts, [chunk.metadata for chunk in chunks])
+        chunk_counts: Dict[str, int] = {}
+        for chunk in chunks:
+            source = chunk.metadata.get('source', '')
+            chunk_counts[source] = chunk_counts.get(source, 0) + 1
+        self._index_file_summaries(documents, chunk_counts)
+        return len(chunks)
+
+    @staticmethod
+    def _file_id(source: str) -> str:
+        """File-level summary ID, the prefix shared by the file's chunk IDs"""
+        return hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+
+    def _index_file_summaries(self, documents: List[Document], chunk_counts: Dict[str, int]):
+        """Embed one summary vector per note for the first stage of hierarchical search"""
+        documents = [doc for doc in documents if chunk_counts.get(doc.metadata.get('source', ''))]
+        if not documents:
+            return
+        try:
+            summaries = [file_summary(doc) for doc in documents]
+            sources = [doc.metadata.get('source', '') for doc in documents]
+            self.file_store.add([self._file_id(source) for source in sources],
+                                self.embeddings.embed_documents(summaries), summaries,
+                                [{'source': source, 'chunk_count': chunk_counts[source]} for source in sources])
+        except Exception as e:
+            # Search falls back to the files it has summaries for; the next reconcile fills the gap
+            logger.warning(f"Could not index file summaries for {len(documents)} files: {e}")
+
+    @_exclusive_write
+    def index_missing_file_summaries(self) -> int:
+        """Summarize indexed files that have no file-level vector yet (older indexes, snapshot imports)"""
+        indexed = self.indexed_files()
+        expected = {self._file_id(source): source for source in indexed}
+        existing = set(self.file_store.get(include=[])['ids'])
+        stale = [file_id for file_id in existing if file_id not in expected]
+        if stale:
+            self.file_store.delete(stale)
+        missing = [source for file_id, source in expected.items() if file_id not in existing]
+        chunk_counts = {source: len(record['ids']) for source, record in indexed.items()}
+        for i in range(0, len(missing), FILE_SUMMARY_BATCH_SIZE):
+            documents = []
+            for source in missing[i:i + FILE_SUMMARY_BATCH_SIZE]:
+                try:
+                    documents.extend(YAMLFrontmatterLoader(source, encoding="utf-8").load())
+                except Exception as e:
+                    logger.warning(f"Could not summarize {source}: {e}")
+            self._index_file_summaries(documents, chunk_counts)
+        if missing:
+            logger.info(f"📑 Added file summaries for {len(missing)} notes")
+        return len(missing)
+
+    @_exclusive_write
+    def index_files(self, file_paths: Iterable[str]) -> int:
+        """(Re)index specific files, replacing any chunks they already have"""
+        file_paths = [str(path) for path in file_paths]
+        documents = []
+        for file_path in file_paths:
+            try:
+                loader = YAMLFrontmatterLoader(file_path, encoding="utf-8")
+                documents.extend(loader.load())
+            except Exception as e:
+                logger.warning(f"Failed to load {file_path}: {e}")
+
+        self.remove_files(file_paths)
+        num_chunks = self._index_documents(documents)
+        logger.info(f"✅ Indexed {num_chunks} chunks from {len(documents)} changed files")
+        return num_chunks
+
+    @_exclusive_write
+    def remove_files(self, file_paths: Iterable[str]) -> int:
+        """Remove every chunk whose source is one of the given files"""
+        sources = [str(path) for path in file_paths]
+        if not sources:
+            return 0
+        try:
+            existing = self.store.get(where={"source": {"$in": sources}}, include=[])
+            ids = existing.get('ids', []) if existing else []
+            self.file_store.delete([self._file_id(source) for source in sources])
+            if ids:
+                self.store.delete(ids)
+                logger.info(f"🗑️ Removed {len(ids)} chunks for {len(sources)} files")
+            return len(ids)
+        except Exception as e:
+            logger.error(f"Error removing chunks for {len(sources)} files: {e}")
+            return 0
+
+    @_exclusive_write
+    def rename_source(self, old_path: str, new_path: str, is_directory: bool = False) -> int:
+        """Point existing chunks at a moved file or folder without re-embedding them"""
+        try:
+            collection = self.store
+            if is_directory:
+                # Chroma can't filter by prefix, so match folder moves on the metadata scan
+                old_prefix = old_path.rstrip(os.sep) + os.sep
+                all_meta = collection.get(include=["metadatas"])
+                ids = [doc_id for doc_id, meta in zip(all_meta['ids'], all_meta['metadatas'])
+                       if (meta or {}).get('source', '').startswith(old_prefix)]
+                if not ids:
+                    return 0
+                records = collection.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+            else:
+                records = collection.get(where={"source": old_path}, include=["embeddings", "documents", "metadatas"])
+
+            if not records or not records.get('ids'):
+                return 0
+
+            moves = {}
+            for metadata in records['metadatas']:
+                old_source = metadata.get('source', '')
+                moves[old_source] = new_path + old_source[len(old_path.rstrip(os.sep)):] if is_directory else new_path
+            # Chunks indexed before chunk_index was recorded can't be given their stable IDs; re-index those files
+            legacy = {metadata.get('source', '') for metadata in records['metadatas'] if 'chunk_index' not in metadata}
+
+            old_ids, new_ids, embeddings, new_documents, new_metadatas = [], [], [], [], []
+            for doc_id, embedding, document, metadata in zip(records['ids'], records['embeddings'],
+                                                             records['documents'], records['metadatas']):
+                old_source = metadata.get('source', '')
+                if old_source in legacy:
+                    continue
+                new_source = moves[old_source]
+                old_stem, new_stem = Path(old_source).stem, Path(new_source).stem
+
+                # Keep the "[filename] " prefix in sync; the embedding itself is reused as-is
+                if old_stem != new_stem and document.startswith(f"[{old_stem}] "):
+                    document = f"[{new_stem}] " + document[len(old_stem) + 3:]
+
+                old_ids.append(doc_id)
+                new_ids.append(self._chunk_id(new_source, metadata['chunk_index']))
+                embeddings.append(embedding)
+                new_documents.append(document)
+                new_metadatas.append({**metadata, 'source': new_source})
+
+            if new_ids:
+                # New IDs hash the new path, so add before deleting: a failed add leaves the old chunks in place
+                collection.add(new_ids, embeddings, new_documents, new_metadatas)
+                collection.delete(old_ids)
+                self._rename_file_summaries({old_source: new_source for old_source, new_source in moves.items()
+                                             if old_source not in legacy})
+                logger.info(f"🔀 Moved {len(new_ids)} chunks from {old_path} to {new_path} without re-embedding")
+            if legacy:
+                self.remove_files(legacy)
+                self.index_files(moves[old_source] for old_source in legacy if os.path.exists(moves[old_source]))
+            return len(new_ids)
+
+        except Exception as e:
+            logger.error(f"Error renaming {old_path} to {new_path}: {e}")
+            return 0
+
+    def _rename_file_summaries(self, moves: Dict[str, str]):
+        """Re-key moved notes' summary vectors, keeping the embeddings like their chunks do"""
+        records = self.file_store.get(ids=[self._file_id(old_source) for old_source in moves],
+                                      include=["embeddings", "documents", "metadatas"])
+        if not len(records['ids']):
+            return
+        new_ids, new_documents, new_metadatas = [], [], []
+        for document, metadata in zip(records['documents'], records['metadatas']):
+            old_source = metadata.get('source', '')
+            new_source = moves.get(old_source, old_source)
+            old_stem, new_stem = Path(old_source).stem, Path(new_source).stem
+            if document.startswith(old_stem + "\n"):
+                document = new_stem + document[len(old_stem):]
+            new_ids.append(self._file_id(new_source))
+            new_documents.append(document)
+            new_metadatas.append({**metadata, 'source': new_source})
+        self.file_store.add(new_ids, records['embeddings'], new_documents, new_metadatas)
+        self.file_store.delete(records['ids'])
+
+    def indexed_files(self) -> Dict[str, Dict[str, Any]]:
+        """Per-file state recorded in the index: size, mtime, content hash and chunk IDs"""
+        files = {}
+        all_meta = self.store.get(include=["metadatas"])
+        for doc_id, metadata in zip(all_meta.get('ids', []), all_meta.get('metadatas', [])):
+            metadata = metadata or {}
+            source = metadata.get('source')
+            if not source:
+                continue
+            record = files.setdefault(source, {
+                'size': metadata.get('file_size'),
+                'mtime': metadata.get('file_mtime'),
+                'hash': metadata.get('content_hash'),
+                'ids': [],
+            })
+            record['ids'].append(doc_id)
+        return files
+
+    @_exclusive_write
+    def update_file_stats(self, chunk_ids: List[str], size: int, mtime: float) -> int:
+        """Record a new size/mtime for unchanged content without re-embedding"""
+        if not chunk_ids:
+            return 0
+        records = self.store.get(ids=chunk_ids, include=["metadatas"])
+        metadatas = [{**(metadata or {}), 'file_size': size, 'file_mtime': mtime}
+                     for metadata in records['metadatas']]
+        self.store.update(records['ids'], metadatas)
+        return len(records['ids'])
+
+    def _orphaned_sources(self, vault_root: Optional[str] = None) -> List[str]:
+        """Indexed sources whose file is gone (or, given a vault root, that are outside it)"""
+        root_prefix = os.path.abspath(vault_root).rstrip(os.sep) + os.sep if vault_root else None
+        return sorted(source for source in self.indexed_files()
+                      if not os.path.exists(source) or (root_prefix and not source.startswith(root_prefix)))
+
+    def index_stats(self, vault_root: Optional[str] = None) -> Dict[str, Any]:
+        """Live and deleted entries, bytes on disk and orphaned sources for this index"""
+        orphaned = self._orphaned_sources(vault_root)
+        return {
+            "backend": self.backend_name,
+            **self.store.stats(),
+            "file_summaries": self.file_store.count() if self.file_store else 0,
+            "orphaned_sources": len(orphaned),
+            "orphaned_source_paths": orphaned[:20],
+        }
+
+    def compact(self, vault_root: Optional[str] = None) -> Dict[str, Any]:
+        """Drop orphaned sources and rewrite the store with only live entries.
+
+        Index writes wait for this to finish; searches keep running against the
+        current store until the rewritten one is swapped in.
+        """
+        started = time.perf_counter()
+        with self.write_lock:
+            if self.migration is not None:
+                raise RuntimeError(f"Embedding migration to {self.migration.model_name} in progress; "
+                                   f"compact once it completes")
+            before = self.index_stats(vault_root)
+            orphaned = self._orphaned_sources(vault_root)
+            removed = self.remove_files(orphaned) if orphaned else 0
+            if isinstance(self.store, FlatVectorStore):
+                self.store.compact()
+                self.file_store.compact()
+            else:
+                self._compact_chroma()
+            after = self.index_stats(vault_root)
+        report = {
+            "before": before,
+            "after": after,
+            "orphaned_chunks_removed": removed,
+            "bytes_reclaimed": before["bytes_on_disk"] - after["bytes_on_disk"],
+            "compact_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        logger.info(f"🧹 Compacted index: {before.get('deleted', 0)} dead entries and {removed} orphaned chunks dropped, "
+                    f"{report['bytes_reclaimed'] / 1024 / 1024:.1f} MB reclaimed in {report['compact_ms']:.0f}ms")
+        return report
+
+    def _compact_chroma(self):
+        """Copy live entries into fresh collections and switch to them (caller holds write_lock).
+
+        The replaced collections are recorded in the index state and dropped
+        after COMPACTION_GRACE_SECONDS, so searches already running against
+        them still finish; a restart or the next compaction drops them sooner.
+        """
+        self._drop_retired_collections()
+        old_names = [self.store.collection.name, self.file_store.collection.name]
+        suffix = int(time.time() * 1000)
+        new_names = (f"forge-{suffix}", f"{FILE_COLLECTION_NAME}-{suffix}")
+        new_vectorstore, new_store, new_file_store = self._open_stores(*new_names, self.embeddings)
+        try:
+            for old, new in ((self.store, new_store), (self.file_store, new_file_store)):
+                for offset in range(0, old.count(), COMPACTION_BATCH_SIZE):
+                    records = old.get(include=["embeddings", "documents", "metadatas"],
+                                      limit=COMPACTION_BATCH_SIZE, offset=offset)
+                    new.add(records['ids'], records['embeddings'], records['documents'], records['metadatas'])
+        except Exception:
+            for name in new_names:
+                self.chroma_client.delete_collection(name)
+            raise
+
+        _update_index_state(self.persist_directory, collection=new_names[0], files_collection=new_names[1],
+                            deleted=0)
+        self._retire_collections(old_names)
+        self.vectorstore, self.store, self.file_store = new_vectorstore, new_store, new_file_store
+
+    def _store_name(self, store: VectorStoreBackend) -> str:
+        """Collection name, or directory name under persist_directory, of one of this index's stores"""
+        if isinstance(store, FlatVectorStore):
+            return os.path.basename(store.directory)
+        return store.collection.name
+
+    def _retire_collections(self, names: List[str]):
+        """Record replaced collections and drop them after COMPACTION_GRACE_SECONDS (caller holds write_lock)"""
+        retired = _read_index_state(self.persist_directory).get("retired_collections") or []
+        _update_index_state(self.persist_directory, retired_collections=retired + names)
+        self.retire_timers = [timer for timer in self.retire_timers if timer.is_alive()]
+        timer = threading.Timer(COMPACTION_GRACE_SECONDS, self._drop_retired_after_grace, args=(names,))
+        timer.daemon = True
+        timer.start()
+        self.retire_timers.append(timer)
+
+    def _drop_retired_after_grace(self, names: List[str]):
+        try:
+            with self.write_lock:
+                self._drop_retired_collections(names)
+        except Exception as e:
+            logger.warning(f"Could not drop retired collections {names}: {e}")
+
+    def _drop_retired_collections(self, names: Optional[List[str]] = None):
+        """Drop collections replaced by compaction or migration, or just the given ones (caller holds write_lock)"""
+        retired = _read_index_state(self.persist_directory).get("retired_collections") or []
+        dropping = [name for name in retired if names is None or name in names]
+        if not dropping:
+            return
+        if self.backend_name == FlatVectorStore.name:
+            for name in dropping:
+                shutil.rmtree(os.path.join(self.persist_directory, name), ignore_errors=True)
+        elif self.chroma_client is None:
+            return
+        else:
+            for name in dropping:
+                try:
+                    self.chroma_client.delete_collection(name)
+                except Exception as e:
+                    logger.debug(f"Retired collection {name} already gone: {e}")
+        _update_index_state(self.persist_directory,
+                            retired_collections=[name for name in retired if name not in dropping])
+        if isinstance(self.store, ChromaBackend):
+            # Freed sqlite pages are reused by later writes; shrinking the file needs the server stopped
+            self.store.remove_orphaned_segments()
+        logger.info(f"🧹 Dropped {len(dropping)} retired collections")
+
     def _clean_deleted_files(self, directory_path: str):
         """Remove documents from vectorstore that no longer exist on filesystem"""
         try:
             # Get all documents from vectorstore
-            all_docs = self.vectorstore._collection.get()
+            all_docs = self.store.get(include=["metadatas"])
             if not all_docs or not all_docs.get('metadatas'):
                 return
 
@@ -340,18 +1736,21 @@ class ForgeRAG:
 
             # Find documents to delete (those whose source files no longer exist)
             ids_to_delete = []
+            deleted_sources = set()
             deleted_count = 0
 
             for i, metadata in enumerate(all_docs['metadatas']):
                 source_path = metadata.get('source')
                 if source_path and not os.path.exists(source_path):
                     ids_to_delete.append(all_docs['ids'][i])
+                    deleted_sources.add(source_path)
                     deleted_count += 1
                     logger.info(f"🗑️ Marking deleted file for removal: {source_path}")
 
             # Delete the orphaned documents
             if ids_to_delete:
-                self.vectorstore._collection.delete(ids=ids_to_delete)
+                self.store.delete(ids_to_delete)
+                self.file_store.delete([self._file_id(source) for source in deleted_sources])
                 logger.info(f"✅ Removed {deleted_count} documents for deleted files")
             else:
                 logger.info("✅ No deleted files found")
@@ -363,7 +1762,7 @@ class ForgeRAG:
         """Remove existing chunks from vectorstore for files that are being reprocessed"""
         try:
             # Get all existing documents from vectorstore
-            all_docs = self.vectorstore._collection.get()
+            all_docs = self.store.get(include=["metadatas"])
             if not all_docs or not all_docs.get('metadatas'):
                 return
 
@@ -382,7 +1781,7 @@ class ForgeRAG:
 
             # Delete the existing chunks
             if ids_to_delete:
-                self.vectorstore._collection.delete(ids=ids_to_delete)
+                self.store.delete(ids_to_delete)
                 logger.info(f"🔄 Removed {removed_count} existing chunks for {len(reprocessing_paths)} files being reprocessed")
 
         except Exception as e:
@@ -424,47 +1823,14 @@ class ForgeRAG:
 
     def _is_date_filename(self, filename: str) -> bool:
         """Check if filename follows common date patterns"""
-        import re
-
-        # Common date patterns: YYYY-MM-DD, YYYY-WNN, YYYY_MM_DD, etc.
-        date_patterns = [
-            r'^\d{4}-\d{2}-\d{2}$',     # 2025-09-17
-            r'^\d{4}-W\d{2}$',          # 2025-W37
-            r'^\d{4}_\d{2}_\d{2}$',     # 2025_09_17
-            r'^\d{8}$',                 # 20250917
-            r'^\d{4}-\d{1,2}-\d{1,2}$', # 2025-9-17 (flexible)
-        ]
-
-        return any(re.match(pattern, filename) for pattern in date_patterns)
+        return is_date_filename(filename)
 
     def _extract_date_from_filename(self, filename: str):
         """Extract datetime from various filename patterns"""
-        import re
         from datetime import datetime
 
-        # Try different date formats
-        patterns = [
-            (r'^(\d{4})-(\d{2})-(\d{2})$', '%Y-%m-%d'),       # 2025-09-17
-            (r'^(\d{4})-W(\d{2})$', None),                    # 2025-W37 (special handling)
-            (r'^(\d{4})_(\d{2})_(\d{2})$', '%Y_%m_%d'),       # 2025_09_17
-            (r'^(\d{8})$', '%Y%m%d'),                         # 20250917
-            (r'^(\d{4})-(\d{1,2})-(\d{1,2})$', '%Y-%m-%d'),   # 2025-9-17
-        ]
-
-        for pattern, date_format in patterns:
-            match = re.match(pattern, filename)
-            if match:
-                if pattern.startswith(r'^\d{4}-W'):  # Weekly format
-                    year, week = match.groups()
-                    # Convert week format to a date (Monday of that week)
-                    return datetime.strptime(f'{year}-W{week.zfill(2)}-1', '%Y-W%W-%w')
-                elif date_format:
-                    try:
-                        return datetime.strptime(filename, date_format)
-                    except ValueError:
-                        continue
-
-        return None
+        note_date = parse_note_date(filename)
+        return datetime.combine(note_date, datetime.min.time()) if note_date else None
 
     def update_directory_incremental(self, directory_path: str) -> int:
         """Update index incrementally - only add new/changed files, remove deleted ones"""
@@ -477,7 +1843,7 @@ class ForgeRAG:
             import os
 
             # Get more results for hybrid processing - cast wider net for poor embeddings
-            semantic_results = self.vectorstore.similarity_search_with_score(query, k=k*10)
+            semantic_results = self._similarity_search_with_score(query, k=k*10)
 
             documents = []
             query_terms = set(term.lower().strip() for term in query.split() if len(term.strip()) > 2)
@@ -698,6 +2064,7 @@ class ForgeRAG:
                     "content": doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content,
                     "filename": filename_display,
                     "source_path": source_path,
+                    "chunk_id": doc.id,
                     "similarity": final_similarity,
                     "semantic_score": semantic_similarity,
                     "keyword_score": keyword_score,
@@ -714,6 +2081,9 @@ class ForgeRAG:
             # Sort by final similarity score
             documents.sort(key=lambda x: x['similarity'], reverse=True)
 
+            # Optional second stage: a reranker reorders the top candidates within its time budget
+            documents = self._rerank(query, documents)
+
             # Enhanced category-based boosting
             if boost_inventory:
                 inventory_docs = [d for d in documents if '/Inventory/' in d['source_path'] or '/Hardware/' in d['source_path']]
@@ -748,10 +2118,18 @@ class ForgeRAG:
             logger.error(f"Enhanced hybrid search error for query '{query}': {e}")
             return []
     
+    def _rerank(self, query: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        stage = get_rerank_stage()
+        if not stage.enabled:
+            return documents
+        # Store IDs, not IDs rebuilt from metadata: chunks written without a chunk_index would all collide
+        chunk_ids = [document['chunk_id'] for document in documents]
+        return stage.rerank(query, documents, chunk_ids, self.generation)
+
     def search(self, query: str, k: int = 5, boost_inventory: bool = True, hybrid: bool = True) -> List[Dict[str, Any]]:
         """Search for similar documents with enhanced source attribution"""
         try:
-            if not self.vectorstore:
+            if not self.store:
                 return []
                 
             # Hybrid search: combine semantic search with keyword matching
@@ -761,7 +2139,7 @@ class ForgeRAG:
             # Use LangChain's similarity_search_with_score for proper similarity handling
             # Search for more results initially to allow for inventory boosting
             search_k = k * 3 if boost_inventory else k
-            results = self.vectorstore.similarity_search_with_score(query, k=search_k)
+            results = self._similarity_search_with_score(query, k=search_k)
             
             documents = []
             inventory_docs = []
@@ -836,32 +2214,85 @@ class ForgeRAG:
             logger.error(f"Search error for query '{query}': {e}")
             return []
     
+    def _chunk_listing(self) -> List[Tuple[str, int, str]]:
+        """Every chunk as (source, chunk_index, id), sorted; rebuilt only after the index changes"""
+        generation = self.generation
+        if self._listing is not None and self._listing[0] == generation:
+            return self._listing[1]
+        entries = []
+        total = self.store.count()
+        for offset in range(0, total, LISTING_BATCH_SIZE):
+            batch = self.store.get(include=["metadatas"], limit=LISTING_BATCH_SIZE, offset=offset)
+            for doc_id, metadata in zip(batch['ids'], batch['metadatas']):
+                metadata = metadata or {}
+                entries.append((metadata.get('source', 'unknown'), int(metadata.get('chunk_index', 0)), doc_id))
+        entries.sort()
+        self._listing = (generation, entries)
+        return entries
+
+    def browse(self, limit: int = 50, offset: int = 0, cursor: Optional[str] = None,
+               group_by_file: bool = True) -> Dict[str, Any]:
+        """Page through indexed chunks, or files, ordered by source path and chunk position.
+
+        Reads metadata only, so no embedding call is made. A cursor (the
+        next_cursor of the previous page) resumes after the last item seen
+        even if the index changed in between; otherwise offset is used.
+        """
+        empty = {"documents": [], "total": 0, "offset": offset, "limit": limit, "next_cursor": None}
+        if not self.store:
+            return empty
+        entries = self._chunk_listing()
+
+        if group_by_file:
+            # One key per file: its first chunk, which also supplies the preview
+            keys, chunk_counts = [], {}
+            for source, chunk_index, doc_id in entries:
+                if source not in chunk_counts:
+                    keys.append((source, chunk_index, doc_id))
+                    chunk_counts[source] = 0
+                chunk_counts[source] += 1
+        else:
+            keys, chunk_counts = entries, None
+
+        if cursor:
+            last_source, last_index = decode_cursor(cursor)
+            after = (last_source, float('inf')) if group_by_file else (last_source, last_index, chr(0x10ffff))
+            offset = bisect.bisect_right(keys, after)
+        page = keys[offset:offset + limit]
+        if not page:
+            return {**empty, "total": len(keys), "offset": offset}
+
+        records = self.store.get(ids=[doc_id for _, _, doc_id in page], include=["documents", "metadatas"])
+        by_id = {doc_id: (document, metadata or {})
+                 for doc_id, document, metadata in zip(records['ids'], records['documents'], records['metadatas'])}
+        documents = []
+        for source, chunk_index, doc_id in page:
+            if doc_id not in by_id:
+                continue  # Deleted since the listing was built
+            content, metadata = by_id[doc_id]
+            document = {
+                "content": content[:300] + "..." if len(content) > 300 else content,
+                "filename": Path(source).name,
+                "metadata": metadata,
+                "full_content": content,
+            }
+            if group_by_file:
+                document["chunk_count"] = chunk_counts[source]
+            documents.append(document)
+
+        end = offset + len(page)
+        return {
+            "documents": documents,
+            "total": len(keys),
+            "offset": offset,
+            "limit": limit,
+            "next_cursor": encode_cursor(page[-1][:2]) if end < len(keys) else None,
+        }
+
     def get_all_documents(self) -> List[Dict[str, Any]]:
-        """Get all indexed documents"""
+        """Get all indexed documents, one entry per file"""
         try:
-            if not self.vectorstore:
-                return []
-            
-            # Get all documents by doing a very broad search
-            all_docs = self.vectorstore.similarity_search("", k=100)  # Get up to 100 docs
-            
-            documents = []
-            seen_sources = set()
-            
-            for doc in all_docs:
-                source = doc.metadata.get('source', 'unknown')
-                # Deduplicate by source file
-                if source not in seen_sources:
-                    seen_sources.add(source)
-                    documents.append({
-                        "content": doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content,
-                        "filename": Path(source).name,
-                        "metadata": doc.metadata,
-                        "full_content": doc.page_content
-                    })
-            
-            return documents
-            
+            return self.browse(limit=self.store.count() if self.store else 0)["documents"]
         except Exception as e:
             logger.error(f"Error getting all documents: {e}")
             return []
@@ -873,7 +2304,7 @@ def get_rag_instance() -> ForgeRAG:
     """Get or create global RAG instance"""
     global _rag_instance
     if _rag_instance is None:
-        _rag_instance = ForgeRAG(model_name="nomic-embed-text")
+        _rag_instance = ForgeRAG()
     return _rag_instance
 
 def rebuild_index(directory_path: str) -> int:
@@ -886,6 +2317,47 @@ def search_documents(query: str, limit: int = 5) -> List[Dict[str, Any]]:
     rag = get_rag_instance()
     return rag.search(query, k=limit)
 
+def _shingles(text: str, size: int = 5) -> set:
+    """Hashed word shingles for near-duplicate detection"""
+    # Ignore the "[filename] " prefix added at index time so template sections match across notes
+    text = re.sub(r'^\[[^\]]*\]\s*', '', text)
+    words = re.findall(r'\w+', text.lower())
+    if len(words) <= size:
+        return {hash(' '.join(words))} if words else set()
+    return {hash(' '.join(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+def collapse_near_duplicates(documents: List[Dict[str, Any]], threshold: float = 0.7) -> List[Dict[str, Any]]:
+    """Drop chunks whose shingle Jaccard similarity to a higher-scoring chunk exceeds threshold.
+
+    Overlapping splitter windows and repeated template sections otherwise get
+    injected into the prompt several times. Survivors keep their original order.
+    """
+    if len(documents) < 2:
+        return documents
+
+    ranked = sorted(range(len(documents)), key=lambda i: documents[i].get('similarity', 0), reverse=True)
+    kept = []  # (index, shingles)
+    for i in ranked:
+        shingles = _shingles(documents[i].get('full_content', documents[i].get('content', '')))
+        is_duplicate = False
+        for _, kept_shingles in kept:
+            if not shingles or not kept_shingles:
+                continue
+            overlap = len(shingles & kept_shingles)
+            # Containment covers short chunks that are fully inside a longer neighbour
+            jaccard = overlap / len(shingles | kept_shingles)
+            containment = overlap / min(len(shingles), len(kept_shingles))
+            if jaccard >= threshold or containment >= 0.9:
+                is_duplicate = True
+                break
+        if not is_duplicate:
+            kept.append((i, shingles))
+
+    collapsed = len(documents) - len(kept)
+    if collapsed:
+        logger.info(f"🧹 Collapsed {collapsed} near-duplicate chunks before prompt packing")
+    return [documents[i] for i in sorted(i for i, _ in kept)]
+
 def verify_claim_in_document(filename: str, claim_text: str) -> Dict[str, Any]:
     """Verify if a specific claim exists in a document"""
     try:
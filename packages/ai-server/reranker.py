@@ -0,0 +1,254 @@
+"""
+Optional second-stage reranking of search candidates
+
+The hybrid search orders candidates by embedding similarity plus hand-tuned
+boosts. A reranker scores the top of that list against the query directly,
+either with a local cross-encoder (sentence-transformers) or by asking an
+Ollama model for a relevance grade. Reranking runs under a strict per-query
+time budget: if scoring doesn't finish in time the heuristic order is kept,
+and the late scores are still cached for the next time the query is asked.
+Scores are cached per (query, chunk ID, index generation), so any index
+write invalidates them.
+"""
+
+import os
+import re
+import time
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Any, Tuple
+
+import requests
+
+from model_manager import OLLAMA_BASE_URL
+
+logger = logging.getLogger(__name__)
+
+# Reranker: "none", "cross-encoder" (needs sentence-transformers) or "ollama"
+DEFAULT_RERANKER = os.getenv("FORGE_RERANKER", "none")
+
+# Cross-encoder checkpoint, or Ollama model, used for scoring
+DEFAULT_RERANK_MODELS = {
+    "cross-encoder": "cross-encoder/ms-marco-MiniLM-L-6-v2",
+    "ollama": "qwen2.5:0.5b",
+}
+RERANK_MODEL = os.getenv("FORGE_RERANK_MODEL")
+
+# Wall-clock budget per query; past it the heuristic order is returned unchanged
+RERANK_BUDGET_MS = float(os.getenv("FORGE_RERANK_BUDGET_MS", "800"))
+
+# Heuristic top candidates handed to the reranker (the rest keep their order behind them)
+RERANK_CANDIDATES = int(os.getenv("FORGE_RERANK_CANDIDATES", "20"))
+
+# Cached (query, chunk ID, generation) scores
+RERANK_CACHE_SIZE = 4096
+
+# Characters of each chunk shown to the reranker
+RERANK_PASSAGE_CHARS = 1500
+
+# Concurrent scoring requests to Ollama (it queues beyond OLLAMA_NUM_PARALLEL)
+OLLAMA_RERANK_WORKERS = 4
+
+OLLAMA_RERANK_PROMPT = """Rate how well the passage answers the query, from 0 (unrelated) to 10 (answers it fully).
+Reply with the number only.
+
+Query: {query}
+
+Passage:
+{passage}
+
+Rating:"""
+
+
+class Reranker:
+    """Scores passages against a query; higher is more relevant"""
+
+    name = "base"
+
+    def score(self, query: str, passages: List[str]) -> List[float]:
+        raise NotImplementedError
+
+
+class CrossEncoderReranker(Reranker):
+    """Local cross-encoder from sentence-transformers"""
+
+    name = "cross-encoder"
+
+    def __init__(self, model_name: str = DEFAULT_RERANK_MODELS["cross-encoder"]):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError:
+            raise RuntimeError("The cross-encoder reranker needs sentence-transformers (pip install sentence-transformers)")
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name)
+
+    def score(self, query, passages):
+        return [float(score) for score in self.model.predict([(query, passage) for passage in passages])]
+
+
+class OllamaReranker(Reranker):
+    """Asks an Ollama model to grade each passage 0-10"""
+
+    name = "ollama"
+
+    def __init__(self, model: str = DEFAULT_RERANK_MODELS["ollama"], base_url: str = OLLAMA_BASE_URL,
+                 keep_alive: str = "30m"):
+        self.model_name = model
+        self.base_url = base_url.rstrip('/')
+        self.keep_alive = keep_alive
+        self.session = requests.Session()
+        self.executor = ThreadPoolExecutor(max_workers=OLLAMA_RERANK_WORKERS, thread_name_prefix="forge-rerank")
+
+    def _grade(self, query: str, passage: str) -> float:
+        response = self.session.post(
+            f"{self.base_url}/api/generate",
+            json={"model": self.model_name, "prompt": OLLAMA_RERANK_PROMPT.format(query=query, passage=passage),
+                  "stream": False, "keep_alive": self.keep_alive, "options": {"temperature": 0, "num_predict": 4}},
+            timeout=30
+        )
+        response.raise_for_status()
+        match = re.search(r'\d+(?:\.\d+)?', response.json().get("response", ""))
+        return min(10.0, float(match.group())) if match else 0.0
+
+    def score(self, query, passages):
+        return list(self.executor.map(lambda passage: self._grade(query, passage), passages))
+
+
+def create_reranker(kind: str, model: Optional[str] = None) -> Optional[Reranker]:
+    """Reranker for a FORGE_RERANKER value, or None when reranking is off"""
+    if kind in ("", "none"):
+        return None
+    if kind == CrossEncoderReranker.name:
+        return CrossEncoderReranker(model or DEFAULT_RERANK_MODELS[kind])
+    if kind == OllamaReranker.name:
+        return OllamaReranker(model or DEFAULT_RERANK_MODELS[kind])
+    raise ValueError(f"Unknown reranker '{kind}' (expected none, cross-encoder or ollama)")
+
+
+class RerankStage:
+    """Reorders the top search candidates within a time budget, caching scores"""
+
+    def __init__(self, reranker: Optional[Reranker], budget_ms: float = RERANK_BUDGET_MS,
+                 candidates: int = RERANK_CANDIDATES):
+        self.reranker = reranker
+        self.budget_ms = budget_ms
+        self.candidates = candidates
+        self.cache: "OrderedDict[Tuple[str, str, int], float]" = OrderedDict()
+        self.lock = threading.Lock()
+        # One scoring job at a time; a job that overran its budget finishes in the background
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="forge-rerank-stage")
+        self.pending = None
+        self.stats = {"queries": 0, "reranked": 0, "fallbacks": 0, "errors": 0, "cache_hits": 0, "scored": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.reranker is not None
+
+    def _cached(self, key: Tuple[str, str, int]) -> Optional[float]:
+        with self.lock:
+            score = self.cache.get(key)
+            if score is not None:
+                self.cache.move_to_end(key)
+            return score
+
+    def _store(self, keys: List[Tuple[str, str, int]], scores: List[float]):
+        with self.lock:
+            for key, score in zip(keys, scores):
+                self.cache[key] = score
+                self.cache.move_to_end(key)
+            while len(self.cache) > RERANK_CACHE_SIZE:
+                self.cache.popitem(last=False)
+
+    def _score_and_cache(self, query: str, keys: List[Tuple[str, str, int]], passages: List[str]) -> List[float]:
+        scores = self.reranker.score(query, passages)
+        self._store(keys, scores)
+        with self.lock:
+            self.stats["scored"] += len(scores)
+        return scores
+
+    def rerank(self, query: str, documents: List[Dict[str, Any]], chunk_ids: List[str],
+               generation: int) -> List[Dict[str, Any]]:
+        """Documents (already in heuristic order) with the top candidates reordered by reranker score.
+
+        chunk_ids lines up with documents. Falls back to the given order when
+        the reranker fails or misses the budget.
+        """
+        if not self.enabled or len(documents) < 2:
+            return documents
+        started = time.perf_counter()
+        with self.lock:
+            self.stats["queries"] += 1
+        head, tail = documents[:self.candidates], documents[self.candidates:]
+        keys = [(query, chunk_id, generation) for chunk_id in chunk_ids[:len(head)]]
+
+        scores: List[Optional[float]] = [self._cached(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        with self.lock:
+            self.stats["cache_hits"] += len(keys) - len(missing)
+        if missing:
+            passages = [head[i].get("full_content", "")[:RERANK_PASSAGE_CHARS] for i in missing]
+            with self.lock:
+                if self.pending is not None and not self.pending.done():
+                    # Still scoring an earlier query that overran; don't queue behind it
+                    self.stats["fallbacks"] += 1
+                    return documents
+                future = self.pending = self.executor.submit(self._score_and_cache, query,
+                                                             [keys[i] for i in missing], passages)
+            try:
+                remaining = self.budget_ms / 1000 - (time.perf_counter() - started)
+                for i, score in zip(missing, future.result(timeout=max(0.0, remaining))):
+                    scores[i] = score
+            except FutureTimeoutError:
+                with self.lock:
+                    self.stats["fallbacks"] += 1
+                logger.info(f"⏱️ Rerank missed its {self.budget_ms:.0f}ms budget for '{query}', keeping heuristic order")
+                return documents
+            except Exception as e:
+                with self.lock:
+                    self.stats["errors"] += 1
+                logger.warning(f"Rerank failed for '{query}', keeping heuristic order: {e}")
+                return documents
+
+        order = sorted(range(len(head)), key=lambda i: scores[i], reverse=True)
+        reranked = []
+        for i in order:
+            document = head[i]
+            document["rerank_score"] = scores[i]
+            reranked.append(document)
+        with self.lock:
+            self.stats["reranked"] += 1
+        logger.info(f"🔀 Reranked {len(head)} candidates for '{query}' ({len(missing)} scored) "
+                    f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return reranked + tail
+
+    def status(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "reranker": self.reranker.name if self.reranker else "none",
+                "model": getattr(self.reranker, "model_name", None),
+                "budget_ms": self.budget_ms,
+                "candidates": self.candidates,
+                "cached_scores": len(self.cache),
+                **self.stats,
+            }
+
+
+# Global rerank stage instance
+_rerank_stage = None
+
+def get_rerank_stage() -> RerankStage:
+    """Get or create the global rerank stage from FORGE_RERANKER"""
+    global _rerank_stage
+    if _rerank_stage is None:
+        try:
+            reranker = create_reranker(DEFAULT_RERANKER, RERANK_MODEL)
+        except Exception as e:
+            logger.error(f"❌ Reranker '{DEFAULT_RERANKER}' unavailable, searching without it: {e}")
+            reranker = None
+        _rerank_stage = RerankStage(reranker)
+        if reranker:
+            logger.info(f"🔀 Reranking top {RERANK_CANDIDATES} candidates with {reranker.name} "
+                        f"({reranker.model_name}), {RERANK_BUDGET_MS:.0f}ms budget")
+    return _rerank_stage
@@ -0,0 +1,158 @@
+"""
+Index of markdown checkbox tasks
+
+Every `- [ ]` / `- [x]` line in the vault is extracted into a task table with
+its file, section heading, line number, state, note date and project, so task
+questions are answered from the complete list instead of whichever chunks a
+semantic search happens to return. The vault catalog keeps it in sync.
+"""
+
+import re
+import time
+import threading
+import logging
+from datetime import date
+from typing import Dict, List, Optional, Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+TASK_PATTERN = re.compile(r'^(\s*)[-*+]\s+\[([ xX/\-])\]\s+(.*\S)\s*$')
+HEADING_PATTERN = re.compile(r'^#{1,6}\s+(.*\S)\s*$')
+FENCE_PATTERN = re.compile(r'^\s*(```|~~~)')
+
+# Checkbox character -> task state
+TASK_STATES = {' ': 'open', 'x': 'done', 'X': 'done', '/': 'in_progress', '-': 'cancelled'}
+
+
+def extract_tasks(text: str) -> List[Dict[str, Any]]:
+    """Checkbox lines with their 1-based line number, state and enclosing heading"""
+    tasks = []
+    section = None
+    in_code = False
+    for line_number, line in enumerate(text.split('\n'), start=1):
+        if FENCE_PATTERN.match(line):
+            in_code = not in_code
+            continue
+        if in_code:
+            continue
+        heading = HEADING_PATTERN.match(line)
+        if heading:
+            section = heading.group(1)
+            continue
+        match = TASK_PATTERN.match(line)
+        if match:
+            indent, mark, task_text = match.groups()
+            tasks.append({
+                'line': line_number,
+                'section': section,
+                'state': TASK_STATES[mark],
+                'text': task_text,
+                'depth': len(indent.expandtabs(4)) // 2,
+            })
+    return tasks
+
+
+def _project_name(value: Any) -> Optional[str]:
+    """Plain project name from a frontmatter value such as "[[Forge Web App]]" """
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if not value:
+        return None
+    return str(value).strip().strip('[]').strip() or None
+
+
+class TaskIndex:
+    """Checkbox tasks per note, with per-state counts"""
+
+    def __init__(self):
+        # rel_path -> list of task records
+        self.tasks: Dict[str, List[Dict[str, Any]]] = {}
+        self.state_counts: Dict[str, int] = {}
+        self.lock = threading.RLock()
+
+    def add(self, rel_path: str, tasks: List[Dict[str, Any]], note_date: Optional[date] = None,
+            frontmatter: Optional[Dict[str, Any]] = None, note_name: Optional[str] = None):
+        """Index a note's tasks, replacing anything indexed for it before"""
+        frontmatter = frontmatter or {}
+        project = _project_name(frontmatter.get('project'))
+        if project is None and frontmatter.get('type') == 'project':
+            project = note_name
+        records = [{**task, 'rel_path': rel_path, 'note_date': note_date, 'project': project} for task in tasks]
+
+        with self.lock:
+            self.remove(rel_path)
+            if records:
+                self.tasks[rel_path] = records
+                for record in records:
+                    self.state_counts[record['state']] = self.state_counts.get(record['state'], 0) + 1
+
+    def remove(self, rel_path: str):
+        """Drop a note's tasks"""
+        with self.lock:
+            for record in self.tasks.pop(rel_path, []):
+                self.state_counts[record['state']] -= 1
+
+    def clear(self):
+        with self.lock:
+            self.tasks = {}
+            self.state_counts = {}
+
+    def projects(self) -> List[str]:
+        """Projects that have at least one task"""
+        with self.lock:
+            return sorted({record['project'] for records in self.tasks.values()
+                           for record in records if record['project']})
+
+    def query(self, state: Optional[str] = None, project: Optional[str] = None, folder: Optional[str] = None,
+              section: Optional[str] = None, text: Optional[str] = None, since: Optional[date] = None,
+              until: Optional[date] = None, paths: Optional[Iterable[str]] = None,
+              limit: Optional[int] = 200) -> Dict[str, Any]:
+        """Tasks matching every given filter, newest notes first.
+
+        folder matches the folder and its subfolders; section, text and project
+        match case-insensitively (section and text as substrings). A limit of
+        None returns every matching task.
+        """
+        if state is not None and state not in TASK_STATES.values():
+            raise ValueError(f"Unknown task state '{state}' (expected {', '.join(sorted(set(TASK_STATES.values())))})")
+        if limit is not None and limit < 0:
+            raise ValueError("limit must be non-negative")
+        started = time.perf_counter()
+        folder_prefix = folder.strip('/') + '/' if folder else None
+        project = project.lower() if project else None
+        section = section.lower() if section else None
+        text = text.lower() if text else None
+
+        with self.lock:
+            candidates = self.tasks.keys() if paths is None else [p for p in paths if p in self.tasks]
+            matched = []
+            counts: Dict[str, int] = {}
+            for rel_path in candidates:
+                if folder_prefix and not rel_path.startswith(folder_prefix):
+                    continue
+                for record in self.tasks[rel_path]:
+                    if project and (record['project'] or '').lower() != project:
+                        continue
+                    if section and section not in (record['section'] or '').lower():
+                        continue
+                    if text and text not in record['text'].lower():
+                        continue
+                    if since and (record['note_date'] is None or record['note_date'] < since):
+                        continue
+                    if until and (record['note_date'] is None or record['note_date'] > until):
+                        continue
+                    counts[record['state']] = counts.get(record['state'], 0) + 1
+                    if state is None or record['state'] == state:
+                        matched.append(record)
+
+        # Dated notes newest first, then undated notes by path, tasks in file order
+        matched.sort(key=lambda r: (r['note_date'] is None, -(r['note_date'].toordinal() if r['note_date'] else 0),
+                                    r['rel_path'], r['line']))
+        selected = matched[:limit] if limit is not None else matched
+        return {
+            'total': len(matched),
+            'counts': counts,
+            'tasks': [{**record, 'note_date': record['note_date'].isoformat() if record['note_date'] else None}
+                      for record in selected],
+            'query_ms': round((time.perf_counter() - started) * 1000, 3),
+        }
@@ -0,0 +1,154 @@
+"""Tests for the rerank stage and the Ollama grader, using stub scorers"""
+
+import threading
+from unittest import mock
+
+import pytest
+
+from reranker import RerankStage, Reranker, OllamaReranker
+
+
+class StubReranker(Reranker):
+    """Scores a passage by the number in it; optionally blocks or fails"""
+
+    name = "stub"
+    model_name = "stub"
+
+    def __init__(self, release: threading.Event = None, error: Exception = None):
+        self.release = release
+        self.error = error
+        self.calls = []
+
+    def score(self, query, passages):
+        self.calls.append(list(passages))
+        if self.release is not None:
+            self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return [float(passage.split()[-1]) for passage in passages]
+
+
+def make_documents(scores):
+    return [{"filename": f"note-{i}.md", "full_content": f"passage {score}"} for i, score in enumerate(scores)]
+
+
+def chunk_ids(documents):
+    return [document["filename"] for document in documents]
+
+
+def test_reorders_candidates_and_keeps_tail():
+    stage = RerankStage(StubReranker(), budget_ms=1000, candidates=3)
+    documents = make_documents([1, 3, 2, 9, 8])
+
+    result = stage.rerank("query", documents, chunk_ids(documents), generation=0)
+
+    assert [document["filename"] for document in result] == ["note-1.md", "note-2.md", "note-0.md",
+                                                             "note-3.md", "note-4.md"]
+    assert [document["rerank_score"] for document in result[:3]] == [3.0, 2.0, 1.0]
+    assert "rerank_score" not in result[3]
+    assert stage.stats["reranked"] == 1
+
+
+def test_disabled_stage_returns_documents_unchanged():
+    stage = RerankStage(None)
+    documents = make_documents([1, 2])
+
+    assert stage.rerank("query", documents, chunk_ids(documents), generation=0) is documents
+
+
+def test_scores_are_cached_per_query_chunk_and_generation():
+    scorer = StubReranker()
+    stage = RerankStage(scorer, budget_ms=1000)
+    documents = make_documents([1, 2, 3])
+
+    stage.rerank("query", documents, chunk_ids(documents), generation=0)
+    stage.rerank("query", documents, chunk_ids(documents), generation=0)
+    assert len(scorer.calls) == 1
+    assert stage.stats["cache_hits"] == 3
+
+    stage.rerank("other query", documents, chunk_ids(documents), generation=0)
+    assert len(scorer.calls) == 2
+
+    # An index write bumps the generation, so earlier scores no longer apply
+    stage.rerank("query", documents, chunk_ids(documents), generation=1)
+    assert len(scorer.calls) == 3
+    assert len(scorer.calls[-1]) == 3
+
+
+def test_only_uncached_candidates_are_scored():
+    scorer = StubReranker()
+    stage = RerankStage(scorer, budget_ms=1000)
+    documents = make_documents([1, 2, 3])
+
+    stage.rerank("query", documents[:2], chunk_ids(documents[:2]), generation=0)
+    stage.rerank("query", documents, chunk_ids(documents), generation=0)
+
+    assert scorer.calls[-1] == ["passage 3"]
+
+
+def test_budget_miss_keeps_heuristic_order_and_caches_late_scores():
+    release = threading.Event()
+    scorer = StubReranker(release=release)
+    stage = RerankStage(scorer, budget_ms=50)
+    documents = make_documents([1, 3, 2])
+
+    result = stage.rerank("query", documents, chunk_ids(documents), generation=0)
+    assert [document["filename"] for document in result] == ["note-0.md", "note-1.md", "note-2.md"]
+    assert stage.stats["fallbacks"] == 1
+
+    # While the overrunning job is still scoring, new queries fall back instead of queueing
+    other = make_documents([5, 6])
+    assert stage.rerank("other", other, chunk_ids(other), generation=0) is other
+    assert stage.stats["fallbacks"] == 2
+
+    release.set()
+    stage.pending.result(timeout=5)
+    result = stage.rerank("query", documents, chunk_ids(documents), generation=0)
+    assert [document["filename"] for document in result] == ["note-1.md", "note-2.md", "note-0.md"]
+    assert len(scorer.calls) == 1
+
+
+def test_scorer_error_keeps_heuristic_order():
+    stage = RerankStage(StubReranker(error=RuntimeError("model unavailable")), budget_ms=1000)
+    documents = make_documents([1, 3, 2])
+
+    result = stage.rerank("query", documents, chunk_ids(documents), generation=0)
+
+    assert result is documents
+    assert stage.stats["errors"] == 1
+    assert all("rerank_score" not in document for document in documents)
+
+
+@pytest.mark.parametrize("reply, expected", [
+    ("7", 7.0),
+    (" 8.5\n", 8.5),
+    ("Rating: 6/10", 6.0),
+    ("42", 10.0),
+    ("not relevant", 0.0),
+    ("", 0.0),
+])
+def test_ollama_grade_parses_reply(reply, expected):
+    grader = OllamaReranker(model="tiny", base_url="http://ollama.test/")
+    response = mock.Mock()
+    response.json.return_value = {"response": reply}
+    grader.session = mock.Mock()
+    grader.session.post.return_value = response
+
+    assert grader._grade("what router do I have", "The router is a UDM Pro") == expected
+
+    url = grader.session.post.call_args.args[0]
+    payload = grader.session.post.call_args.kwargs["json"]
+    assert url == "http://ollama.test/api/generate"
+    assert payload["model"] == "tiny"
+    assert payload["stream"] is False
+    assert "what router do I have" in payload["prompt"] and "UDM Pro" in payload["prompt"]
+    response.raise_for_status.assert_called_once()
+
+
+def test_ollama_grade_raises_on_http_error():
+    grader = OllamaReranker(model="tiny")
+    grader.session = mock.Mock()
+    grader.session.post.return_value.raise_for_status.side_effect = RuntimeError("503 Service Unavailable")
+
+    with pytest.raises(RuntimeError):
+        grader._grade("query", "passage")
@@ -0,0 +1,446 @@
+"""
+In-memory catalog of vault files
+
+Built with a single walk at startup and then kept current from VaultWatcher
+events, so per-turn context building never has to touch the filesystem to
+find notes, count files or check recency.
+"""
+
+import os
+import re
+import hashlib
+import bisect
+import heapq
+import threading
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Any, Iterable, Iterator
+
+from frontmatter_index import FrontmatterIndex, parse_frontmatter
+from task_index import TaskIndex, extract_tasks
+
+logger = logging.getLogger(__name__)
+
+DAILY_FOLDER = "Logs/Daily"
+WEEKLY_FOLDER = "Logs/Weekly"
+DATED_FOLDERS = (DAILY_FOLDER, WEEKLY_FOLDER)
+
+# Sorts after any real path, for inclusive upper bounds in bisect lookups
+_MAX_PATH = chr(0x10FFFF)
+
+# Date formats recognised in note filenames
+_DATE_PATTERNS = [
+    (re.compile(r'^(\d{4})-(\d{2})-(\d{2})$'), '%Y-%m-%d'),       # 2025-09-17
+    (re.compile(r'^(\d{4})-W(\d{2})$'), None),                    # 2025-W37
+    (re.compile(r'^(\d{4})_(\d{2})_(\d{2})$'), '%Y_%m_%d'),       # 2025_09_17
+    (re.compile(r'^(\d{8})$'), '%Y%m%d'),                         # 20250917
+    (re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})$'), '%Y-%m-%d'),   # 2025-9-17
+]
+
+
+def is_date_filename(stem: str) -> bool:
+    """Check if a filename stem follows one of the supported date patterns"""
+    return any(pattern.match(stem) for pattern, _ in _DATE_PATTERNS)
+
+
+def parse_note_date(stem: str) -> Optional[date]:
+    """Extract the date a note refers to from its filename stem.
+
+    Weekly notes (YYYY-Www) resolve to the Monday of that ISO week.
+    """
+    for pattern, date_format in _DATE_PATTERNS:
+        match = pattern.match(stem)
+        if not match:
+            continue
+        try:
+            if date_format is None:
+                year, week = match.groups()
+                return date.fromisocalendar(int(year), int(week), 1)
+            return datetime.strptime(stem, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+# Lines worth surfacing from weekly notes without reading them per turn
+HIGHLIGHT_KEYWORDS = ['highlight', 'decision', 'project', 'progress']
+MAX_HIGHLIGHTS = 5
+
+
+def highlights_from_lines(lines: Iterable[str]) -> List[str]:
+    """Highlight, decision and project lines from a weekly note's lines"""
+    highlights = []
+    for line in lines:
+        if any(keyword in line.lower() for keyword in HIGHLIGHT_KEYWORDS):
+            highlights.append(line.rstrip('\n'))
+            if len(highlights) >= MAX_HIGHLIGHTS:
+                break
+    return highlights
+
+
+def content_hash(data: bytes) -> str:
+    """Hash of a note's raw bytes, used to tell real edits from touched mtimes"""
+    return hashlib.sha1(data).hexdigest()
+
+
+def file_content_hash(path: str) -> str:
+    """content_hash of a file on disk"""
+    with open(path, 'rb') as f:
+        return content_hash(f.read())
+
+
+def should_track(filename: str) -> bool:
+    """Markdown files only, skipping hidden, backup and temporary files"""
+    if not filename.endswith('.md'):
+        return False
+    return not (filename.startswith('.') or filename.startswith('~') or filename.endswith('.tmp'))
+
+
+def is_vault_note(root: str, path: str) -> bool:
+    """should_track, and not inside a hidden folder (.obsidian, .trash, .git) of the vault"""
+    if not should_track(os.path.basename(path)):
+        return False
+    folders = os.path.relpath(os.path.abspath(path), os.path.abspath(root)).split(os.sep)[:-1]
+    return not any(folder.startswith('.') for folder in folders)
+
+
+def iter_vault_notes(root: str) -> Iterator[str]:
+    """Every note under root per is_vault_note, the set shared by rebuilds, reconciles and the catalog"""
+    for dirpath, dirs, filenames in os.walk(root):
+        dirs[:] = [name for name in dirs if not name.startswith('.')]
+        for filename in filenames:
+            if should_track(filename):
+                yield os.path.join(dirpath, filename)
+
+
+class VaultCatalog:
+    """Path, folder, size, mtime and note date for every markdown file in the vault"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(str(root))
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # Sorted (note_date, rel_path) lists for daily and weekly notes
+        self.date_index: Dict[str, List[tuple]] = {folder: [] for folder in DATED_FOLDERS}
+        # File counts per folder, maintained per event
+        self.folder_counts: Dict[str, int] = {}
+        # Max-heap of (-mtime, rel_path); entries whose mtime no longer matches are stale and skipped
+        self.recent_heap: List[tuple] = []
+        # Typed frontmatter columns and checkbox tasks, updated alongside the entries
+        self.frontmatter = FrontmatterIndex()
+        self.tasks = TaskIndex()
+        self.version = 0
+        self.lock = threading.RLock()
+        self.built_at: Optional[datetime] = None
+        # The build only stats files; note contents are read afterwards by load_contents()
+        self.contents_lock = threading.Lock()
+        self.contents_loaded = False
+
+    def _rel(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, '/')
+
+    def _make_entry(self, rel_path: str, stat_result, read_contents: bool = True) -> Dict[str, Any]:
+        folder = os.path.dirname(rel_path) or '.'
+        stem = os.path.splitext(os.path.basename(rel_path))[0]
+        path = os.path.join(self.root, rel_path)
+        entry = {
+            'path': path,
+            'rel_path': rel_path,
+            'folder': folder,
+            'name': os.path.basename(rel_path),
+            'size': stat_result.st_size,
+            'mtime': stat_result.st_mtime,
+            'note_date': parse_note_date(stem),
+            # None until the note has been read
+            'highlights': None,
+            'frontmatter': None,
+            'tasks': [],
+        }
+        if read_contents:
+            entry.update(self._read_contents(entry))
+        return entry
+
+    def _read_contents(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Frontmatter, tasks and weekly highlights from a single read of the note"""
+        try:
+            with open(entry['path'], 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read().replace('\r\n', '\n')
+        except OSError as e:
+            logger.debug(f"Could not read {entry['path']}: {e}")
+            text = ''
+        # Weekly notes carry a precomputed highlights extract so previews never scan them
+        weekly = self._dated_folder(entry['rel_path']) == WEEKLY_FOLDER
+        return {
+            'highlights': highlights_from_lines(text.split('\n')) if weekly else None,
+            'frontmatter': parse_frontmatter(text),
+            'tasks': extract_tasks(text),
+        }
+
+    @staticmethod
+    def _dated_folder(rel_path: str) -> Optional[str]:
+        """Which dated note folder (if any) a file lives under, including year subfolders"""
+        for folder in DATED_FOLDERS:
+            if rel_path.startswith(folder + '/'):
+                return folder
+        return None
+
+    def _put(self, entry: Dict[str, Any]):
+        """Insert or replace an entry, keeping the date index sorted (caller holds lock)"""
+        self._drop(entry['rel_path'])
+        self.entries[entry['rel_path']] = entry
+        self.folder_counts[entry['folder']] = self.folder_counts.get(entry['folder'], 0) + 1
+        heapq.heappush(self.recent_heap, (-entry['mtime'], entry['rel_path']))
+        folder = self._dated_folder(entry['rel_path'])
+        if folder and entry['note_date']:
+            bisect.insort(self.date_index[folder], (entry['note_date'], entry['rel_path']))
+        self._index_contents(entry)
+        self.version += 1
+
+    def _index_contents(self, entry: Dict[str, Any]):
+        """Add a read entry's frontmatter and tasks to their indexes (caller holds lock)"""
+        tasks = entry.pop('tasks', [])
+        if entry['frontmatter'] is None:
+            return
+        self.frontmatter.add(entry['rel_path'], entry['frontmatter'])
+        # Tasks live only in the task index, not on the entry
+        self.tasks.add(entry['rel_path'], tasks, entry['note_date'], entry['frontmatter'],
+                       os.path.splitext(entry['name'])[0])
+
+    def _drop(self, rel_path: str):
+        """Remove an entry and its date index key (caller holds lock)"""
+        entry = self.entries.pop(rel_path, None)
+        if entry is None:
+            return
+        self.version += 1
+        self.frontmatter.remove(rel_path)
+        self.tasks.remove(rel_path)
+        remaining = self.folder_counts.get(entry['folder'], 1) - 1
+        if remaining > 0:
+            self.folder_counts[entry['folder']] = remaining
+        else:
+            self.folder_counts.pop(entry['folder'], None)
+        # The heap entry goes stale and is discarded lazily; compact if stale entries pile up
+        if len(self.recent_heap) > 2 * len(self.entries) + 64:
+            self.recent_heap = [(-e['mtime'], key) for key, e in self.entries.items()]
+            heapq.heapify(self.recent_heap)
+        folder = self._dated_folder(rel_path)
+        if folder and entry['note_date']:
+            keys = self.date_index[folder]
+            key = (entry['note_date'], rel_path)
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    def build(self) -> int:
+        """Walk the vault once and catalog every markdown file from its stat alone"""
+        entries = {}
+        for file_path in iter_vault_notes(self.root):
+            try:
+                rel_path = self._rel(file_path)
+                entries[rel_path] = self._make_entry(rel_path, os.stat(file_path), read_contents=False)
+            except OSError:
+                continue
+
+        with self.lock:
+            self.entries = {}
+            self.date_index = {folder: [] for folder in DATED_FOLDERS}
+            self.folder_counts = {}
+            self.recent_heap = []
+            self.frontmatter.clear()
+            self.tasks.clear()
+            for entry in entries.values():
+                self._put(entry)
+            self.built_at = datetime.now()
+            self.contents_loaded = False
+        logger.info(f"🗂️ Vault catalog built with {len(entries)} files")
+        return len(entries)
+
+    def _load_entry(self, rel_path: str):
+        """Read one cataloged note that hasn't been read yet"""
+        with self.lock:
+            entry = self.entries.get(rel_path)
+            if entry is None or entry['frontmatter'] is not None:
+                return
+        contents = self._read_contents(entry)
+        with self.lock:
+            # A watcher event may have replaced or dropped the entry while it was read
+            if self.entries.get(rel_path) is not entry or entry['frontmatter'] is not None:
+                return
+            entry.update(contents)
+            self._index_contents(entry)
+            self.version += 1
+
+    def load_contents(self) -> int:
+        """Read every note the build only stat'ed, filling frontmatter, tasks and highlights.
+
+        Runs in the background after a build; queries that need note contents
+        call it too and wait for it to finish the first time.
+        """
+        with self.contents_lock:
+            if self.contents_loaded:
+                return 0
+            with self.lock:
+                pending = [rel_path for rel_path, entry in self.entries.items() if entry['frontmatter'] is None]
+            for rel_path in pending:
+                self._load_entry(rel_path)
+            self.contents_loaded = True
+        if pending:
+            logger.info(f"🗂️ Vault catalog read {len(pending)} notes for frontmatter and tasks")
+        return len(pending)
+
+    def highlights(self, entry: Dict[str, Any]) -> List[str]:
+        """A weekly note's highlight lines, reading the note first if the catalog hasn't yet"""
+        if entry['frontmatter'] is None:
+            self._load_entry(entry['rel_path'])
+        return entry.get('highlights') or []
+
+    def update_file(self, path: str):
+        """Add or refresh a single file after a create/modify event"""
+        if not is_vault_note(self.root, path):
+            return
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            self.remove_file(path)
+            return
+        rel_path = self._rel(path)
+        with self.lock:
+            self._put(self._make_entry(rel_path, stat_result))
+
+    def remove_file(self, path: str):
+        """Drop a file (or every file under a directory) from the catalog"""
+        rel_path = self._rel(path)
+        prefix = rel_path.rstrip('/') + '/'
+        with self.lock:
+            self._drop(rel_path)
+            for key in [k for k in self.entries if k.startswith(prefix)]:
+                self._drop(key)
+
+    def move(self, src_path: str, dest_path: str):
+        """Rename a file or directory without rescanning the vault"""
+        src_rel = self._rel(src_path)
+        if os.path.isdir(dest_path):
+            prefix = src_rel.rstrip('/') + '/'
+            with self.lock:
+                moved = [k for k in self.entries if k.startswith(prefix)]
+                for key in moved:
+                    self._drop(key)
+            for key in moved:
+                self.update_file(os.path.join(dest_path, key[len(prefix):]))
+        else:
+            self.remove_file(src_path)
+            self.update_file(dest_path)
+
+    def apply_event(self, event):
+        """Apply a watchdog file system event"""
+        if event.event_type == 'moved':
+            self.move(event.src_path, event.dest_path)
+        elif event.event_type == 'deleted':
+            self.remove_file(event.src_path)
+        elif event.event_type in ('created', 'modified') and not event.is_directory:
+            self.update_file(event.src_path)
+
+    def get(self, rel_path: str) -> Optional[Dict[str, Any]]:
+        """Look up a single file by vault-relative path"""
+        with self.lock:
+            return self.entries.get(rel_path)
+
+    def files_in(self, folder: str, newest_first: bool = True) -> List[Dict[str, Any]]:
+        """Files directly inside a folder, sorted by filename"""
+        folder = folder.strip('/') or '.'
+        with self.lock:
+            files = [entry for entry in self.entries.values() if entry['folder'] == folder]
+        files.sort(key=lambda entry: entry['name'], reverse=newest_first)
+        return files
+
+    def daily_notes(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Daily notes, most recent first"""
+        return self.latest_notes(DAILY_FOLDER, limit)
+
+    def weekly_notes(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Weekly notes, most recent first"""
+        return self.latest_notes(WEEKLY_FOLDER, limit)
+
+    def latest_notes(self, folder: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent dated notes in a folder"""
+        with self.lock:
+            keys = self.date_index[folder]
+            selected = keys[-limit:] if limit else keys
+            return [self.entries[rel_path] for _, rel_path in reversed(selected)]
+
+    def notes_between(self, folder: str, start: date, end: date) -> List[Dict[str, Any]]:
+        """Dated notes with start <= note date <= end, oldest first"""
+        with self.lock:
+            keys = self.date_index[folder]
+            lo = bisect.bisect_left(keys, (start,))
+            hi = bisect.bisect_right(keys, (end, _MAX_PATH))
+            return [self.entries[rel_path] for _, rel_path in keys[lo:hi]]
+
+    def notes_on(self, folder: str, day: date) -> List[Dict[str, Any]]:
+        """Dated notes for a single day"""
+        return self.notes_between(folder, day, day)
+
+    def weekly_note_for(self, day: date) -> Optional[Dict[str, Any]]:
+        """The weekly note covering the ISO week containing a day"""
+        monday = day - timedelta(days=day.weekday())
+        notes = self.notes_on(WEEKLY_FOLDER, monday)
+        return notes[0] if notes else None
+
+    def note_year_range(self, folder: str) -> Optional[tuple]:
+        """First and last year with dated notes in a folder"""
+        with self.lock:
+            keys = self.date_index[folder]
+            if not keys:
+                return None
+            return keys[0][0].year, keys[-1][0].year
+
+    def directory_counts(self) -> Dict[str, int]:
+        """Number of markdown files per folder"""
+        with self.lock:
+            return dict(self.folder_counts)
+
+    def recent_files(self, since: float, limit: int = 10) -> List[Dict[str, Any]]:
+        """Files modified after a timestamp, newest first (O(limit log n))"""
+        recent = []
+        with self.lock:
+            popped = []
+            seen = set()
+            while self.recent_heap and len(recent) < limit:
+                neg_mtime, rel_path = heapq.heappop(self.recent_heap)
+                entry = self.entries.get(rel_path)
+                if entry is None or entry['mtime'] != -neg_mtime or rel_path in seen:
+                    continue  # Stale: file deleted, modified or re-pushed since this was pushed
+                seen.add(rel_path)
+                popped.append((neg_mtime, rel_path))
+                if entry['mtime'] <= since:
+                    break
+                recent.append(entry)
+            for item in popped:
+                heapq.heappush(self.recent_heap, item)
+        return recent
+
+    def query_notes(self, filters: Optional[Dict[str, Any]] = None, fields: Optional[List[str]] = None,
+                    group_by: Optional[List[str]] = None, sort: Optional[str] = None,
+                    limit: Optional[int] = 100, exclude_folders: Iterable[str] = ()) -> Dict[str, Any]:
+        """Exact frontmatter query over every note in the vault (see FrontmatterIndex.query)"""
+        self.load_contents()
+        excluded = tuple(folder.strip('/') + '/' for folder in exclude_folders)
+        with self.lock:
+            paths = [key for key in self.entries if not key.startswith(excluded)] if excluded else self.entries.keys()
+            result = self.frontmatter.query(filters, all_paths=paths, fields=fields,
+                                            group_by=group_by, sort=sort, limit=limit)
+            for row in result['notes']:
+                entry = self.entries.get(row['rel_path'], {})
+                row['name'] = os.path.splitext(entry.get('name', row['rel_path']))[0]
+                row['folder'] = entry.get('folder')
+        return result
+
+    def query_tasks(self, exclude_folders: Iterable[str] = (), **filters) -> Dict[str, Any]:
+        """Checkbox tasks across the vault (see TaskIndex.query for filters)"""
+        self.load_contents()
+        excluded = tuple(folder.strip('/') + '/' for folder in exclude_folders)
+        with self.lock:
+            paths = [key for key in self.entries if not key.startswith(excluded)] if excluded else None
+            return self.tasks.query(paths=paths, **filters)
+
+    def __len__(self) -> int:
+        return len(self.entries)
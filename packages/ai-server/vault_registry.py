@@ -0,0 +1,283 @@
+"""
+Additional named vaults served alongside the primary vault
+
+Each registered vault has its own ForgeRAG index (a separate collection under
+FORGE_VAULT_INDEX_ROOT/<name>), its own file watcher and reconciler, and loads
+and reconciles on its own thread, so a large vault never holds up a small one.
+Searches can target a single vault or fan out to several concurrently, with the
+results merged by similarity.
+"""
+
+import os
+import re
+import time
+import shutil
+import threading
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Any, Callable
+
+from index_reconciler import IndexReconciler
+
+logger = logging.getLogger(__name__)
+
+# Where per-vault indexes live, one directory per vault name
+VAULT_INDEX_ROOT = os.getenv("FORGE_VAULT_INDEX_ROOT", "./vault_indexes")
+
+# Concurrent per-vault searches, and how long a fan-out waits for a slow vault
+FAN_OUT_WORKERS = int(os.getenv("FORGE_FAN_OUT_WORKERS", "4"))
+FAN_OUT_TIMEOUT = float(os.getenv("FORGE_FAN_OUT_TIMEOUT", "10"))
+
+# The primary vault (configured via /configure-vault) and the fan-out scope
+DEFAULT_VAULT = "default"
+ALL_VAULTS = "all"
+
+VAULT_NAME_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$')
+
+
+def validate_vault_name(name: str):
+    """Raise ValueError unless name is usable as a vault (and index directory) name"""
+    if not VAULT_NAME_PATTERN.match(name or ''):
+        raise ValueError("Vault names are 1-64 letters, digits, '-' or '_', starting with a letter or digit")
+    if name in (DEFAULT_VAULT, ALL_VAULTS):
+        raise ValueError(f"'{name}' is reserved")
+
+
+class Vault:
+    """One registered vault: its path, index, watcher and load state"""
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = str(Path(path).resolve())
+        self.persist_directory = os.path.join(VAULT_INDEX_ROOT, name)
+        self.rag = None
+        self.reconciler = IndexReconciler()
+        self.observer = None
+        self.handler = None
+        self.ready = threading.Event()
+        # Set by remove(); load() stops at the next stage. loaded is clear only while load() runs
+        self.cancelled = threading.Event()
+        self.loaded = threading.Event()
+        self.loaded.set()
+        self.state = {"stage": "registered", "error": None, "timings_ms": {}}
+
+    def load(self, watcher_factory: Optional[Callable[["Vault"], Any]] = None):
+        """Open the index, start watching and catch up with disk, timing each stage"""
+        try:
+            self._load(watcher_factory)
+        finally:
+            self.loaded.set()
+
+    def _load(self, watcher_factory: Optional[Callable[["Vault"], Any]]):
+        timings = self.state["timings_ms"]
+
+        def run_stage(name, func):
+            self.state["stage"] = name
+            stage_started = time.perf_counter()
+            try:
+                return func()
+            finally:
+                timings[name] = round((time.perf_counter() - stage_started) * 1000, 1)
+
+        def open_index():
+            from rag_service import ForgeRAG
+            return ForgeRAG(persist_directory=self.persist_directory)
+
+        try:
+            self.rag = run_stage("rag_engine", open_index)
+            if self.cancelled.is_set():
+                return
+            if watcher_factory is not None:
+                run_stage("vault_watcher", lambda: self.start_watching(watcher_factory(self)))
+        except Exception as e:
+            logger.error(f"❌ Failed to load vault '{self.name}': {e}")
+            self.state["error"] = str(e)
+            self.state["stage"] = "degraded"
+            self.ready.set()
+            return
+
+        # Searchable from here on; reconciliation runs behind it like the primary vault's
+        self.state["stage"] = "reconcile"
+        self.ready.set()
+        if self.cancelled.is_set():
+            return
+        try:
+            run_stage("reconcile", lambda: self.reconciler.reconcile(self.rag, self.path,
+                                                                     cancel_event=self.cancelled))
+        except Exception as e:
+            logger.error(f"❌ Reconciliation failed for vault '{self.name}': {e}")
+        finally:
+            self.state["stage"] = "ready"
+        logger.info(f"📚 Vault '{self.name}' loaded: " +
+                    ", ".join(f"{name} {ms:.0f}ms" for name, ms in timings.items()))
+        rag = self.rag
+        if rag is not None and not self.cancelled.is_set():
+            rag.resume_embedding_migration()
+
+    def start_watching(self, handler):
+        from watchdog.observers import Observer
+        self.stop_watching()
+        self.observer = Observer()
+        self.observer.schedule(handler, self.path, recursive=True)
+        self.observer.start()
+        self.handler = handler
+        logger.info(f"👁️ Started watching vault '{self.name}': {self.path}")
+
+    def stop_watching(self):
+        if self.observer and self.observer.is_alive():
+            self.observer.stop()
+            self.observer.join(timeout=1.0)
+        self.observer = None
+        # Stop a debounced index update that is still waiting to fire
+        if self.handler is not None and hasattr(self.handler, 'cancel'):
+            self.handler.cancel()
+        self.handler = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "vault_path": self.path,
+            "persist_directory": self.persist_directory,
+            "ready": self.ready.is_set() and self.rag is not None,
+            "watching": bool(self.observer and self.observer.is_alive()),
+            **self.state,
+            "last_reconcile": (self.reconciler.last_report or {}).get("completed_at"),
+        }
+
+
+class VaultRegistry:
+    """Named vaults with independent indexes, plus concurrent cross-vault search"""
+
+    def __init__(self):
+        self.vaults: Dict[str, Vault] = {}
+        self.lock = threading.RLock()
+        self.watcher_factory: Optional[Callable[[Vault], Any]] = None
+        self.executor = ThreadPoolExecutor(max_workers=FAN_OUT_WORKERS, thread_name_prefix="forge-fanout")
+
+    def configure(self, vaults: Dict[str, str]):
+        """Register vaults from saved config (name -> path) without loading them"""
+        with self.lock:
+            for name, path in (vaults or {}).items():
+                if not os.path.isdir(path):
+                    logger.warning(f"⚠️ Skipping vault '{name}': {path} does not exist")
+                    continue
+                self.vaults[name] = Vault(name, path)
+
+    def to_config(self) -> Dict[str, str]:
+        with self.lock:
+            return {name: vault.path for name, vault in self.vaults.items()}
+
+    def _start(self, vault: Vault):
+        vault.loaded.clear()
+        threading.Thread(target=vault.load, args=(self.watcher_factory,),
+                         name=f"forge-vault-{vault.name}", daemon=True).start()
+
+    def start_all(self, watcher_factory: Optional[Callable[[Vault], Any]] = None):
+        """Load every registered vault, each on its own thread"""
+        self.watcher_factory = watcher_factory
+        with self.lock:
+            vaults = list(self.vaults.values())
+        for vault in vaults:
+            self._start(vault)
+
+    def add(self, name: str, path: str, primary_path: Optional[str] = None) -> Vault:
+        """Register a vault and start loading it in the background"""
+        validate_vault_name(name)
+        if not os.path.isdir(path):
+            raise ValueError(f"Vault directory does not exist: {path}")
+        resolved = str(Path(path).resolve())
+        if primary_path and resolved == str(Path(primary_path).resolve()):
+            raise ValueError(f"{path} is already the primary vault")
+        with self.lock:
+            if name in self.vaults:
+                raise KeyError(f"Vault '{name}' is already registered")
+            for other in self.vaults.values():
+                if other.path == resolved:
+                    raise ValueError(f"{path} is already registered as vault '{other.name}'")
+            vault = self.vaults[name] = Vault(name, path)
+        self._start(vault)
+        return vault
+
+    def remove(self, name: str, delete_index: bool = False) -> Vault:
+        """Stop loading and watching a vault and unregister it, optionally deleting its index"""
+        with self.lock:
+            vault = self.vaults.pop(name)
+        vault.cancelled.set()
+        vault.loaded.wait()
+        vault.stop_watching()
+        if delete_index:
+            rag, vault.rag = vault.rag, None
+            if rag is not None:
+                rag.close()
+            shutil.rmtree(vault.persist_directory, ignore_errors=True)
+        logger.info(f"🗑️ Removed vault '{name}'" + (" and its index" if delete_index else ""))
+        return vault
+
+    def get(self, name: str) -> Optional[Vault]:
+        with self.lock:
+            return self.vaults.get(name)
+
+    def names(self) -> List[str]:
+        with self.lock:
+            return sorted(self.vaults)
+
+    def stop_all(self):
+        with self.lock:
+            vaults = list(self.vaults.values())
+        for vault in vaults:
+            vault.stop_watching()
+        self.executor.shutdown(wait=False)
+
+    def fan_out_search(self, rags: Dict[str, Any], query: str, k: int,
+                       timeout: float = FAN_OUT_TIMEOUT) -> Dict[str, Any]:
+        """Search every given index concurrently and merge the top k by similarity.
+
+        Vaults that fail or miss the timeout are reported and left out rather
+        than failing the whole search.
+        """
+        started = time.perf_counter()
+        if rags:
+            # Embed once; the per-vault searches then hit the shared query embedding cache
+            next(iter(rags.values())).embed_query(query)
+
+        def timed_search(rag):
+            search_started = time.perf_counter()
+            return rag.search(query, k=k), round((time.perf_counter() - search_started) * 1000, 1)
+
+        futures = {self.executor.submit(timed_search, rag): name for name, rag in rags.items()}
+        done, _ = wait(futures, timeout=timeout)
+
+        merged, vaults = [], {}
+        for future, name in futures.items():
+            if future not in done:
+                future.cancel()
+                vaults[name] = {"results": 0, "error": f"timed out after {timeout:.0f}s"}
+                continue
+            try:
+                documents, search_ms = future.result()
+            except Exception as e:
+                vaults[name] = {"results": 0, "error": str(e)}
+                continue
+            vaults[name] = {"results": len(documents), "search_ms": search_ms}
+            merged.extend({**document, "vault": name} for document in documents)
+
+        # Reranker scores are comparable across vaults (same query, same model) and outrank the heuristic order
+        merged.sort(key=lambda document: (document.get("rerank_score") is not None,
+                                          document.get("rerank_score", document.get("similarity", 0))), reverse=True)
+        return {
+            "documents": merged[:k],
+            "vaults": vaults,
+            "search_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+
+# Global vault registry instance
+_vault_registry = None
+
+def get_vault_registry() -> VaultRegistry:
+    """Get or create global vault registry"""
+    global _vault_registry
+    if _vault_registry is None:
+        _vault_registry = VaultRegistry()
+    return _vault_registry